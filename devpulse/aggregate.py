@@ -0,0 +1,160 @@
+"""
+Per-file, per-directory, per-branch and per-hour totals of file changes
+"""
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class Totals:
+    """Change count and line totals of one group"""
+    
+    __slots__ = ("changes", "added", "removed")
+    
+    def __init__(self):
+        self.changes = 0
+        self.added = 0
+        self.removed = 0
+    
+    @property
+    def lines(self) -> int:
+        return self.added + self.removed
+
+
+class Aggregate:
+    """
+    Totals of a set of changes, grouped once and shared by quick summaries,
+    prompts and statistics.
+    
+    Filled from change rows with aggregate() or counting() in a single
+    pass, or from pre-grouped rows with add() by Database.aggregate(),
+    which does the grouping in SQL. Files are keyed by path, so files
+    with the same name in different directories stay apart. Directory
+    totals are rolled up from the file totals on first use.
+    """
+    
+    def __init__(self):
+        self.total = Totals()
+        self.by_file: Dict[str, Totals] = {}
+        self.by_branch: Dict[str, Totals] = {}
+        # "00".."23", from UTC timestamps
+        self.by_hour: Dict[str, Totals] = {}
+        self.filenames: Dict[str, str] = {}
+        self._by_directory: Optional[Dict[str, Totals]] = None
+        self._shared_names: Optional[set] = None
+    
+    def add(
+        self,
+        filepath: str,
+        filename: str,
+        branch: Optional[str],
+        hour: Optional[str],
+        changes: int,
+        added: int,
+        removed: int
+    ):
+        """Add the totals of a group of changes to one file; a None branch or hour is left out of those"""
+        for groups, key in (
+            (self.by_file, filepath), (self.by_branch, branch), (self.by_hour, hour)
+        ):
+            if key is None:
+                continue
+            totals = groups.get(key)
+            if totals is None:
+                totals = groups[key] = Totals()
+            totals.changes += changes
+            totals.added += added
+            totals.removed += removed
+        
+        self.total.changes += changes
+        self.total.added += added
+        self.total.removed += removed
+        self.filenames.setdefault(filepath, filename)
+        self._by_directory = None
+        self._shared_names = None
+    
+    @property
+    def files(self) -> int:
+        return len(self.by_file)
+    
+    @property
+    def by_directory(self) -> Dict[str, Totals]:
+        if self._by_directory is None:
+            directories: Dict[str, Totals] = {}
+            for filepath, file_totals in self.by_file.items():
+                directory = os.path.dirname(filepath)
+                totals = directories.get(directory)
+                if totals is None:
+                    totals = directories[directory] = Totals()
+                totals.changes += file_totals.changes
+                totals.added += file_totals.added
+                totals.removed += file_totals.removed
+            self._by_directory = directories
+        return self._by_directory
+    
+    def label(self, filepath: str) -> str:
+        """File name, or the path when another file shares the name"""
+        if self._shared_names is None:
+            seen, shared = set(), set()
+            for filename in self.filenames.values():
+                (shared if filename in seen else seen).add(filename)
+            self._shared_names = shared
+        filename = self.filenames.get(filepath, os.path.basename(filepath))
+        return filepath if filename in self._shared_names else filename
+    
+    @staticmethod
+    def top(groups: Dict[str, Totals], limit: Optional[int] = None) -> List[Tuple[str, Totals]]:
+        """Groups with the most changed lines first"""
+        ranked = sorted(groups.items(), key=lambda item: (-item[1].lines, -item[1].changes, item[0]))
+        return ranked if limit is None else ranked[:limit]
+    
+    def counting(self, changes: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Pass change rows through, adding each to the totals on the way"""
+        by_file, by_branch, by_hour = self.by_file, self.by_branch, self.by_hour
+        filenames = self.filenames
+        total = self.total
+        self._by_directory = self._shared_names = None
+        
+        for change in changes:
+            added = change["lines_added"] or 0
+            removed = change["lines_removed"] or 0
+            total.changes += 1
+            total.added += added
+            total.removed += removed
+            
+            filepath = change["filepath"]
+            totals = by_file.get(filepath)
+            if totals is None:
+                totals = by_file[filepath] = Totals()
+                filenames[filepath] = change["filename"]
+            totals.changes += 1
+            totals.added += added
+            totals.removed += removed
+            
+            branch = change.get("git_branch") or "N/A"
+            totals = by_branch.get(branch)
+            if totals is None:
+                totals = by_branch[branch] = Totals()
+            totals.changes += 1
+            totals.added += added
+            totals.removed += removed
+            
+            # "YYYY-MM-DD HH:MM:SS"
+            timestamp = change.get("timestamp")
+            if timestamp:
+                hour = str(timestamp)[11:13]
+                totals = by_hour.get(hour)
+                if totals is None:
+                    totals = by_hour[hour] = Totals()
+                totals.changes += 1
+                totals.added += added
+                totals.removed += removed
+            
+            yield change
+
+
+def aggregate(changes: Iterable[Dict[str, Any]]) -> Aggregate:
+    """Group change rows in one pass"""
+    result = Aggregate()
+    for _ in result.counting(changes):
+        pass
+    return result
@@ -1,19 +1,68 @@
 """
 AI integration module for generating summaries
 """
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, Iterable, Iterator, List, Dict, Any, Optional
+import asyncio
 import os
 
-from .config import AI_PROVIDER, get_api_key, get_model_name, PRIVACY_MODE
+from . import chunking, salience
+from .aggregate import Aggregate
+from .config import (
+    AI_PROVIDER, AI_API_BASE, get_api_key, get_model_name, get_token_budget, PRIVACY_MODE,
+    CONTEXT_TOKEN_BUDGET, SALIENCE_LOAD_CHARS, SUMMARY_CACHE_ENABLED
+)
+from .database import Database
+from .local_summarizer import LocalSummarizer, quick_summary
+from .providers import AsyncProvider, create_provider
+from .summary_cache import SummaryCache, cache_key
+
+
+ENTRY_SEPARATOR = "\n\n---\n\n"
+
+SYSTEM_PROMPT = "You are a professional software development assistant that creates concise, informative daily development logs."
+
+SUMMARY_INSTRUCTIONS = """**Instructions:**
+1. Group related changes by feature/component
+2. Use professional, clear language
+3. Focus on WHAT was accomplished, not HOW (avoid technical implementation details)
+4. Format as a bulleted list
+5. Be concise but informative
+6. Organize by importance/impact
+
+**Output Format:**
+Return a professional bulleted list like:
+
+✓ **[Feature/Component Name]**
+  • Accomplished task 1
+  • Accomplished task 2
+
+✓ **[Another Feature]**
+  • Accomplished task 3
+"""
 
 
 class AISummarizer:
     """AI-powered summary generator"""
     
-    def __init__(self, provider: str = AI_PROVIDER, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        provider: str = AI_PROVIDER,
+        api_key: Optional[str] = None,
+        db: Optional[Database] = None,
+        token_budget: Optional[int] = None,
+        api_base: Optional[str] = AI_API_BASE,
+        cache: Optional[SummaryCache] = None,
+        use_cache: bool = SUMMARY_CACHE_ENABLED
+    ):
         self.provider = provider
         self.api_key = api_key or get_api_key()
         self.model = get_model_name()
+        self.db = db  # used to load compressed diffs on demand
+        self.token_budget = token_budget or get_token_budget(provider)
+        self.context_budget = CONTEXT_TOKEN_BUDGET
+        self.api_base = api_base
+        # Responses are reused for identical requests across runs
+        self.cache = cache if cache is not None or not use_cache else SummaryCache()
         
         if not self.api_key:
             raise ValueError("API key not set. Please set DEVPULSE_API_KEY environment variable.")
@@ -21,226 +70,321 @@ class AISummarizer:
         # Initialize client based on provider
         self.client = self._init_client()
     
-    def _init_client(self):
+    def _init_client(self) -> AsyncProvider:
         """Initialize AI client based on provider"""
-        if self.provider == "groq":
-            try:
-                from groq import Groq
-                return Groq(api_key=self.api_key)
-            except ImportError:
-                raise ImportError("groq package not installed. Run: pip install groq")
-        
-        elif self.provider == "openai":
-            try:
-                from openai import OpenAI
-                return OpenAI(api_key=self.api_key)
-            except ImportError:
-                raise ImportError("openai package not installed. Run: pip install openai")
-        
-        elif self.provider == "litellm":
-            try:
-                import litellm
-                return litellm
-            except ImportError:
-                raise ImportError("litellm package not installed. Run: pip install litellm")
-        
-        else:
-            raise ValueError(f"Unsupported AI provider: {self.provider}")
+        return create_provider(self.provider, self.model, self.api_key, self.api_base)
     
     def generate_summary(
         self, 
-        changes: List[Dict[str, Any]], 
+        changes: Iterable[Dict[str, Any]], 
         privacy_mode: bool = PRIVACY_MODE
     ) -> str:
         """
         Generate a summary from file changes
         
+        Changes that fit in the provider's token budget go out in one
+        request. Larger days are split into chunks by directory, the chunks
+        are summarized concurrently, and a final request merges the partial
+        summaries.
+        
         Args:
-            changes: List of file change records from database
+            changes: File change records, e.g. a list or Database.iter_changes()
             privacy_mode: If True, only use metadata (function/class names)
         
         Returns:
             Human-readable summary text
         """
-        if not changes:
-            return "No changes tracked for this period."
-        
-        # Build context for AI
-        context = self._build_context(changes, privacy_mode)
+        return asyncio.run(self.agenerate_summary(changes, privacy_mode))
+    
+    async def agenerate_summary(
+        self,
+        changes: Iterable[Dict[str, Any]],
+        privacy_mode: bool = PRIVACY_MODE
+    ) -> str:
+        """generate_summary() for callers already running an event loop"""
+        pieces = [piece async for piece in self.astream_summary(changes, privacy_mode)]
+        return "".join(pieces).strip()
+    
+    def stream_summary(
+        self,
+        changes: Iterable[Dict[str, Any]],
+        privacy_mode: bool = PRIVACY_MODE
+    ) -> Iterator[str]:
+        """
+        Generate a summary from file changes, yielding text as it arrives
         
-        # Create prompt
-        prompt = self._create_prompt(context, changes)
+        The final request is streamed from the provider; on large days the
+        chunk summaries it depends on are completed first.
+        """
+        loop = asyncio.new_event_loop()
+        pieces = self.astream_summary(changes, privacy_mode)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(pieces.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(pieces.aclose())
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+    
+    async def astream_summary(
+        self,
+        changes: Iterable[Dict[str, Any]],
+        privacy_mode: bool = PRIVACY_MODE
+    ) -> AsyncIterator[str]:
+        """stream_summary() for callers already running an event loop"""
+        # Build context for AI, one entry per file. Changes are read once
+        # (they may be a database cursor), counting the prompt totals on the way
+        totals = Aggregate()
+        entries = self._select_entries(totals.counting(changes), privacy_mode)
+        if not totals.total.changes:
+            yield "No changes tracked for this period."
+            return
         
-        # Get summary from AI
-        summary = self._call_ai(prompt)
+        chunks = chunking.pack(entries, self.token_budget)
         
-        return summary
+        try:
+            async with self.client:
+                if len(chunks) == 1:
+                    prompt = self._create_prompt(ENTRY_SEPARATOR.join(chunks[0]), totals)
+                    kind = "summary"
+                else:
+                    # Map: summarize each chunk on its own. The part number is
+                    # left out of the prompt so unchanged chunks hit the cache
+                    # even when other chunks come and go.
+                    partials = await self._call_ai_many([
+                        self._create_chunk_prompt(ENTRY_SEPARATOR.join(chunk)) for chunk in chunks
+                    ], kind="chunk")
+                    
+                    # Reduce: merge partial summaries until they fit in one request
+                    prompt = await self._reduce(partials, totals)
+                    kind = "reduce"
+                
+                async for piece in self._stream_ai(prompt, kind):
+                    yield piece
+        finally:
+            if self.cache is not None:
+                self.cache.evict()
+    
+    async def _reduce(self, partials: List[str], totals: Aggregate) -> str:
+        """Merge partial summaries until they fit in the final prompt, and return it"""
+        while True:
+            # Zero-padded keys keep the partials in order
+            groups = chunking.pack(
+                ((f"{index:06d}", partial) for index, partial in enumerate(partials)),
+                self.token_budget
+            )
+            if len(groups) == 1 or len(groups) >= len(partials):
+                context = ENTRY_SEPARATOR.join(text for group in groups for text in group)
+                context = chunking.truncate_to_tokens(context, self.token_budget)
+                return self._create_reduce_prompt(context, totals)
+            
+            partials = await self._call_ai_many([
+                self._create_merge_prompt(ENTRY_SEPARATOR.join(group)) for group in groups
+            ], kind="merge")
     
     def _build_context(
         self, 
-        changes: List[Dict[str, Any]], 
+        changes: Iterable[Dict[str, Any]], 
         privacy_mode: bool
     ) -> str:
         """Build context string from changes"""
-        context_parts = []
-        
-        for change in changes:
-            filename = change['filename']
-            filepath = change['filepath']
-            lines_added = change['lines_added']
-            lines_removed = change['lines_removed']
-            git_branch = change.get('git_branch', 'N/A')
-            commit_msg = change.get('commit_message', '')
-            
-            if privacy_mode:
-                # Use only metadata
-                entry = f"""
-File: {filename}
-Path: {filepath}
-Branch: {git_branch}
-Stats: +{lines_added}/-{lines_removed}
-Commit: {commit_msg or 'No commit message'}
+        return ENTRY_SEPARATOR.join(text for _, text in self._select_entries(changes, privacy_mode))
+    
+    def _select_entries(
+        self,
+        changes: Iterable[Dict[str, Any]],
+        privacy_mode: bool
+    ) -> List[chunking.Entry]:
+        """
+        Collapse changes into one net diff per file, rank the files and fit
+        them into the context budget, most important diffs first
+        """
+        if self.db:
+            pairs = self.db.with_metadata(changes)
+        else:
+            pairs = ((change, None) for change in changes)
+        
+        if privacy_mode:
+            # Use only metadata
+            digests = salience.collapse(pairs, lambda batch: [''] * len(batch), max_total_chars=0)
+        else:
+            digests = salience.collapse(
+                pairs, lambda batch: self._load_diffs(batch, SALIENCE_LOAD_CHARS)
+            )
+        
+        budget = min(self.context_budget, self.token_budget)
+        return salience.select(digests, budget, self._build_entry)
+    
+    def _build_entry(self, digest: salience.FileDigest, diff: str) -> str:
+        """Build the context entry for one file"""
+        entry = f"""
+File: {digest.filename}
+Path: {digest.filepath}
+Branch: {digest.git_branch or 'N/A'}
+Stats: +{digest.lines_added}/-{digest.lines_removed} ({digest.saves} save{'s' if digest.saves != 1 else ''})
+Commit: {digest.commit_message or 'No commit message'}
 """
-            else:
-                # Include diff content
-                diff = change.get('diff_content', '')
-                entry = f"""
-File: {filename}
-Path: {filepath}
-Branch: {git_branch}
-Stats: +{lines_added}/-{lines_removed}
-Commit: {commit_msg or 'No commit message'}
-
+        
+        symbol_parts = [
+            f"{key.replace('_', ' ')}: {', '.join(names)}"
+            for key, names in digest.symbols.items() if names
+        ]
+        if symbol_parts:
+            entry += f"Symbols: {'; '.join(symbol_parts)}\n"
+        if digest.cosmetic_only:
+            entry += "Note: formatting-only or reverted changes\n"
+        
+        if diff:
+            # Include diff content
+            entry += f"""
 Changes:
 ```
-{diff[:1000]}  # Limit diff size
+{diff}
 ```
 """
-            
-            context_parts.append(entry.strip())
         
-        return "\n\n---\n\n".join(context_parts)
+        return entry.strip()
+    
+    def _load_diffs(self, changes: List[Dict[str, Any]], max_chars: int) -> List[str]:
+        """Load only the part of each change's diff that goes into the prompt"""
+        if self.db:
+            return self.db.load_diffs(changes, max_chars)
+        return [(change.get('diff_content') or '')[:max_chars] for change in changes]
     
-    def _create_prompt(self, context: str, changes: List[Dict[str, Any]]) -> str:
+    def _create_prompt(self, context: str, totals: Aggregate) -> str:
         """Create AI prompt"""
-        total_files = len(set(c['filepath'] for c in changes))
-        total_added = sum(c['lines_added'] for c in changes)
-        total_removed = sum(c['lines_removed'] for c in changes)
-        
         prompt = f"""You are a professional software development assistant. Analyze the following code changes and generate a concise, professional "Daily Dev Log" or "Done List" summary.
 
 **Context:**
-- Total Files Modified: {total_files}
-- Total Lines Added: {total_added}
-- Total Lines Removed: {total_removed}
+- Total Files Modified: {totals.files}
+- Total Lines Added: {totals.total.added}
+- Total Lines Removed: {totals.total.removed}
 
 **File Changes:**
 {context}
 
-**Instructions:**
-1. Group related changes by feature/component
-2. Use professional, clear language
-3. Focus on WHAT was accomplished, not HOW (avoid technical implementation details)
-4. Format as a bulleted list
-5. Be concise but informative
-6. Organize by importance/impact
+{SUMMARY_INSTRUCTIONS}"""
+        
+        return prompt
+    
+    def _create_chunk_prompt(self, context: str) -> str:
+        """Create the prompt for one chunk of a large day"""
+        return f"""You are a professional software development assistant. The following code changes are one part of a day's work. Summarize what was accomplished in them; your notes will be merged with the other parts into a "Daily Dev Log".
 
-**Output Format:**
-Return a professional bulleted list like:
+**File Changes:**
+{context}
 
-✓ **[Feature/Component Name]**
-  • Accomplished task 1
-  • Accomplished task 2
+{SUMMARY_INSTRUCTIONS}
+Do not add an introduction or a conclusion.
+"""
+    
+    def _create_merge_prompt(self, context: str) -> str:
+        """Create the prompt that merges some partial summaries into one"""
+        return f"""You are a professional software development assistant. Merge the following partial summaries of one day's code changes into a single summary, combining duplicate features/components.
 
-✓ **[Another Feature]**
-  • Accomplished task 3
+**Partial Summaries:**
+{context}
+
+{SUMMARY_INSTRUCTIONS}
+Do not add an introduction or a conclusion.
 """
-        
-        return prompt
     
-    def _call_ai(self, prompt: str) -> str:
-        """Call AI API and get response"""
+    def _create_reduce_prompt(self, context: str, totals: Aggregate) -> str:
+        """Create the final prompt from partial summaries"""
+        return f"""You are a professional software development assistant. The following partial summaries each cover part of one day's code changes. Merge them into a concise, professional "Daily Dev Log" or "Done List" summary, combining duplicate features/components.
+
+**Context:**
+- Total Files Modified: {totals.files}
+- Total Lines Added: {totals.total.added}
+- Total Lines Removed: {totals.total.removed}
+
+**Partial Summaries:**
+{context}
+
+{SUMMARY_INSTRUCTIONS}"""
+    
+    async def _call_ai_many(self, prompts: List[str], kind: str) -> List[str]:
+        """Call the AI API for several prompts concurrently, keeping their order"""
+        return list(await asyncio.gather(*(self._call_ai(prompt, kind) for prompt in prompts)))
+    
+    async def _call_ai(self, prompt: str, kind: str = "summary") -> str:
+        """Call AI API and get response, reusing a cached one if available"""
+        key = None
+        if self.cache is not None:
+            key = cache_key(self.provider, self.model, kind, prompt)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
         try:
-            if self.provider == "groq":
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are a professional software development assistant that creates concise, informative daily development logs."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    temperature=0.3,
-                    max_tokens=1000,
-                )
-                return response.choices[0].message.content.strip()
-            
-            elif self.provider == "openai":
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are a professional software development assistant that creates concise, informative daily development logs."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    temperature=0.3,
-                    max_tokens=1000,
-                )
-                return response.choices[0].message.content.strip()
-            
-            elif self.provider == "litellm":
-                response = self.client.completion(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are a professional software development assistant that creates concise, informative daily development logs."
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    temperature=0.3,
-                    max_tokens=1000,
-                    api_key=self.api_key
-                )
-                return response['choices'][0]['message']['content'].strip()
-            
+            response = await self.client.complete(
+                self._messages(prompt),
+                temperature=0.3,
+                max_tokens=1000,
+            )
         except Exception as e:
             raise Exception(f"AI API call failed: {str(e)}")
+        
+        if key is not None and response:
+            self.cache.put(key, kind, response)
+        return response
     
-    def generate_quick_summary(self, changes: List[Dict[str, Any]]) -> str:
-        """Generate a quick local summary without AI"""
-        if not changes:
-            return "No changes recorded."
+    async def _stream_ai(self, prompt: str, kind: str = "summary") -> AsyncIterator[str]:
+        """_call_ai() that yields the response as it arrives"""
+        key = None
+        if self.cache is not None:
+            key = cache_key(self.provider, self.model, kind, prompt)
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
         
-        files = set(c['filename'] for c in changes)
-        total_added = sum(c['lines_added'] for c in changes)
-        total_removed = sum(c['lines_removed'] for c in changes)
+        pieces = []
+        try:
+            async for piece in self.client.stream(
+                self._messages(prompt),
+                temperature=0.3,
+                max_tokens=1000,
+            ):
+                # Leading whitespace would only push the output down
+                if not pieces:
+                    piece = piece.lstrip()
+                    if not piece:
+                        continue
+                pieces.append(piece)
+                yield piece
+        except Exception as e:
+            raise Exception(f"AI API call failed: {str(e)}")
         
-        summary = f"""
-📊 **Quick Summary**
-• Files Modified: {len(files)}
-• Lines Added: {total_added}
-• Lines Removed: {total_removed}
+        # Only a complete response is cached
+        response = "".join(pieces).strip()
+        if key is not None and response:
+            self.cache.put(key, kind, response)
+    
+    @staticmethod
+    def _messages(prompt: str) -> List[Dict[str, str]]:
+        """Chat messages for a prompt"""
+        return [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+    
+    def generate_quick_summary(self, changes: Iterable[Dict[str, Any]]) -> str:
+        """Generate a quick local summary without AI"""
+        return quick_summary(changes)
 
-📝 **Files:**
-"""
-        
-        for file in sorted(files):
-            file_changes = [c for c in changes if c['filename'] == file]
-            added = sum(c['lines_added'] for c in file_changes)
-            removed = sum(c['lines_removed'] for c in file_changes)
-            summary += f"\n  • {file} (+{added}/-{removed})"
-        
-        return summary
+
+def create_summarizer(provider: str = AI_PROVIDER, db: Optional[Database] = None, **kwargs):
+    """Summarizer for a configured AI_PROVIDER name; "local" needs no key or network"""
+    if provider == "local":
+        return LocalSummarizer(db=db)
+    return AISummarizer(provider=provider, db=db, **kwargs)
@@ -0,0 +1,41 @@
+"""
+Compressed, content-addressed storage helpers for diff text
+"""
+import hashlib
+import zlib
+from typing import Optional, Tuple
+
+from .config import DIFF_COMPRESSION_LEVEL
+
+
+# (hash, codec, size, data) as stored in the diff_blobs table
+DiffBlob = Tuple[str, str, int, bytes]
+
+
+def compress_diff(text: str) -> DiffBlob:
+    """Compress diff text into a blob row"""
+    raw = text.encode("utf-8")
+    return (
+        hashlib.blake2b(raw, digest_size=20).hexdigest(),
+        "zlib",
+        len(raw),
+        zlib.compress(raw, DIFF_COMPRESSION_LEVEL)
+    )
+
+
+def decompress_diff(codec: str, data: bytes, max_chars: Optional[int] = None) -> str:
+    """
+    Decompress a stored diff.
+    
+    With max_chars only the leading part of the stream is inflated, which
+    is all a prompt excerpt needs.
+    """
+    if codec != "zlib":
+        raise ValueError(f"Unsupported diff codec: {codec}")
+    
+    if max_chars is None:
+        return zlib.decompress(data).decode("utf-8")
+    
+    # UTF-8 needs at most 4 bytes per character
+    raw = zlib.decompressobj().decompress(data, max_chars * 4)
+    return raw.decode("utf-8", errors="ignore")[:max_chars]
@@ -0,0 +1,106 @@
+"""
+Token-budget chunking of summary context
+"""
+import os
+import zlib
+from typing import Dict, Iterable, List, Tuple
+
+from .config import CHARS_PER_TOKEN
+
+
+# Tokens counted for the separator between two entries in a prompt
+SEPARATOR_TOKENS = 2
+
+# One in this many group keys ends a chunk early (see pack)
+BOUNDARY_EVERY = 4
+
+# (group key, prompt text) of one entry
+Entry = Tuple[str, str]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text (about CHARS_PER_TOKEN characters each)"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Cut a text so its estimate fits in a budget"""
+    max_chars = max(0, budget - 1) * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    marker = "\n... (truncated)"
+    return text[:max(0, max_chars - len(marker))] + marker
+
+
+def group_key(filepath: str) -> str:
+    """Group changes by their directory"""
+    return os.path.dirname(filepath)
+
+
+def _is_boundary(key: str) -> bool:
+    """Content-defined chunk boundary after a group"""
+    return zlib.crc32(key.encode("utf-8")) % BOUNDARY_EVERY == 0
+
+
+def pack(entries: Iterable[Entry], budget: int) -> List[List[str]]:
+    """
+    Pack entries into chunks of at most budget estimated tokens.
+    
+    Entries are grouped by key and groups are taken in key order, so
+    neighbouring directories tend to land in the same chunk. A group that
+    fits in one chunk is never split across two; a larger group gets
+    chunks of its own. An entry larger than the budget on its own is
+    truncated.
+    
+    Everything goes in one chunk if it fits. Otherwise chunks are kept
+    stable as groups grow, so cached chunk summaries stay valid: large
+    groups never share a chunk, and small groups are also cut after keys
+    that hash to a boundary, so a growing group only moves the chunk
+    boundaries up to the next such key.
+    """
+    groups: Dict[str, List[str]] = {}
+    for key, text in entries:
+        groups.setdefault(key, []).append(truncate_to_tokens(text, budget - SEPARATOR_TOKENS))
+    
+    sizes_by_key = {
+        key: [estimate_tokens(text) + SEPARATOR_TOKENS for text in texts]
+        for key, texts in groups.items()
+    }
+    if sum(sum(sizes) for sizes in sizes_by_key.values()) <= budget:
+        return [[text for key in sorted(groups) for text in groups[key]]]
+    
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    
+    for key in sorted(groups):
+        texts = groups[key]
+        sizes = sizes_by_key[key]
+        
+        if sum(sizes) > budget:
+            if current:
+                chunks.append(current)
+                current, used = [], 0
+            for text, size in zip(texts, sizes):
+                if current and used + size > budget:
+                    chunks.append(current)
+                    current, used = [], 0
+                current.append(text)
+                used += size
+            chunks.append(current)
+            current, used = [], 0
+            continue
+        
+        if current and used + sum(sizes) > budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.extend(texts)
+        used += sum(sizes)
+        
+        if _is_boundary(key):
+            chunks.append(current)
+            current, used = [], 0
+    
+    if current:
+        chunks.append(current)
+    return chunks
@@ -10,10 +10,17 @@ import signal
 
 import click
 
-from devpulse.config import validate_config, PRIVACY_MODE, CONFIG_DIR
-from devpulse.database import Database
+from devpulse.config import (
+    validate_config, PRIVACY_MODE, CONFIG_DIR, WORKER_COUNT, WORKER_POOL,
+    RETENTION_DAYS, COMPACT_INTERVAL_HOURS, INDEX_ON_START, IMPORT_WORKERS, AI_PROVIDER
+)
+from devpulse.database import Database, day_range
 from devpulse.watcher import FileWatcher
-from devpulse.ai_summarizer import AISummarizer
+from devpulse.ai_summarizer import create_summarizer
+from devpulse.local_summarizer import LocalSummarizer
+from devpulse.maintenance import CompactionScheduler
+from devpulse.importer import import_repos
+from devpulse.summary_cache import SummaryCache
 
 
 @click.group()
@@ -49,7 +56,16 @@ def track(path):
 @cli.command()
 @click.option('--daemon', '-d', is_flag=True, help='Run as background daemon')
 @click.option('--privacy', '-p', is_flag=True, help='Enable privacy mode')
-def start(daemon, privacy):
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=WORKER_COUNT,
+              show_default=True, help='Number of parallel change workers')
+@click.option('--pool', 'pool_type', type=click.Choice(['thread', 'process']),
+              default=WORKER_POOL, show_default=True,
+              help='Run diffing/hashing in threads or separate processes')
+@click.option('--index/--no-index', 'index', default=INDEX_ON_START, show_default=True,
+              help='Snapshot all tracked files before watching')
+@click.option('--compact-every', type=float, default=COMPACT_INTERVAL_HOURS, show_default=True,
+              help='Compact old history every N hours while running (0 = off)')
+def start(daemon, privacy, workers, pool_type, index, compact_every):
     """
     Start tracking file changes in all watched directories.
     
@@ -65,12 +81,21 @@ def start(daemon, privacy):
     
     click.echo("🚀 Starting DevPulse...")
     click.echo(f"Privacy Mode: {'✓ Enabled' if privacy or PRIVACY_MODE else '✗ Disabled'}")
+    click.echo(f"Workers: {workers} ({pool_type} pool)")
     click.echo(f"Watching {len(watch_paths)} path(s)\n")
     
-    watcher = FileWatcher(watch_paths, db, privacy_mode=privacy or PRIVACY_MODE)
+    watcher = FileWatcher(
+        watch_paths, db,
+        privacy_mode=privacy or PRIVACY_MODE,
+        workers=workers,
+        pool_type=pool_type,
+        index_on_start=index
+    )
+    scheduler = CompactionScheduler(db, interval_hours=compact_every)
     
     def signal_handler(sig, frame):
         click.echo("\n\n⏹️  Stopping DevPulse...")
+        scheduler.stop()
         watcher.stop()
         sys.exit(0)
     
@@ -78,6 +103,7 @@ def start(daemon, privacy):
     signal.signal(signal.SIGTERM, signal_handler)
     
     watcher.start()
+    scheduler.start()
     
     if daemon:
         click.echo("Running in daemon mode. Press Ctrl+C to stop.")
@@ -87,6 +113,7 @@ def start(daemon, privacy):
             time.sleep(1)
     except KeyboardInterrupt:
         click.echo("\n\n⏹️  Stopping DevPulse...")
+        scheduler.stop()
         watcher.stop()
 
 
@@ -94,8 +121,9 @@ def start(daemon, privacy):
 @click.option('--today', is_flag=True, help='Generate summary for today')
 @click.option('--date', '-d', 'date_str', type=str, help='Generate summary for specific date (YYYY-MM-DD)')
 @click.option('--save', '-s', is_flag=True, help='Save summary to database')
-@click.option('--no-ai', is_flag=True, help='Skip AI and generate quick summary')
-def log(today, date_str, save, no_ai):
+@click.option('--no-ai', is_flag=True, help='Summarize locally, without AI or an API key')
+@click.option('--no-cache', is_flag=True, help='Ignore cached AI summaries for this run')
+def log(today, date_str, save, no_ai, no_cache):
     """
     Generate a development log summary.
     
@@ -107,47 +135,74 @@ def log(today, date_str, save, no_ai):
         click.echo("❌ Please specify --today or --date")
         return
     
+    # The local provider needs no key or network
+    local = no_ai or AI_PROVIDER == "local"
+    
     # Validate config
     valid, msg = validate_config()
-    if not valid and not no_ai:
+    if not valid and not local:
         click.echo(f"❌ Configuration error: {msg}")
         click.echo("\nSet environment variable: DEVPULSE_API_KEY")
-        click.echo("Use --no-ai flag to skip AI summary.")
+        click.echo("Use --no-ai (or DEVPULSE_AI_PROVIDER=local) to summarize without AI.")
         return
     
     # Determine date
     target_date = date.today().isoformat() if today else date_str
     
-    # Get changes
+    try:
+        day_range(target_date)
+    except ValueError as e:
+        click.echo(f"❌ {e}")
+        return
+    
+    # Changes recorded from here on are left for the next log
     db = Database()
-    changes = db.get_changes_by_date(target_date, processed=False)
+    last_id = db.get_last_change_id()
+    pending = db.count_changes(target_date, processed=False, max_id=last_id)
     
-    if not changes:
+    if not pending:
         click.echo(f"📭 No changes recorded for {target_date}")
         return
     
-    click.echo(f"📊 Found {len(changes)} change(s) for {target_date}\n")
+    click.echo(f"📊 Found {pending} change(s) for {target_date}\n")
+    
+    def changes():
+        """Stream the pending changes; diffs are loaded only where needed"""
+        return db.iter_changes(target_date, processed=False, max_id=last_id)
     
     # Generate summary
-    if no_ai:
-        summarizer = AISummarizer()
-        summary = summarizer.generate_quick_summary(changes)
+    summarizer = None
+    if local:
+        summary = LocalSummarizer(db=db).generate_day_summary(target_date, max_id=last_id)
+        _echo_log_header(target_date)
+        click.echo(summary)
     else:
         click.echo("🤖 Generating AI summary...")
+        pieces = []
         try:
-            summarizer = AISummarizer()
-            summary = summarizer.generate_summary(changes)
+            summarizer = create_summarizer(db=db, use_cache=not no_cache)
+            # Print the summary as it streams in
+            for piece in summarizer.stream_summary(changes()):
+                if not pieces:
+                    _echo_log_header(target_date)
+                pieces.append(piece)
+                click.echo(piece, nl=False)
+            if not pieces:
+                _echo_log_header(target_date)
+            summary = "".join(pieces).strip()
+            click.echo()
         except Exception as e:
+            if pieces:
+                click.echo()
             click.echo(f"❌ AI summary failed: {e}")
-            click.echo("\nGenerating quick summary instead...\n")
-            summary = summarizer.generate_quick_summary(changes)
+            click.echo("\nGenerating local summary instead...\n")
+            summary = LocalSummarizer(db=db).generate_day_summary(target_date, max_id=last_id)
+            _echo_log_header(target_date)
+            click.echo(summary)
     
-    # Display summary
-    click.echo("\n" + "="*60)
-    click.echo(f"  DEV LOG - {target_date}")
-    click.echo("="*60 + "\n")
-    click.echo(summary)
     click.echo("\n" + "="*60 + "\n")
+    if summarizer is not None and summarizer.cache and summarizer.cache.hits:
+        click.echo(f"♻️  Reused {summarizer.cache.hits} cached AI response(s)")
     
     # Save summary
     if save:
@@ -160,15 +215,21 @@ def log(today, date_str, save, no_ai):
             total_lines_removed=stats['total_removed'] or 0
         )
         
-        # Mark changes as processed
-        change_ids = [c['id'] for c in changes]
-        db.mark_as_processed(change_ids)
+        # Mark the summarized changes as processed
+        db.mark_processed(target_date, last_id)
         
         click.echo("✓ Summary saved to database")
 
 
-@cli.command()
-def list():
+def _echo_log_header(target_date: str):
+    """Print the banner above a dev log"""
+    click.echo("\n" + "="*60)
+    click.echo(f"  DEV LOG - {target_date}")
+    click.echo("="*60 + "\n")
+
+
+@cli.command('list')
+def list_paths():
     """List all watched directories."""
     db = Database()
     paths = db.get_watch_paths()
@@ -208,13 +269,62 @@ def clear(confirm):
 
 
 @cli.command()
-@click.option('--date', '-d', type=str, help='Get stats for specific date (YYYY-MM-DD)')
+@click.option('--older-than', type=click.IntRange(min=0), default=RETENTION_DAYS,
+              show_default=True, help='Compact processed changes older than N days')
+@click.option('--vacuum', is_flag=True, help='Run a full VACUUM (slow, rewrites the database)')
+def compact(older_than, vacuum):
+    """
+    Roll old processed changes into daily per-file totals.
+    
+    Diffs of compacted changes are dropped; statistics are kept.
+    """
+    db = Database()
+    result = db.compact(older_than_days=older_than, vacuum=vacuum)
+    
+    click.echo(f"✓ Compacted {result['changes_compacted']} change(s)")
+    click.echo(f"  Diff blobs removed: {result['blobs_removed']}")
+    click.echo(f"  Pages freed: {result['pages_freed']}")
+
+
+@cli.command('import-git')
+@click.argument('repos', nargs=-1, required=True, type=click.Path(exists=True, file_okay=False))
+@click.option('--since', type=str, help='Only import commits after this date (e.g. 2026-01-01, "2 weeks ago")')
+@click.option('--privacy', '-p', is_flag=True, help='Store symbol metadata instead of diffs')
+@click.option('--workers', '-w', type=click.IntRange(min=1), default=IMPORT_WORKERS,
+              show_default=True, help='Repositories imported in parallel')
+def import_git(repos, since, privacy, workers):
+    """
+    Backfill tracked changes from git history.
+    
+    Commits already imported are skipped, so this can be re-run safely.
+    
+    Example: devpulse import-git ~/code/api ~/code/web --since 2026-01-01
+    """
+    click.echo(f"📥 Importing {len(repos)} repositor{'y' if len(repos) == 1 else 'ies'}...")
+    
+    for result in import_repos(list(repos), since=since, privacy_mode=privacy or PRIVACY_MODE, workers=workers):
+        if 'error' in result:
+            click.echo(f"❌ {result['repo']}: {result['error']}")
+            continue
+        
+        click.echo(
+            f"✓ {result['repo']}: {result['commits']} commit(s), {result['changes']} change(s) "
+            f"in {result['seconds']}s ({result['skipped']} already imported)"
+        )
+
+
+@cli.command()
+@click.option('--date', '-d', 'date_str', type=str, help='Get stats for specific date (YYYY-MM-DD)')
 def stats(date_str):
     """Show statistics about tracked changes."""
     db = Database()
     
     if date_str:
-        stats_data = db.get_statistics(date_str)
+        try:
+            stats_data = db.get_statistics(date_str)
+        except ValueError as e:
+            click.echo(f"❌ {e}")
+            return
         click.echo(f"\n📊 Statistics for {date_str}:\n")
     else:
         stats_data = db.get_statistics()
@@ -225,6 +335,47 @@ def stats(date_str):
     click.echo(f"  Lines Added: {stats_data['total_added']}")
     click.echo(f"  Lines Removed: {stats_data['total_removed']}")
     click.echo(f"  Lines Modified: {stats_data['total_modified']}\n")
+    
+    totals = db.aggregate(date_str)
+    sections = [
+        ("Top Directories", totals.top(totals.by_directory, 5)),
+        ("Branches", totals.top(totals.by_branch, 5)),
+        ("Busiest Hours (UTC)", [(f"{hour}:00", group) for hour, group in totals.top(totals.by_hour, 3)]),
+    ]
+    for title, groups in sections:
+        if not groups:
+            continue
+        click.echo(f"  {title}:")
+        for name, group in groups:
+            click.echo(f"    {name}: {group.changes} change(s), +{group.added}/-{group.removed}")
+        click.echo()
+
+
+@cli.command()
+@click.option('--clear', 'clear_cache', is_flag=True, help='Remove all cached summaries')
+def cache(clear_cache):
+    """Show or clear the AI summary cache."""
+    summary_cache = SummaryCache()
+    
+    if clear_cache:
+        summary_cache.clear()
+        click.echo("✓ Summary cache cleared")
+        return
+    
+    evicted = summary_cache.evict()
+    stats_data = summary_cache.get_statistics()
+    
+    click.echo("\n♻️  Summary Cache:\n")
+    click.echo(f"  Entries: {stats_data['entries']}")
+    for kind, count in sorted(stats_data['kinds'].items()):
+        click.echo(f"    {kind}: {count}")
+    click.echo(f"  Size: {stats_data['size'] / 1024:.1f} KB")
+    click.echo(f"  Hits: {stats_data['hits']}")
+    click.echo(f"  Misses: {stats_data['misses']}")
+    click.echo(f"  Hit Rate: {stats_data['hit_rate']:.0%}")
+    if evicted:
+        click.echo(f"  Evicted: {evicted} expired or least recently used")
+    click.echo()
 
 
 @cli.command()
@@ -11,12 +11,14 @@ HOME_DIR = Path.home()
 CONFIG_DIR = HOME_DIR / f".{APP_NAME}"
 DB_PATH = CONFIG_DIR / "devpulse.db"
 WATCH_LIST_FILE = CONFIG_DIR / "watch_paths.txt"
+SNAPSHOT_DB_PATH = CONFIG_DIR / "snapshots.db"  # diff baselines for watched files
+SUMMARY_CACHE_DB_PATH = CONFIG_DIR / "summary_cache.db"  # AI responses reused across runs
 
 # Ensure config directory exists
 CONFIG_DIR.mkdir(parents=True, exist_ok=True)
 
 # AI Provider Configuration
-AI_PROVIDER = os.getenv("DEVPULSE_AI_PROVIDER", "groq")  # groq, openai, or litellm
+AI_PROVIDER = os.getenv("DEVPULSE_AI_PROVIDER", "groq")  # groq, openai, litellm, or local (offline, no key)
 API_KEY = os.getenv("DEVPULSE_API_KEY", "")
 
 # Model configurations
@@ -25,9 +27,98 @@ OPENAI_MODEL = "gpt-4o-mini"
 GEMINI_MODEL = "gemini/gemini-1.5-flash"  # LiteLLM format for Gemini
 LITELLM_MODEL = os.getenv("DEVPULSE_MODEL", "gemini/gemini-1.5-flash")
 
+# Summarization settings
+TOKEN_BUDGETS = {  # estimated prompt tokens of change context per request, by provider
+    "groq": 5000,
+    "openai": 30000,
+    "gemini": 30000,
+    "litellm": 30000,
+}
+TOKEN_BUDGET = int(os.getenv("DEVPULSE_TOKEN_BUDGET", "0"))  # overrides TOKEN_BUDGETS when set
+CHARS_PER_TOKEN = 4  # rough token estimate for prompt text
+CONTEXT_TOKEN_BUDGET = int(os.getenv("DEVPULSE_CONTEXT_TOKENS", "4000"))  # change context per day before chunking
+SALIENCE_MAX_DIFF_CHARS = 4000  # net diff included for one file at most
+SALIENCE_MIN_DIFF_CHARS = 200  # shorter diff excerpts are left out entirely
+SALIENCE_LOAD_CHARS = 20000  # stored diff text read per change to build net diffs
+SALIENCE_LOAD_TOTAL_CHARS = 2_000_000  # stored diff text read per summary; later saves count lines only
+SALIENCE_MAX_FILE_LINES = 2000  # diff lines kept per file while building its net diff
+LOW_SIGNAL_PATTERNS = [  # ranked last: lockfiles, generated and minified files
+    "*.lock", "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "poetry.lock",
+    "*.min.js", "*.min.css", "*.map", "*.snap", "*_pb2.py", "*.generated.*",
+]
+LOCAL_MAX_AREAS = 15  # directory/branch groups described by the local summarizer
+LOCAL_MAX_NAMES = 6  # symbols, files or commits listed per line before "+N more"
+SUMMARY_CACHE_ENABLED = os.getenv("DEVPULSE_SUMMARY_CACHE", "true").lower() == "true"  # reuse identical AI requests
+SUMMARY_CACHE_TTL_DAYS = float(os.getenv("DEVPULSE_SUMMARY_CACHE_TTL_DAYS", "14"))  # drop entries not used for this long
+SUMMARY_CACHE_MAX_BYTES = int(os.getenv("DEVPULSE_SUMMARY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))  # evict least recently used beyond this
+
+# AI request settings
+AI_API_BASE = os.getenv("DEVPULSE_API_BASE", "")  # endpoint override, e.g. a proxy or local stub server
+AI_TIMEOUT = float(os.getenv("DEVPULSE_AI_TIMEOUT", "60"))  # seconds per request attempt
+AI_MAX_RETRIES = int(os.getenv("DEVPULSE_AI_MAX_RETRIES", "5"))  # retries of rate-limited or failed requests
+AI_BACKOFF_BASE = 1.0  # seconds; doubles per retry, with full jitter
+AI_BACKOFF_MAX = 30.0  # longest backoff between retries
+AI_MAX_RETRY_AFTER = 120.0  # give up instead of honouring a longer Retry-After
+AI_CONCURRENCY = {  # requests in flight at once, by provider
+    "groq": 2,
+    "openai": 8,
+    "gemini": 4,
+    "litellm": 4,
+}
+AI_CONCURRENCY_OVERRIDE = int(os.getenv("DEVPULSE_AI_CONCURRENCY", "0"))  # overrides AI_CONCURRENCY when set
+
+# Database settings
+DB_BUSY_TIMEOUT = float(os.getenv("DEVPULSE_DB_BUSY_TIMEOUT", "30"))  # seconds to wait on a lock
+DB_CACHE_SIZE_KB = int(os.getenv("DEVPULSE_DB_CACHE_SIZE_KB", "32768"))  # page cache per connection
+DB_MMAP_SIZE = int(os.getenv("DEVPULSE_DB_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes
+DB_STATEMENT_CACHE_SIZE = 256  # prepared statements kept per connection
+DIFF_COMPRESSION_LEVEL = int(os.getenv("DEVPULSE_DIFF_COMPRESSION_LEVEL", "6"))  # zlib level 1-9
+RETENTION_DAYS = int(os.getenv("DEVPULSE_RETENTION_DAYS", "30"))  # keep raw processed changes this long
+COMPACT_CHUNK_SIZE = int(os.getenv("DEVPULSE_COMPACT_CHUNK_SIZE", "2000"))  # rows per compaction transaction
+COMPACT_INTERVAL_HOURS = float(os.getenv("DEVPULSE_COMPACT_INTERVAL_HOURS", "0"))  # 0 disables in-daemon compaction
+MIGRATION_CHUNK_SIZE = int(os.getenv("DEVPULSE_MIGRATION_CHUNK_SIZE", "5000"))  # rows per migration transaction
+MIGRATION_CHUNK_PAUSE = float(os.getenv("DEVPULSE_MIGRATION_CHUNK_PAUSE", "0.05"))  # seconds between chunks
+WRITE_BATCH_SIZE = int(os.getenv("DEVPULSE_WRITE_BATCH_SIZE", "200"))  # rows per transaction
+WRITE_FLUSH_INTERVAL = float(os.getenv("DEVPULSE_WRITE_FLUSH_INTERVAL", "1.0"))  # seconds
+WRITE_MAX_RETRIES = int(os.getenv("DEVPULSE_WRITE_MAX_RETRIES", "3"))  # retries of a locked/busy batch before it waits for the next flush
+WRITE_RETRY_DELAY = 0.5  # seconds; doubles per retry
+READ_BATCH_SIZE = int(os.getenv("DEVPULSE_READ_BATCH_SIZE", "1000"))  # rows fetched per cursor round trip when streaming changes
+
+# Git history import settings
+IMPORT_WORKERS = int(os.getenv("DEVPULSE_IMPORT_WORKERS", str(min(4, os.cpu_count() or 1))))  # repos imported in parallel
+IMPORT_BATCH_SIZE = int(os.getenv("DEVPULSE_IMPORT_BATCH_SIZE", "5000"))  # change rows per transaction
+IMPORT_BATCH_BYTES = 32 * 1024 * 1024  # diff bytes held before a batch is written
+IMPORT_MAX_DIFF_BYTES = 256 * 1024  # imported diffs are truncated to this size per file
+
 # Privacy settings
 PRIVACY_MODE = os.getenv("DEVPULSE_PRIVACY_MODE", "false").lower() == "true"
 
+# Watcher settings
+DEBOUNCE_SECONDS = float(os.getenv("DEVPULSE_DEBOUNCE_SECONDS", "0.5"))  # quiet time before a path is processed
+DEBOUNCE_MAX_WAIT_SECONDS = float(os.getenv("DEVPULSE_DEBOUNCE_MAX_WAIT_SECONDS", "5.0"))  # a path written continuously is still processed this long after its first event
+EVENT_QUEUE_SIZE = int(os.getenv("DEVPULSE_EVENT_QUEUE_SIZE", "10000"))  # max distinct pending paths
+FILE_CACHE_MAX_BYTES = int(os.getenv("DEVPULSE_FILE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # in-memory baselines
+PERSIST_SNAPSHOTS = os.getenv("DEVPULSE_PERSIST_SNAPSHOTS", "true").lower() == "true"  # keep baselines in snapshots.db across restarts (never in privacy mode)
+MMAP_THRESHOLD = int(os.getenv("DEVPULSE_MMAP_THRESHOLD", str(1024 * 1024)))  # map files this large instead of copying
+INDEX_ON_START = os.getenv("DEVPULSE_INDEX_ON_START", "false").lower() == "true"  # baseline scan at startup
+INDEX_WORKERS = int(os.getenv("DEVPULSE_INDEX_WORKERS", str(min(8, (os.cpu_count() or 1) * 2))))
+INDEX_BATCH_SIZE = 500  # snapshots per store transaction
+WATCH_PRUNE_EXCLUDED = os.getenv("DEVPULSE_WATCH_PRUNE_EXCLUDED", "true").lower() == "true"  # never watch excluded dirs
+RESPECT_GITIGNORE = os.getenv("DEVPULSE_RESPECT_GITIGNORE", "true").lower() == "true"  # honour .gitignore files
+IGNORE_FILE_NAMES = (".gitignore", ".devpulseignore")  # per-directory ignore files, in precedence order
+IGNORE_RECHECK_SECONDS = 5.0  # how often to re-stat ignore files that get no events (.git/info/exclude)
+GIT_LOG_DEPTH = int(os.getenv("DEVPULSE_GIT_LOG_DEPTH", "2000"))  # commits scanned per HEAD change for commit messages
+GIT_META_RECHECK_SECONDS = 1.0  # how often HEAD and refs are re-stat'ed
+DIFF_BACKEND = os.getenv("DEVPULSE_DIFF_BACKEND", "patience")  # patience or difflib
+DIFF_MAX_LINES = int(os.getenv("DEVPULSE_DIFF_MAX_LINES", "50000"))  # larger changes are only counted, not diffed
+DIFF_MAX_COST = 1000  # Myers edit budget per region before it is reported as a plain replacement
+DIFF_CONTEXT_LINES = 3
+SYMBOL_INDEX_FILES = 256  # files whose parsed lines are kept for privacy mode
+SYMBOL_INDEX_LINES = 50000  # parsed lines kept per file
+SYMBOL_SCAN_LIMIT = 5000  # lines walked up from a change to find its enclosing symbols
+WORKER_COUNT = int(os.getenv("DEVPULSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+WORKER_POOL = os.getenv("DEVPULSE_WORKER_POOL", "thread")  # thread or process
+
 # Exclusion patterns (files/dirs to ignore)
 EXCLUSION_PATTERNS = [
     # Environment and secrets
@@ -86,16 +177,35 @@ def get_model_name() -> str:
         return GEMINI_MODEL
     elif AI_PROVIDER == "litellm":
         return LITELLM_MODEL
+    elif AI_PROVIDER == "local":
+        return "local"
     else:
         return os.getenv("DEVPULSE_MODEL", "gpt-3.5-turbo")
 
 
+def get_token_budget(provider: str = AI_PROVIDER) -> int:
+    """Get the per-request context token budget for a provider"""
+    if TOKEN_BUDGET > 0:
+        return TOKEN_BUDGET
+    return TOKEN_BUDGETS.get(provider, 8000)
+
+
+def get_concurrency(provider: str = AI_PROVIDER) -> int:
+    """Get the number of concurrent requests allowed for a provider"""
+    if AI_CONCURRENCY_OVERRIDE > 0:
+        return AI_CONCURRENCY_OVERRIDE
+    return AI_CONCURRENCY.get(provider, 4)
+
+
 def validate_config() -> tuple[bool, str]:
     """Validate configuration"""
+    if AI_PROVIDER == "local":
+        return True, "Configuration valid"
+    
     if not API_KEY:
         return False, "DEVPULSE_API_KEY environment variable not set"
     
-    if AI_PROVIDER not in ["groq", "openai", "litellm", "gemini"]:
+    if AI_PROVIDER not in ["groq", "openai", "litellm", "gemini", "local"]:
         return False, f"Invalid AI provider: {AI_PROVIDER}"
     
     return True, "Configuration valid"
@@ -1,109 +1,383 @@
 """
 Database schema and operations for DevPulse
 """
+import os
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Set, Iterable, Iterator, Tuple
+from itertools import islice
 import json
+import queue
+import threading
+import time
 
-from .config import DB_PATH
+from .config import (
+    DB_PATH, WRITE_BATCH_SIZE, WRITE_FLUSH_INTERVAL, WRITE_MAX_RETRIES, WRITE_RETRY_DELAY,
+    DB_BUSY_TIMEOUT, DB_CACHE_SIZE_KB, DB_MMAP_SIZE, DB_STATEMENT_CACHE_SIZE,
+    RETENTION_DAYS, COMPACT_CHUNK_SIZE, READ_BATCH_SIZE
+)
+from .aggregate import Aggregate
+from .blobs import DiffBlob, compress_diff, decompress_diff
+from .migrations import migrate
 
 
-class Database:
-    """SQLite database manager for DevPulse"""
+INSERT_CHANGE_SQL = """
+    INSERT INTO file_changes 
+    (filename, filepath, lines_added, lines_removed, lines_modified,
+     git_branch, commit_message, diff_hash, file_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_BLOB_SQL = """
+    INSERT OR IGNORE INTO diff_blobs (hash, codec, size, data)
+    VALUES (?, ?, ?, ?)
+"""
+
+IMPORT_CHANGE_SQL = """
+    INSERT INTO file_changes
+    (filename, filepath, timestamp, lines_added, lines_removed, lines_modified,
+     git_branch, commit_message, diff_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_METADATA_SQL = """
+    INSERT INTO file_metadata
+    (change_id, functions_added, functions_modified, functions_removed,
+     classes_added, classes_modified, imports_changed)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# file_changes columns without the diff text; diffs are loaded on demand with load_diff()
+CHANGE_COLUMNS = """
+    id, filename, filepath, timestamp, lines_added, lines_removed, lines_modified,
+    git_branch, commit_message, diff_hash, file_hash, processed
+"""
+
+# file_metadata columns holding JSON lists of symbol names
+METADATA_COLUMNS = (
+    "functions_added", "functions_modified", "functions_removed",
+    "classes_added", "classes_modified", "imports_changed",
+)
+
+
+
+def day_range(date: str) -> tuple[str, str]:
+    """
+    Half-open timestamp range [start, end) covering a YYYY-MM-DD date.
     
-    def __init__(self, db_path: Path = DB_PATH):
+    Comparing the raw column against a range (instead of DATE(timestamp))
+    lets SQLite use the timestamp indexes.
+    """
+    try:
+        day = datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"Invalid date: {date} (expected YYYY-MM-DD)")
+    
+    next_day = day + timedelta(days=1)
+    return day.strftime("%Y-%m-%d"), next_day.strftime("%Y-%m-%d")
+
+
+def _change_params(
+    filename: str,
+    filepath: str,
+    lines_added: int = 0,
+    lines_removed: int = 0,
+    lines_modified: int = 0,
+    git_branch: Optional[str] = None,
+    commit_message: Optional[str] = None,
+    diff_hash: Optional[str] = None,
+    file_hash: Optional[str] = None
+) -> tuple:
+    """Build INSERT parameters for a file change"""
+    return (
+        filename, filepath, lines_added, lines_removed, lines_modified,
+        git_branch, commit_message, diff_hash, file_hash
+    )
+
+
+def _metadata_params(
+    change_id: int,
+    functions_added: List[str] = None,
+    functions_modified: List[str] = None,
+    functions_removed: List[str] = None,
+    classes_added: List[str] = None,
+    classes_modified: List[str] = None,
+    imports_changed: List[str] = None
+) -> tuple:
+    """Build INSERT parameters for privacy mode metadata"""
+    return (
+        change_id,
+        json.dumps(functions_added or []),
+        json.dumps(functions_modified or []),
+        json.dumps(functions_removed or []),
+        json.dumps(classes_added or []),
+        json.dumps(classes_modified or []),
+        json.dumps(imports_changed or [])
+    )
+
+
+def _insert_change(
+    conn: sqlite3.Connection,
+    change: Dict[str, Any],
+    metadata: Optional[Dict[str, Any]] = None
+) -> int:
+    """
+    Insert a change row with its diff blob and optional metadata.
+    
+    The diff may be given as text (diff_content) or already compressed
+    (diff_blob); identical diffs share one blob. Must run inside a
+    transaction.
+    """
+    change = dict(change)
+    diff_content = change.pop('diff_content', None)
+    diff_blob = change.pop('diff_blob', None)
+    
+    if diff_blob is None and diff_content:
+        diff_blob = compress_diff(diff_content)
+    
+    if diff_blob is not None:
+        conn.execute(INSERT_BLOB_SQL, diff_blob)
+        change['diff_hash'] = diff_blob[0]
+    
+    cursor = conn.execute(INSERT_CHANGE_SQL, _change_params(**change))
+    
+    if metadata is not None:
+        conn.execute(INSERT_METADATA_SQL, _metadata_params(cursor.lastrowid, **metadata))
+    
+    return cursor.lastrowid
+
+
+class ConnectionManager:
+    """
+    Thread-aware SQLite connection manager.
+    
+    Each thread gets one reused connection configured for WAL, so readers
+    such as 'devpulse log' never block the watcher's writer. Statements
+    are cached per connection by sqlite3's statement cache.
+    """
+    
+    def __init__(self, db_path: Path):
         self.db_path = db_path
-        self._init_db()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
     
-    def _get_connection(self) -> sqlite3.Connection:
-        """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
+    def get(self) -> sqlite3.Connection:
+        """Get the calling thread's connection, opening it if needed"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+    
+    def release(self):
+        """Close the calling thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        
+        self._local.conn = None
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        conn.close()
+    
+    def close_all(self):
+        """Close every connection opened by this manager"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open and configure a new connection"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=DB_BUSY_TIMEOUT,
+            cached_statements=DB_STATEMENT_CACHE_SIZE,
+            check_same_thread=False  # only so close_all() can run from any thread
+        )
         conn.row_factory = sqlite3.Row
+        
+        # Only takes effect on a new database (or after a full VACUUM),
+        # so it must come before anything creates the file header
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT * 1000)}")
+        conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
         return conn
+
+
+class ChangeWriter:
+    """
+    Single-writer ingestion pipeline.
     
-    def _init_db(self):
-        """Initialize database schema"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
+    Owns one long-lived WAL connection and commits queued change and
+    metadata rows in one transaction per batch, flushing when the batch
+    is full or the flush interval has elapsed.
+    """
+    
+    def __init__(
+        self,
+        connections: "ConnectionManager",
+        batch_size: int = WRITE_BATCH_SIZE,
+        flush_interval: float = WRITE_FLUSH_INTERVAL
+    ):
+        self.connections = connections
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        # Bounded so a stalled disk applies backpressure to the workers
+        self._queue: queue.Queue = queue.Queue(maxsize=self.batch_size * 10)
+        self._thread: Optional[threading.Thread] = None
+        self._stop_marker = object()
+    
+    def start(self):
+        """Start the writer thread"""
+        if self._thread:
+            return
         
-        # File changes table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS file_changes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                filename TEXT NOT NULL,
-                filepath TEXT NOT NULL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                lines_added INTEGER DEFAULT 0,
-                lines_removed INTEGER DEFAULT 0,
-                lines_modified INTEGER DEFAULT 0,
-                git_branch TEXT,
-                commit_message TEXT,
-                diff_content TEXT,
-                file_hash TEXT,
-                processed INTEGER DEFAULT 0,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Watch paths table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS watch_paths (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                path TEXT UNIQUE NOT NULL,
-                active INTEGER DEFAULT 1,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Metadata for privacy mode
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS file_metadata (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                change_id INTEGER NOT NULL,
-                functions_added TEXT,
-                functions_modified TEXT,
-                functions_removed TEXT,
-                classes_added TEXT,
-                classes_modified TEXT,
-                imports_changed TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (change_id) REFERENCES file_changes(id)
-            )
-        """)
-        
-        # Summary logs table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS summary_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date DATE NOT NULL,
-                summary_text TEXT NOT NULL,
-                total_files INTEGER DEFAULT 0,
-                total_lines_added INTEGER DEFAULT 0,
-                total_lines_removed INTEGER DEFAULT 0,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        self._thread = threading.Thread(target=self._run, name="devpulse-writer", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Commit everything queued and stop the writer thread"""
+        if not self._thread:
+            return
         
-        # Create indexes for performance
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_timestamp 
-            ON file_changes(timestamp)
-        """)
+        self._queue.put(self._stop_marker)
+        self._thread.join()
+        self._thread = None
+    
+    def put(self, change: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None):
+        """Queue a change row and its optional metadata"""
+        self._queue.put((change, metadata))
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far is committed"""
+        if not self._thread:
+            return True
         
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_processed 
-            ON file_changes(processed)
-        """)
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+    
+    def _run(self):
+        """Writer loop"""
+        conn = self.connections.get()
+        batch = []
+        waiters = []
+        stopping = False
         
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_date 
-            ON summary_logs(date)
-        """)
+        try:
+            while not stopping:
+                deadline = time.monotonic() + self.flush_interval
+                
+                # Collect until the batch is full, the interval elapses
+                # or someone asks for a flush
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    
+                    if item is self._stop_marker:
+                        stopping = True
+                        break
+                    if isinstance(item, threading.Event):
+                        waiters.append(item)
+                        break
+                    batch.append(item)
+                
+                # A batch that could not be written stays queued for the next
+                # round, and flush() keeps waiting for it
+                if batch and self._write_batch(conn, batch):
+                    batch = []
+                
+                if not batch:
+                    for waiter in waiters:
+                        waiter.set()
+                    waiters = []
+            
+            if batch:
+                print(f"Could not write {len(batch)} change(s) before stopping; they are lost")
+        finally:
+            for waiter in waiters:
+                waiter.set()
+            self.connections.release()
+    
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[tuple]) -> bool:
+        """
+        Insert a batch of changes in a single transaction.
         
-        conn.commit()
-        conn.close()
+        Lock and I/O errors (e.g. "database is locked" after the busy
+        timeout) are retried with backoff; if they persist the batch is
+        kept and False returned. Any other error means a row the database
+        rejects, so the rows are then written one by one and only the bad
+        ones are dropped.
+        """
+        for attempt in range(WRITE_MAX_RETRIES + 1):
+            try:
+                with conn:
+                    for change, metadata in batch:
+                        _insert_change(conn, change, metadata)
+                return True
+            except sqlite3.OperationalError as e:
+                error = e
+                if attempt < WRITE_MAX_RETRIES:
+                    time.sleep(WRITE_RETRY_DELAY * (2 ** attempt))
+            except sqlite3.Error:
+                self._write_rows(conn, batch)
+                return True
+        
+        print(f"Could not write {len(batch)} change(s), will retry: {error}")
+        return False
+    
+    @staticmethod
+    def _write_rows(conn: sqlite3.Connection, batch: List[tuple]):
+        """Insert changes in their own transactions, skipping rows that fail"""
+        for change, metadata in batch:
+            try:
+                with conn:
+                    _insert_change(conn, change, metadata)
+            except sqlite3.Error as e:
+                print(f"Could not write change to {change.get('filepath')}: {e}")
+
+
+class Database:
+    """SQLite database manager for DevPulse"""
+    
+    def __init__(self, db_path: Path = DB_PATH):
+        self.db_path = db_path
+        self.connections = ConnectionManager(db_path)
+        self.writer: Optional[ChangeWriter] = None
+        self._init_db()
+    
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get this thread's database connection"""
+        return self.connections.get()
+    
+    def close(self):
+        """Stop the background writer and close all connections"""
+        self.stop_writer()
+        self.connections.close_all()
+    
+    def _init_db(self):
+        """Initialize or upgrade the database schema"""
+        migrate(self._get_connection())
     
     def add_file_change(
         self,
@@ -115,25 +389,25 @@ class Database:
         git_branch: Optional[str] = None,
         commit_message: Optional[str] = None,
         diff_content: Optional[str] = None,
-        file_hash: Optional[str] = None
+        file_hash: Optional[str] = None,
+        diff_blob: Optional[DiffBlob] = None
     ) -> int:
         """Add a file change record"""
         conn = self._get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute("""
-            INSERT INTO file_changes 
-            (filename, filepath, lines_added, lines_removed, lines_modified,
-             git_branch, commit_message, diff_content, file_hash)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            filename, filepath, lines_added, lines_removed, lines_modified,
-            git_branch, commit_message, diff_content, file_hash
-        ))
-        
-        change_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        with conn:
+            change_id = _insert_change(conn, {
+                'filename': filename,
+                'filepath': filepath,
+                'lines_added': lines_added,
+                'lines_removed': lines_removed,
+                'lines_modified': lines_modified,
+                'git_branch': git_branch,
+                'commit_message': commit_message,
+                'diff_content': diff_content,
+                'diff_blob': diff_blob,
+                'file_hash': file_hash,
+            })
         
         return change_id
     
@@ -149,66 +423,306 @@ class Database:
     ):
         """Add metadata for privacy mode"""
         conn = self._get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute("""
-            INSERT INTO file_metadata
-            (change_id, functions_added, functions_modified, functions_removed,
-             classes_added, classes_modified, imports_changed)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            change_id,
-            json.dumps(functions_added or []),
-            json.dumps(functions_modified or []),
-            json.dumps(functions_removed or []),
-            json.dumps(classes_added or []),
-            json.dumps(classes_modified or []),
-            json.dumps(imports_changed or [])
-        ))
-        
-        conn.commit()
-        conn.close()
+        with conn:
+            conn.execute(INSERT_METADATA_SQL, _metadata_params(
+                change_id, functions_added, functions_modified, functions_removed,
+                classes_added, classes_modified, imports_changed
+            ))
+    
+    def start_writer(
+        self,
+        batch_size: int = WRITE_BATCH_SIZE,
+        flush_interval: float = WRITE_FLUSH_INTERVAL
+    ):
+        """Route queue_file_change() through a batching background writer"""
+        if self.writer:
+            return
+        
+        self.writer = ChangeWriter(self.connections, batch_size, flush_interval)
+        self.writer.start()
+    
+    def stop_writer(self):
+        """Flush pending changes and stop the background writer"""
+        if self.writer:
+            self.writer.stop()
+            self.writer = None
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until all queued changes are committed"""
+        if not self.writer:
+            return True
+        return self.writer.flush(timeout)
+    
+    def queue_file_change(self, metadata: Optional[Dict[str, Any]] = None, **change):
+        """
+        Record a file change and its optional privacy metadata.
+        
+        Goes through the background writer when it is running, otherwise
+        writes immediately.
+        """
+        if self.writer:
+            self.writer.put(change, metadata)
+            return
+        
+        change_id = self.add_file_change(**change)
+        if metadata is not None:
+            self.add_file_metadata(change_id=change_id, **metadata)
+    
+    def get_imported_commits(self, repo: str) -> Set[str]:
+        """Get hashes of commits already imported from a repository"""
+        conn = self._get_connection()
+        rows = conn.execute(
+            "SELECT commit_hash FROM imported_commits WHERE repo = ?", (repo,)
+        )
+        return {row[0] for row in rows}
+    
+    def add_imported_commits(self, repo: str, commits: List[Dict[str, Any]]) -> int:
+        """
+        Bulk insert imported commits and their file changes.
+        
+        Each commit is a dict with hash, timestamp, message, branch and a
+        list of files (filename, filepath, lines_*, diff_blob, metadata).
+        Everything, including the imported_commits markers, is written in
+        one transaction with executemany, so a batch is either fully
+        imported or not at all. Returns the number of change rows.
+        """
+        changes = []
+        blobs = []
+        metadata = []
+        
+        for commit in commits:
+            for change in commit['files']:
+                blob = change.get('diff_blob')
+                if blob is not None:
+                    blobs.append(blob)
+                changes.append((
+                    change['filename'], change['filepath'], commit['timestamp'],
+                    change['lines_added'], change['lines_removed'], change['lines_modified'],
+                    commit['branch'], commit['message'], blob[0] if blob else None
+                ))
+                metadata.append(change.get('metadata'))
+        
+        conn = self._get_connection()
+        with conn:
+            conn.executemany(INSERT_BLOB_SQL, blobs)
+            conn.executemany(IMPORT_CHANGE_SQL, changes)
+            
+            # Nothing else writes inside this transaction, so the new rows
+            # have consecutive ids ending at last_insert_rowid()
+            if any(item is not None for item in metadata):
+                last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                first_id = last_id - len(changes) + 1
+                conn.executemany(INSERT_METADATA_SQL, (
+                    _metadata_params(first_id + offset, **item)
+                    for offset, item in enumerate(metadata) if item is not None
+                ))
+            
+            conn.executemany(
+                "INSERT OR IGNORE INTO imported_commits (repo, commit_hash) VALUES (?, ?)",
+                ((repo, commit['hash']) for commit in commits)
+            )
+        
+        return len(changes)
     
     def get_changes_by_date(
         self, 
         date: str, 
         processed: Optional[bool] = None
     ) -> List[Dict[str, Any]]:
-        """Get file changes for a specific date"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        """Get file changes for a specific date (see iter_changes() to stream them)"""
+        return list(self.iter_changes(date, processed, with_diffs=True))
+    
+    def iter_changes(
+        self,
+        date: Optional[str] = None,
+        processed: Optional[bool] = None,
+        with_diffs: bool = False,
+        max_id: Optional[int] = None,
+        batch_size: int = READ_BATCH_SIZE
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield file changes oldest first, fetching batch_size rows at a time.
         
-        query = """
-            SELECT * FROM file_changes 
-            WHERE DATE(timestamp) = ?
+        Rows leave out the diff text unless with_diffs is set; they keep
+        diff_hash, so a consumer can load_diff() just the changes it needs.
+        max_id (from get_last_change_id()) leaves out changes recorded
+        after it, so a day can be read more than once and marked processed
+        with mark_processed() as the same set of changes while the watcher
+        keeps writing.
         """
-        params = [date]
+        conn = self._get_connection()
+        where, params = self._change_filters(date, processed, max_id)
+        columns = CHANGE_COLUMNS + ", diff_content" if with_diffs else CHANGE_COLUMNS
         
+        cursor = conn.execute(
+            f"SELECT {columns} FROM file_changes {where} ORDER BY timestamp, id", params
+        )
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                changes = [dict(row) for row in rows]
+                if with_diffs:
+                    for change, diff in zip(changes, self.load_diffs(changes)):
+                        change['diff_content'] = diff
+                yield from changes
+        finally:
+            cursor.close()
+    
+    def with_metadata(
+        self,
+        changes: Iterable[Dict[str, Any]],
+        batch_size: int = READ_BATCH_SIZE
+    ) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, List[str]]]]]:
+        """Pair each change with its privacy mode metadata, looked up a batch at a time"""
+        changes = iter(changes)
+        while True:
+            batch = list(islice(changes, batch_size))
+            if not batch:
+                return
+            metadata = self.get_metadata([c['id'] for c in batch if c.get('id') is not None])
+            for change in batch:
+                yield change, metadata.get(change.get('id'))
+    
+    def count_changes(
+        self,
+        date: Optional[str] = None,
+        processed: Optional[bool] = None,
+        max_id: Optional[int] = None
+    ) -> int:
+        """Number of changes iter_changes() would yield"""
+        conn = self._get_connection()
+        where, params = self._change_filters(date, processed, max_id)
+        return conn.execute(f"SELECT COUNT(*) FROM file_changes {where}", params).fetchone()[0]
+    
+    def get_last_change_id(self) -> int:
+        """Id of the newest change (0 if there are none)"""
+        conn = self._get_connection()
+        return conn.execute("SELECT COALESCE(MAX(id), 0) FROM file_changes").fetchone()[0]
+    
+    @staticmethod
+    def _change_filters(
+        date: Optional[str],
+        processed: Optional[bool],
+        max_id: Optional[int]
+    ) -> Tuple[str, List[Any]]:
+        """WHERE clause and parameters selecting file_changes rows"""
+        filters, params = [], []
+        if date:
+            start, end = day_range(date)
+            filters.append("timestamp >= ? AND timestamp < ?")
+            params.extend([start, end])
         if processed is not None:
-            query += " AND processed = ?"
+            filters.append("processed = ?")
             params.append(1 if processed else 0)
+        if max_id is not None:
+            filters.append("id <= ?")
+            params.append(max_id)
+        return (f"WHERE {' AND '.join(filters)}" if filters else ""), params
+    
+    def get_metadata(self, change_ids: List[int]) -> Dict[int, Dict[str, List[str]]]:
+        """Get privacy mode metadata for changes, keyed by change id"""
+        conn = self._get_connection()
+        metadata = {}
         
-        query += " ORDER BY timestamp ASC"
+        # Chunked to stay under SQLite's bound-parameter limit
+        for i in range(0, len(change_ids), 500):
+            chunk = change_ids[i:i + 500]
+            placeholders = ",".join(["?" for _ in chunk])
+            rows = conn.execute(f"""
+                SELECT change_id, functions_added, functions_modified, functions_removed,
+                       classes_added, classes_modified, imports_changed
+                FROM file_metadata WHERE change_id IN ({placeholders})
+            """, chunk)
+            for row in rows:
+                metadata[row["change_id"]] = {
+                    key: json.loads(row[key] or "[]") for key in row.keys() if key != "change_id"
+                }
         
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        conn.close()
+        return metadata
+    
+    def get_diff(self, diff_hash: str, max_chars: Optional[int] = None) -> str:
+        """Load a stored diff, optionally only its first max_chars characters"""
+        conn = self._get_connection()
+        row = conn.execute(
+            "SELECT codec, data FROM diff_blobs WHERE hash = ?", (diff_hash,)
+        ).fetchone()
         
-        return [dict(row) for row in rows]
+        if row is None:
+            return ""
+        return decompress_diff(row["codec"], row["data"], max_chars)
+    
+    def get_diffs(self, diff_hashes: List[str], max_chars: Optional[int] = None) -> Dict[str, str]:
+        """Load many stored diffs at once, keyed by hash"""
+        conn = self._get_connection()
+        diffs = {}
+        
+        # Chunked to stay under SQLite's bound-parameter limit
+        for i in range(0, len(diff_hashes), 500):
+            chunk = diff_hashes[i:i + 500]
+            placeholders = ",".join(["?" for _ in chunk])
+            rows = conn.execute(
+                f"SELECT hash, codec, data FROM diff_blobs WHERE hash IN ({placeholders})", chunk
+            )
+            for row in rows:
+                diffs[row["hash"]] = decompress_diff(row["codec"], row["data"], max_chars)
+        
+        return diffs
+    
+    def load_diffs(self, changes: List[Dict[str, Any]], max_chars: Optional[int] = None) -> List[str]:
+        """load_diff() for a batch of change rows, with one query per 500 stored diffs"""
+        hashes = list({
+            change['diff_hash'] for change in changes
+            if not change.get('diff_content') and change.get('diff_hash')
+        })
+        stored = self.get_diffs(hashes, max_chars) if hashes else {}
+        
+        diffs = []
+        for change in changes:
+            if change.get('diff_content'):
+                diff = change['diff_content']
+                diffs.append(diff if max_chars is None else diff[:max_chars])
+            else:
+                diffs.append(stored.get(change.get('diff_hash'), ""))
+        return diffs
+    
+    def load_diff(self, change: Dict[str, Any], max_chars: Optional[int] = None) -> str:
+        """Get the diff text for a change row (inline or from diff_blobs)"""
+        if change.get('diff_content'):
+            diff = change['diff_content']
+            return diff if max_chars is None else diff[:max_chars]
+        
+        if change.get('diff_hash'):
+            return self.get_diff(change['diff_hash'], max_chars)
+        
+        return ""
     
     def mark_as_processed(self, change_ids: List[int]):
         """Mark changes as processed"""
         conn = self._get_connection()
-        cursor = conn.cursor()
         
-        placeholders = ",".join(["?" for _ in change_ids])
-        cursor.execute(
-            f"UPDATE file_changes SET processed = 1 WHERE id IN ({placeholders})",
-            change_ids
-        )
+        with conn:
+            # Chunked to stay under SQLite's bound-parameter limit
+            for i in range(0, len(change_ids), 500):
+                chunk = change_ids[i:i + 500]
+                placeholders = ",".join(["?" for _ in chunk])
+                conn.execute(
+                    f"UPDATE file_changes SET processed = 1 WHERE id IN ({placeholders})",
+                    chunk
+                )
+    
+    def mark_processed(self, date: str, max_id: int) -> int:
+        """Mark a day's unprocessed changes up to max_id as processed; returns count"""
+        conn = self._get_connection()
+        start, end = day_range(date)
         
-        conn.commit()
-        conn.close()
+        with conn:
+            return conn.execute("""
+                UPDATE file_changes SET processed = 1
+                WHERE timestamp >= ? AND timestamp < ? AND processed = 0 AND id <= ?
+            """, (start, end, max_id)).rowcount
     
     def add_summary_log(
         self,
@@ -220,25 +734,20 @@ class Database:
     ):
         """Add a summary log entry"""
         conn = self._get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute("""
-            INSERT INTO summary_logs
-            (date, summary_text, total_files, total_lines_added, total_lines_removed)
-            VALUES (?, ?, ?, ?, ?)
-        """, (date, summary_text, total_files, total_lines_added, total_lines_removed))
-        
-        conn.commit()
-        conn.close()
+        with conn:
+            conn.execute("""
+                INSERT INTO summary_logs
+                (date, summary_text, total_files, total_lines_added, total_lines_removed)
+                VALUES (?, ?, ?, ?, ?)
+            """, (date, summary_text, total_files, total_lines_added, total_lines_removed))
     
     def add_watch_path(self, path: str) -> bool:
         """Add a path to watch list"""
+        conn = self._get_connection()
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO watch_paths (path) VALUES (?)", (path,))
-            conn.commit()
-            conn.close()
+            with conn:
+                conn.execute("INSERT INTO watch_paths (path) VALUES (?)", (path,))
             return True
         except sqlite3.IntegrityError:
             return False  # Path already exists
@@ -249,56 +758,249 @@ class Database:
         cursor = conn.cursor()
         cursor.execute("SELECT path FROM watch_paths WHERE active = 1")
         paths = [row["path"] for row in cursor.fetchall()]
-        conn.close()
         return paths
     
     def remove_watch_path(self, path: str):
         """Remove a watch path"""
         conn = self._get_connection()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE watch_paths SET active = 0 WHERE path = ?", (path,))
-        conn.commit()
-        conn.close()
+        with conn:
+            conn.execute("UPDATE watch_paths SET active = 0 WHERE path = ?", (path,))
     
     def clear_history(self):
         """Clear all history data"""
         conn = self._get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute("DELETE FROM file_changes")
-        cursor.execute("DELETE FROM file_metadata")
-        cursor.execute("DELETE FROM summary_logs")
+        with conn:
+            conn.execute("DELETE FROM file_changes")
+            conn.execute("DELETE FROM file_metadata")
+            conn.execute("DELETE FROM diff_blobs")
+            conn.execute("DELETE FROM file_change_rollups")
+            conn.execute("DELETE FROM summary_logs")
+            conn.execute("DELETE FROM imported_commits")
+    
+    def compact(
+        self,
+        older_than_days: int = RETENTION_DAYS,
+        chunk_size: int = COMPACT_CHUNK_SIZE,
+        vacuum: bool = False
+    ) -> Dict[str, int]:
+        """
+        Roll old processed changes into per-day, per-file rollups.
         
-        conn.commit()
-        conn.close()
+        Raw rows, their metadata and any diff blobs no longer referenced
+        are deleted a chunk at a time, then freed pages are returned to
+        the OS with an incremental vacuum. With vacuum=True a full VACUUM
+        runs instead, which also converts databases created before
+        incremental auto-vacuum was enabled.
+        """
+        # Timestamps are stored in UTC by CURRENT_TIMESTAMP
+        cutoff = (datetime.utcnow() - timedelta(days=older_than_days)).strftime("%Y-%m-%d")
+        conn = self._get_connection()
+        result = {'changes_compacted': 0, 'blobs_removed': 0, 'pages_freed': 0}
+        
+        # One chunk of old processed rows, in index order
+        chunk_ids = """
+            SELECT id FROM file_changes
+            WHERE processed = 1 AND timestamp < ?
+            ORDER BY timestamp, id
+            LIMIT ?
+        """
+        params = (cutoff, chunk_size)
+        
+        while True:
+            with conn:
+                hashes = [
+                    row["diff_hash"] for row in conn.execute(
+                        f"SELECT DISTINCT diff_hash FROM file_changes "
+                        f"WHERE diff_hash IS NOT NULL AND id IN ({chunk_ids})",
+                        params
+                    )
+                ]
+                
+                conn.execute(f"""
+                    INSERT INTO file_change_rollups
+                    (day, filepath, filename, total_changes,
+                     lines_added, lines_removed, lines_modified)
+                    SELECT DATE(timestamp), filepath, MAX(filename), COUNT(*),
+                           SUM(lines_added), SUM(lines_removed), SUM(lines_modified)
+                    FROM file_changes
+                    WHERE id IN ({chunk_ids})
+                    GROUP BY DATE(timestamp), filepath
+                    ON CONFLICT(day, filepath) DO UPDATE SET
+                        total_changes = total_changes + excluded.total_changes,
+                        lines_added = lines_added + excluded.lines_added,
+                        lines_removed = lines_removed + excluded.lines_removed,
+                        lines_modified = lines_modified + excluded.lines_modified
+                """, params)
+                
+                conn.execute(
+                    f"DELETE FROM file_metadata WHERE change_id IN ({chunk_ids})", params
+                )
+                deleted = conn.execute(
+                    f"DELETE FROM file_changes WHERE id IN ({chunk_ids})", params
+                ).rowcount
+                
+                for hash_value in hashes:
+                    result['blobs_removed'] += conn.execute("""
+                        DELETE FROM diff_blobs WHERE hash = ?
+                        AND NOT EXISTS (SELECT 1 FROM file_changes WHERE diff_hash = ?)
+                    """, (hash_value, hash_value)).rowcount
+            
+            result['changes_compacted'] += deleted
+            if deleted < chunk_size:
+                break
+        
+        freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if vacuum:
+            conn.execute("VACUUM")
+        else:
+            conn.execute("PRAGMA incremental_vacuum").fetchall()
+        result['pages_freed'] = freelist - conn.execute("PRAGMA freelist_count").fetchone()[0]
+        
+        return result
     
     def get_statistics(self, date: Optional[str] = None) -> Dict[str, Any]:
-        """Get statistics for a date or overall"""
+        """Get statistics for a date or overall (including compacted history)"""
         conn = self._get_connection()
         cursor = conn.cursor()
         
         if date:
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_changes,
-                    COUNT(DISTINCT filepath) as unique_files,
-                    SUM(lines_added) as total_added,
-                    SUM(lines_removed) as total_removed,
-                    SUM(lines_modified) as total_modified
-                FROM file_changes
-                WHERE DATE(timestamp) = ?
-            """, (date,))
+            start, end = day_range(date)
+            changes_filter = "WHERE timestamp >= ? AND timestamp < ?"
+            rollups_filter = "WHERE day = ?"
+            params = (start, end, start)
         else:
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_changes,
-                    COUNT(DISTINCT filepath) as unique_files,
-                    SUM(lines_added) as total_added,
-                    SUM(lines_removed) as total_removed,
-                    SUM(lines_modified) as total_modified
+            changes_filter = rollups_filter = ""
+            params = ()
+        
+        cursor.execute(f"""
+            SELECT 
+                COALESCE(SUM(changes), 0) as total_changes,
+                COUNT(DISTINCT filepath) as unique_files,
+                SUM(lines_added) as total_added,
+                SUM(lines_removed) as total_removed,
+                SUM(lines_modified) as total_modified
+            FROM (
+                SELECT filepath, 1 as changes, lines_added, lines_removed, lines_modified
                 FROM file_changes
-            """)
+                {changes_filter}
+                UNION ALL
+                SELECT filepath, total_changes, lines_added, lines_removed, lines_modified
+                FROM file_change_rollups
+                {rollups_filter}
+            )
+        """, params)
         
         stats = dict(cursor.fetchone())
-        conn.close()
         return stats
+    
+    def aggregate(
+        self,
+        date: Optional[str] = None,
+        processed: Optional[bool] = None,
+        max_id: Optional[int] = None
+    ) -> Aggregate:
+        """
+        Totals by file, directory, branch and hour for a date or overall.
+        
+        Grouped in SQL, so no change rows are loaded. Compacted history
+        counts towards file and directory totals (it has no branch or hour)
+        unless only unprocessed changes are asked for.
+        """
+        conn = self._get_connection()
+        where, params = self._change_filters(date, processed, max_id)
+        
+        # Only columns of idx_timestamp_filepath, so the table is not read
+        query = f"""
+            SELECT filepath, COALESCE(NULLIF(git_branch, ''), 'N/A') AS git_branch,
+                   SUBSTR(timestamp, 12, 2) AS hour, COUNT(*) AS changes,
+                   COALESCE(SUM(lines_added), 0) AS added, COALESCE(SUM(lines_removed), 0) AS removed
+            FROM file_changes
+            {where}
+            GROUP BY filepath, COALESCE(NULLIF(git_branch, ''), 'N/A'), hour
+        """
+        if processed is not False:
+            query += f"""
+                UNION ALL
+                SELECT filepath, NULL, NULL, SUM(total_changes),
+                       COALESCE(SUM(lines_added), 0), COALESCE(SUM(lines_removed), 0)
+                FROM file_change_rollups
+                {"WHERE day = ?" if date else ""}
+                GROUP BY filepath
+            """
+            if date:
+                params.append(day_range(date)[0])
+        
+        result = Aggregate()
+        for row in conn.execute(query, params):
+            result.add(
+                row["filepath"], os.path.basename(row["filepath"]), row["git_branch"], row["hour"],
+                row["changes"], row["added"], row["removed"]
+            )
+        return result
+    
+    def file_activity(
+        self,
+        date: Optional[str] = None,
+        processed: Optional[bool] = None,
+        max_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Change totals per branch, file and commit message, in order of
+        first change. Grouped in SQL, so no change rows are loaded.
+        """
+        conn = self._get_connection()
+        where, params = self._change_filters(date, processed, max_id)
+        
+        # Grouped on the bare columns; the branch is normalized on the (far fewer) groups
+        rows = conn.execute(f"""
+            SELECT git_branch, filepath, commit_message, COUNT(*) AS changes,
+                   COALESCE(SUM(lines_added), 0) AS added, COALESCE(SUM(lines_removed), 0) AS removed
+            FROM file_changes
+            {where}
+            GROUP BY filepath, git_branch, commit_message
+            ORDER BY MIN(id)
+        """, params)
+        
+        activity = []
+        for row in rows:
+            row = dict(row)
+            row["git_branch"] = row["git_branch"] or "N/A"
+            activity.append(row)
+        return activity
+    
+    def file_symbols(
+        self,
+        date: Optional[str] = None,
+        processed: Optional[bool] = None,
+        max_id: Optional[int] = None
+    ) -> Dict[Tuple[str, str], Dict[str, List[str]]]:
+        """
+        Privacy mode symbol names per (branch, filepath), each name once in
+        order of first appearance. The JSON lists are unpacked in SQL.
+        """
+        conn = self._get_connection()
+        where, params = self._change_filters(date, processed, max_id)
+        
+        kinds = " UNION ALL ".join(f"SELECT '{column}' AS kind" for column in METADATA_COLUMNS)
+        lists = " ".join(f"WHEN '{column}' THEN m.{column}" for column in METADATA_COLUMNS)
+        # CROSS JOIN keeps the day's changes as the outer loop, so they are read once
+        rows = conn.execute(f"""
+            SELECT c.git_branch, c.filepath, k.kind, j.value AS name
+            FROM (
+                SELECT id, filepath, COALESCE(NULLIF(git_branch, ''), 'N/A') AS git_branch
+                FROM file_changes
+                {where}
+            ) c
+            CROSS JOIN file_metadata m ON m.change_id = c.id
+            CROSS JOIN ({kinds}) k
+            CROSS JOIN json_each(CASE k.kind {lists} END) j
+            GROUP BY c.git_branch, c.filepath, k.kind, j.value
+            ORDER BY MIN(c.id)
+        """, params)
+        
+        symbols: Dict[Tuple[str, str], Dict[str, List[str]]] = {}
+        for row in rows:
+            found = symbols.setdefault((row["git_branch"], row["filepath"]), {})
+            found.setdefault(row["kind"], []).append(row["name"])
+        return symbols
@@ -0,0 +1,312 @@
+"""
+Line diff backends for DiffAnalyzer.get_diff
+"""
+import difflib
+from bisect import bisect_left
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .config import DIFF_BACKEND, DIFF_MAX_LINES, DIFF_MAX_COST, DIFF_CONTEXT_LINES
+
+
+# (diff_text, lines_added, lines_removed, lines_modified)
+DiffResult = Tuple[str, int, int, int]
+
+# (a_start, a_end, b_start, b_end) of one changed region
+Block = Tuple[int, int, int, int]
+
+
+def _format_range(start: int, stop: int) -> str:
+    """Unified diff range, as formatted by difflib"""
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return str(beginning)
+    if not length:
+        beginning -= 1
+    return f'{beginning},{length}'
+
+
+def format_unified(
+    old_lines: Sequence[str],
+    new_lines: Sequence[str],
+    blocks: List[Block],
+    context: int = DIFF_CONTEXT_LINES
+) -> DiffResult:
+    """Render changed blocks as a unified diff and count lines in the same pass"""
+    if not blocks:
+        return '', 0, 0, 0
+    
+    out = ['--- ', '+++ ']
+    added = removed = 0
+    n, m = len(old_lines), len(new_lines)
+    
+    # Blocks closer than 2 * context lines share a hunk
+    hunks = [[blocks[0]]]
+    for block in blocks[1:]:
+        if block[0] - hunks[-1][-1][1] <= 2 * context:
+            hunks[-1].append(block)
+        else:
+            hunks.append([block])
+    
+    for hunk in hunks:
+        a_start = max(0, hunk[0][0] - context)
+        b_start = max(0, hunk[0][2] - context)
+        a_end = min(n, hunk[-1][1] + context)
+        b_end = min(m, hunk[-1][3] + context)
+        out.append(f'@@ -{_format_range(a_start, a_end)} +{_format_range(b_start, b_end)} @@')
+        
+        i = a_start
+        for a1, a2, b1, b2 in hunk:
+            out.extend(' ' + line for line in old_lines[i:a1])
+            out.extend('-' + line for line in old_lines[a1:a2])
+            out.extend('+' + line for line in new_lines[b1:b2])
+            removed += a2 - a1
+            added += b2 - b1
+            i = a2
+        out.extend(' ' + line for line in old_lines[i:a_end])
+    
+    return '\n'.join(out), added, removed, min(added, removed)
+
+
+def stats_only(old_lines: Sequence, new_lines: Sequence) -> DiffResult:
+    """Count added/removed lines as a multiset difference, without a diff"""
+    old_counts = Counter(old_lines)
+    new_counts = Counter(new_lines)
+    added = sum((new_counts - old_counts).values())
+    removed = sum((old_counts - new_counts).values())
+    return '', added, removed, min(added, removed)
+
+
+def _myers(a: Sequence[int], b: Sequence[int], max_cost: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Myers' O((N+M)D) shortest edit script.
+    
+    Returns the matched (i, j) pairs, or None if more than max_cost
+    edits are needed.
+    """
+    n, m = len(a), len(b)
+    max_d = min(n + m, max_cost)
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3)
+    trace = []
+    
+    for d in range(max_d + 1):
+        # Keep only the diagonals reachable in this round for backtracking
+        trace.append(v[offset - d - 1:offset + d + 2])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m)
+    
+    return None
+
+
+def _backtrack(trace: List[List[int]], x: int, y: int) -> List[Tuple[int, int]]:
+    """Walk a Myers trace back from (x, y) and collect the diagonal moves"""
+    matches = []
+    
+    for d in range(len(trace) - 1, 0, -1):
+        v = trace[d]
+        k = x - y
+        # v holds diagonals -d-1 .. d+1
+        if k == -d or (k != d and v[k - 1 + d + 1] < v[k + 1 + d + 1]):
+            prev_k = k + 1
+            start_x = v[prev_k + d + 1]
+        else:
+            prev_k = k - 1
+            start_x = v[prev_k + d + 1] + 1
+        
+        start_y = start_x - k
+        while x > start_x and y > start_y:
+            x -= 1
+            y -= 1
+            matches.append((x, y))
+        
+        x = v[prev_k + d + 1]
+        y = x - prev_k
+    
+    while x > 0 and y > 0:
+        x -= 1
+        y -= 1
+        matches.append((x, y))
+    
+    matches.reverse()
+    return matches
+
+
+def _unique_anchors(
+    a: Sequence[int], b: Sequence[int],
+    alo: int, ahi: int, blo: int, bhi: int
+) -> List[Tuple[int, int]]:
+    """Lines unique on both sides, reduced to their longest common order (patience)"""
+    a_counts = Counter(a[alo:ahi])
+    b_positions: Dict[int, int] = {}
+    for j in range(blo, bhi):
+        line = b[j]
+        b_positions[line] = -1 if line in b_positions else j
+    
+    pairs = [
+        (i, b_positions[a[i]]) for i in range(alo, ahi)
+        if a_counts[a[i]] == 1 and b_positions.get(a[i], -1) >= 0
+    ]
+    if not pairs:
+        return []
+    
+    # Longest increasing subsequence of b positions
+    tails: List[int] = []
+    tail_index: List[int] = []
+    previous = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        pos = bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[pos] = j
+            tail_index[pos] = index
+        previous[index] = tail_index[pos - 1] if pos else -1
+    
+    anchors = []
+    index = tail_index[-1]
+    while index >= 0:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def diff_blocks(a: Sequence[int], b: Sequence[int], max_cost: int = DIFF_MAX_COST) -> List[Block]:
+    """
+    Changed blocks between two sequences of interned lines.
+    
+    Common prefixes and suffixes are trimmed, lines unique to both sides
+    anchor the rest (patience diff), and what remains between anchors is
+    diffed with Myers. A region that needs more than max_cost edits is
+    reported as one replaced block instead of being diffed exactly.
+    """
+    blocks: List[Block] = []
+    stack = [(0, len(a), 0, len(b))]
+    
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+        
+        if alo == ahi or blo == bhi:
+            if alo < ahi or blo < bhi:
+                blocks.append((alo, ahi, blo, bhi))
+            continue
+        
+        anchors = _unique_anchors(a, b, alo, ahi, blo, bhi)
+        if anchors:
+            for i, j in anchors:
+                stack.append((alo, i, blo, j))
+                alo, blo = i + 1, j + 1
+            stack.append((alo, ahi, blo, bhi))
+            continue
+        
+        matches = _myers(a[alo:ahi], b[blo:bhi], max_cost)
+        if matches is None:
+            blocks.append((alo, ahi, blo, bhi))
+            continue
+        
+        i, j = alo, blo
+        for mi, mj in matches:
+            if mi + alo > i or mj + blo > j:
+                blocks.append((i, mi + alo, j, mj + blo))
+            i, j = mi + alo + 1, mj + blo + 1
+        if i < ahi or j < bhi:
+            blocks.append((i, ahi, j, bhi))
+    
+    # Merge blocks that touch (e.g. across an anchor region with no matches)
+    blocks.sort()
+    merged: List[Block] = []
+    for block in blocks:
+        if merged and merged[-1][1] == block[0] and merged[-1][3] == block[2]:
+            merged[-1] = (merged[-1][0], block[1], merged[-1][2], block[3])
+        else:
+            merged.append(block)
+    return merged
+
+
+def patience_blocks(old_lines: Sequence[str], new_lines: Sequence[str]) -> Optional[List[Block]]:
+    """Blocks from a patience/Myers diff on interned line ids; None if the change is huge"""
+    # Compare small ints instead of strings
+    ids: Dict[str, int] = {}
+    a = [ids.setdefault(line, len(ids)) for line in old_lines]
+    b = [ids.setdefault(line, len(ids)) for line in new_lines]
+    
+    # Size the changed region without the common head and tail
+    head = 0
+    limit = min(len(a), len(b))
+    while head < limit and a[head] == b[head]:
+        head += 1
+    tail = 0
+    while tail < limit - head and a[-1 - tail] == b[-1 - tail]:
+        tail += 1
+    
+    if (len(a) - head - tail) + (len(b) - head - tail) > DIFF_MAX_LINES:
+        return None
+    
+    return diff_blocks(a, b)
+
+
+def difflib_blocks(old_lines: Sequence[str], new_lines: Sequence[str]) -> Optional[List[Block]]:
+    """Blocks from difflib.SequenceMatcher"""
+    return [
+        (i1, i2, j1, j2)
+        for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old_lines, new_lines).get_opcodes()
+        if tag != 'equal'
+    ]
+
+
+BACKENDS: Dict[str, Callable[[Sequence[str], Sequence[str]], Optional[List[Block]]]] = {
+    'patience': patience_blocks,
+    'difflib': difflib_blocks,
+}
+
+
+def diff_lines(
+    old_lines: Sequence[str],
+    new_lines: Sequence[str],
+    backend: str = DIFF_BACKEND
+) -> Optional[List[Block]]:
+    """Changed blocks between two lists of lines, or None if too large to diff"""
+    try:
+        blocks = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown diff backend: {backend} (expected one of {', '.join(BACKENDS)})")
+    return blocks(old_lines, new_lines)
+
+
+def render(
+    old_lines: Sequence[str],
+    new_lines: Sequence[str],
+    blocks: Optional[List[Block]]
+) -> DiffResult:
+    """Unified diff text and counts for diff_lines() output"""
+    if blocks is None:
+        return stats_only(old_lines, new_lines)
+    return format_unified(old_lines, new_lines, blocks)
+
+
+def get_diff(old_content: str, new_content: str, backend: str = DIFF_BACKEND) -> DiffResult:
+    """Diff two texts with the configured backend"""
+    old_lines = old_content.splitlines()
+    new_lines = new_content.splitlines()
+    return render(old_lines, new_lines, diff_lines(old_lines, new_lines, backend))
@@ -0,0 +1,103 @@
+"""
+Path filtering for the watcher
+"""
+import fnmatch
+import os
+import re
+from typing import Dict, List, Optional
+
+from .config import EXCLUSION_PATTERNS, TRACKED_EXTENSIONS
+from .gitignore import GitIgnoreMatcher
+
+
+class ExclusionMatcher:
+    """
+    Compiled matcher for EXCLUSION_PATTERNS and TRACKED_EXTENSIONS.
+    
+    All patterns are folded into a single regex, and the decision for
+    each directory is cached, so checking a path costs one regex match on
+    the filename plus a dict lookup for its directory. Paths that pass are
+    then checked against the project's ignore files, if a GitIgnoreMatcher
+    is given.
+    """
+    
+    def __init__(
+        self,
+        patterns: List[str] = EXCLUSION_PATTERNS,
+        extensions: List[str] = TRACKED_EXTENSIONS,
+        cache_size: int = 65536,
+        gitignore: Optional[GitIgnoreMatcher] = None
+    ):
+        flags = re.IGNORECASE if os.path.normcase("A") == "a" else 0
+        self._regex = re.compile(
+            "|".join(fnmatch.translate(pattern) for pattern in patterns) or r"(?!)",
+            flags
+        )
+        self._extensions = frozenset(extensions)
+        self._dir_cache: Dict[str, bool] = {}
+        self._cache_size = cache_size
+        self.gitignore = gitignore
+    
+    def is_excluded_name(self, name: str) -> bool:
+        """Check a single file or directory name against the patterns"""
+        return self._regex.match(name) is not None
+    
+    def is_excluded_dir(self, dirpath: str) -> bool:
+        """Check whether a directory or any of its parents is excluded"""
+        cached = self._dir_cache.get(dirpath)
+        if cached is not None:
+            return cached
+        
+        # Walk up until we hit a cached ancestor or the root
+        chain = []
+        path = dirpath
+        excluded = False
+        while True:
+            cached = self._dir_cache.get(path)
+            if cached is not None:
+                excluded = cached
+                break
+            
+            parent, name = os.path.split(path)
+            chain.append(path)
+            if name and self.is_excluded_name(name):
+                excluded = True
+                break
+            if not parent or parent == path:
+                break
+            path = parent
+        
+        if len(self._dir_cache) + len(chain) > self._cache_size:
+            self._dir_cache.clear()
+        
+        # Everything below an excluded directory is excluded too
+        for path in chain:
+            self._dir_cache[path] = excluded
+        return excluded
+    
+    def should_ignore(self, filepath: str) -> bool:
+        """Check if a file should be ignored"""
+        if self.is_excluded(filepath):
+            return True
+        
+        return self.gitignore is not None and self.gitignore.is_ignored(filepath)
+    
+    def is_excluded(self, filepath: str) -> bool:
+        """should_ignore() without the ignore files, so it never touches the disk"""
+        dirpath, name = os.path.split(filepath)
+        
+        # Check if extension is tracked
+        if self._extensions and os.path.splitext(name)[1] not in self._extensions:
+            return True
+        
+        if self.is_excluded_name(name):
+            return True
+        
+        return self.is_excluded_dir(dirpath)
+    
+    def should_prune(self, dirpath: str) -> bool:
+        """Check if nothing below a directory can be tracked"""
+        if self.is_excluded_dir(dirpath):
+            return True
+        
+        return self.gitignore is not None and self.gitignore.is_ignored(dirpath, is_dir=True)
@@ -0,0 +1,350 @@
+"""
+.gitignore-style ignore rules for the watcher
+
+Evaluates nested .gitignore files, .git/info/exclude and .devpulseignore
+the way git does: later rules override earlier ones, deeper files
+override shallower ones, and nothing below an ignored directory can be
+re-included.
+"""
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .config import IGNORE_FILE_NAMES, IGNORE_RECHECK_SECONDS
+
+
+class IgnoreRule:
+    """A single parsed ignore pattern"""
+    
+    def __init__(self, regex: "re.Pattern", negate: bool, dir_only: bool, anchored: bool):
+        self.regex = regex
+        self.negate = negate
+        self.dir_only = dir_only
+        self.anchored = anchored
+    
+    def matches(self, relpath: str, name: str, is_dir: bool) -> bool:
+        """Check a path relative to the rule's base directory"""
+        if self.dir_only and not is_dir:
+            return False
+        return self.regex.fullmatch(relpath if self.anchored else name) is not None
+
+
+def _translate(pattern: str) -> str:
+    """Translate a gitignore glob into a regex"""
+    i, n = 0, len(pattern)
+    res = []
+    
+    while i < n:
+        c = pattern[i]
+        
+        if c == '*':
+            if pattern[i:i + 2] == '**':
+                if pattern[i + 2:i + 3] == '/':
+                    # "**/" matches zero or more leading directories
+                    res.append('(?:.*/)?')
+                    i += 3
+                else:
+                    res.append('.*')
+                    i += 2
+                continue
+            res.append('[^/]*')
+        elif c == '?':
+            res.append('[^/]')
+        elif c == '[':
+            j = i + 1
+            if j < n and pattern[j] in '!^':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            while j < n and pattern[j] != ']':
+                j += 1
+            
+            if j >= n:
+                res.append('\\[')
+            else:
+                body = pattern[i + 1:j].replace('\\', '\\\\')
+                if body[0] in '!^':
+                    body = '^' + body[1:]
+                res.append(f'[{body}]')
+                i = j
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            res.append(re.escape(pattern[i]))
+        else:
+            res.append(re.escape(c))
+        
+        i += 1
+    
+    return ''.join(res)
+
+
+def parse_rules(text: str) -> List[IgnoreRule]:
+    """Parse the contents of an ignore file"""
+    rules = []
+    
+    for line in text.splitlines():
+        # Trailing spaces are ignored unless escaped
+        stripped = line.rstrip(' ')
+        if stripped.endswith('\\') and len(stripped) < len(line):
+            stripped += ' '
+        line = stripped
+        
+        if not line or line.startswith('#'):
+            continue
+        
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+        elif line.startswith('\\!') or line.startswith('\\#'):
+            line = line[1:]
+        
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+        
+        # A slash anywhere but the end anchors the pattern to its directory
+        anchored = '/' in line
+        line = line.lstrip('/')
+        
+        rules.append(IgnoreRule(re.compile(_translate(line), re.DOTALL), negate, dir_only, anchored))
+    
+    return rules
+
+
+class GitIgnoreMatcher:
+    """
+    Cached evaluator for nested ignore files.
+    
+    Parsed rules are cached per ignore file and decisions per directory.
+    When an ignore file changes only that file is re-parsed and only the
+    cached state below its directory is dropped. Files outside the
+    watcher's view (such as .git/info/exclude) are re-checked by mtime at
+    most every IGNORE_RECHECK_SECONDS.
+    
+    Outside a git repository the watch roots take the place of the work
+    tree root: ignore files from the watch root down apply.
+    """
+    
+    def __init__(
+        self,
+        ignore_file_names: Tuple[str, ...] = IGNORE_FILE_NAMES,
+        recheck_seconds: float = IGNORE_RECHECK_SECONDS,
+        roots: Iterable[str] = (),
+        cache_size: int = 65536
+    ):
+        self.ignore_file_names = tuple(ignore_file_names)
+        self.recheck_seconds = recheck_seconds
+        # Deepest first, so the closest watch root wins
+        self.roots = sorted((os.path.normpath(str(root)) for root in roots), key=len, reverse=True)
+        self._cache_size = cache_size
+        self._lock = threading.RLock()
+        # ignore file path -> (mtime_ns or None if missing, rules)
+        self._files: Dict[str, Tuple[Optional[int], List[IgnoreRule]]] = {}
+        # directory -> repository root (or None)
+        self._repo_roots: Dict[str, Optional[str]] = {}
+        # directory -> ignore files that apply to its entries
+        self._chains: Dict[str, List[str]] = {}
+        # directory -> ignored?
+        self._dir_decisions: Dict[str, bool] = {}
+        self._last_check = time.monotonic()
+    
+    def is_ignore_file(self, path: str) -> bool:
+        """Whether a path is one of the ignore files this matcher reads"""
+        return os.path.basename(path) in self.ignore_file_names
+    
+    def is_ignored(self, path: str, is_dir: bool = False) -> bool:
+        """Check whether a file or directory is ignored"""
+        self._maybe_recheck()
+        
+        if is_dir:
+            return self._is_dir_ignored(path)
+        
+        parent = os.path.dirname(path)
+        if self._is_dir_ignored(parent):
+            return True
+        return self._match(path, is_dir=False)
+    
+    def invalidate(self, ignore_file: str):
+        """Re-read an ignore file and drop decisions it may affect"""
+        with self._lock:
+            self._files.pop(ignore_file, None)
+            base = self._base_of(ignore_file)
+            prefix = base.rstrip(os.sep) + os.sep
+            for cache in (self._dir_decisions, self._chains, self._repo_roots):
+                for directory in [d for d in cache if d == base or d.startswith(prefix)]:
+                    del cache[directory]
+    
+    def _remember(self, cache: dict, key: str, value):
+        """Store a cached value, starting over when the cache is full"""
+        if len(cache) >= self._cache_size:
+            cache.clear()
+        cache[key] = value
+    
+    def _base_of(self, ignore_file: str) -> str:
+        """Directory an ignore file's patterns are relative to"""
+        directory = os.path.dirname(ignore_file)
+        # .git/info/exclude applies to the whole work tree
+        if directory.endswith(os.path.join('.git', 'info')):
+            return os.path.dirname(os.path.dirname(directory))
+        return directory
+    
+    def _maybe_recheck(self):
+        """Pick up ignore files that changed without an event"""
+        now = time.monotonic()
+        if now - self._last_check < self.recheck_seconds:
+            return
+        self._last_check = now
+        
+        # Ignore files inside the work tree are reloaded on watcher events
+        with self._lock:
+            stale = [
+                path for path, (mtime, _) in self._files.items()
+                if self._base_of(path) != os.path.dirname(path) and self._mtime(path) != mtime
+            ]
+        for path in stale:
+            self.invalidate(path)
+    
+    @staticmethod
+    def _mtime(path: str) -> Optional[int]:
+        """mtime of a file, or None if it does not exist"""
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+    
+    def _rules(self, ignore_file: str) -> List[IgnoreRule]:
+        """Parsed rules for an ignore file (empty if missing)"""
+        with self._lock:
+            cached = self._files.get(ignore_file)
+            if cached is not None:
+                return cached[1]
+            
+            mtime = self._mtime(ignore_file)
+            rules = []
+            if mtime is not None:
+                try:
+                    with open(ignore_file, 'r', encoding='utf-8', errors='replace') as f:
+                        rules = parse_rules(f.read())
+                except OSError:
+                    pass
+            
+            self._files[ignore_file] = (mtime, rules)
+            return rules
+    
+    def _repo_root(self, directory: str) -> Optional[str]:
+        """Find the enclosing git work tree, if any"""
+        with self._lock:
+            if directory in self._repo_roots:
+                return self._repo_roots[directory]
+        
+        visited = []
+        path = directory
+        root = None
+        while True:
+            with self._lock:
+                if path in self._repo_roots:
+                    root = self._repo_roots[path]
+                    break
+            visited.append(path)
+            if os.path.exists(os.path.join(path, '.git')):
+                root = path
+                break
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+        
+        with self._lock:
+            for path in visited:
+                self._remember(self._repo_roots, path, root)
+        return root
+    
+    def _watch_root(self, directory: str) -> Optional[str]:
+        """Closest watch root containing a directory, if any"""
+        for root in self.roots:
+            if directory == root or directory.startswith(root.rstrip(os.sep) + os.sep):
+                return root
+        return None
+    
+    def _top(self, directory: str) -> Tuple[Optional[str], bool]:
+        """(directory ignore files are inherited from, whether it is a git work tree)"""
+        root = self._repo_root(directory)
+        if root:
+            return root, True
+        return self._watch_root(directory), False
+    
+    def _ignore_files_for(self, directory: str) -> List[str]:
+        """Ignore files that apply to entries of a directory, lowest precedence first"""
+        with self._lock:
+            cached = self._chains.get(directory)
+        if cached is not None:
+            return cached
+        
+        root, in_repo = self._top(directory)
+        
+        files = []
+        if in_repo:
+            files.append(os.path.join(root, '.git', 'info', 'exclude'))
+        
+        # Directories from the work-tree or watch root (or just this one) down
+        chain = []
+        path = directory
+        while True:
+            chain.append(path)
+            if path == root or root is None:
+                break
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+        
+        for path in reversed(chain):
+            files.extend(os.path.join(path, name) for name in self.ignore_file_names)
+        
+        with self._lock:
+            self._remember(self._chains, directory, files)
+        return files
+    
+    def _match(self, path: str, is_dir: bool) -> bool:
+        """Evaluate all applicable rules for a path; the last match wins"""
+        directory = os.path.dirname(path)
+        name = os.path.basename(path)
+        ignored = False
+        
+        for ignore_file in self._ignore_files_for(directory):
+            rules = self._rules(ignore_file)
+            if not rules:
+                continue
+            
+            relpath = os.path.relpath(path, self._base_of(ignore_file)).replace(os.sep, '/')
+            for rule in rules:
+                if rule.matches(relpath, name, is_dir):
+                    ignored = not rule.negate
+        
+        return ignored
+    
+    def _is_dir_ignored(self, directory: str) -> bool:
+        """Whether a directory (or one of its parents) is ignored, cached"""
+        with self._lock:
+            cached = self._dir_decisions.get(directory)
+        if cached is not None:
+            return cached
+        
+        root, _ = self._top(directory)
+        parent = os.path.dirname(directory)
+        
+        if os.path.basename(directory) == '.git':
+            ignored = True
+        elif directory == root or parent == directory or root is None:
+            # Outside a repository and the watch roots only ignore files in
+            # the directory itself apply, so there is nothing to inherit from
+            ignored = False
+        else:
+            ignored = self._is_dir_ignored(parent) or self._match(directory, is_dir=True)
+        
+        with self._lock:
+            self._remember(self._dir_decisions, directory, ignored)
+        return ignored
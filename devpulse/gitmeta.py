@@ -0,0 +1,270 @@
+"""
+Cached git metadata (branch, last commit message) per repository
+"""
+import os
+import subprocess
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from .config import GIT_LOG_DEPTH, GIT_META_RECHECK_SECONDS
+
+
+StatSig = Optional[Tuple[int, int, int]]
+
+
+def _stat_sig(path: str) -> StatSig:
+    """(mtime_ns, size, inode) of a file, or None if missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def _read_text(path: str) -> Optional[str]:
+    """Read a small text file, or None if missing"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+class RepoState:
+    """Branch and per-file last commit messages for one repository"""
+    
+    def __init__(self, root: str, git_dir: str, common_dir: str):
+        self.root = root
+        self.git_dir = git_dir
+        self.common_dir = common_dir
+        self.lock = threading.Lock()
+        self.signature = None
+        self.checked_at = 0.0
+        self.branch: Optional[str] = None
+        # relpath -> message; filled by one git log per HEAD change
+        self.messages: Dict[str, Optional[str]] = {}
+        self.log_loaded = False
+        # Bumped whenever cached state is dropped, so git output read
+        # before a HEAD change is not stored after it
+        self.generation = 0
+        # Set when the git log of the current generation has finished;
+        # None until someone starts it
+        self.log_loading: Optional[threading.Event] = None
+    
+    def head_signature(self) -> Tuple[StatSig, ...]:
+        """Stats of HEAD, the current branch ref and packed-refs"""
+        head = os.path.join(self.git_dir, 'HEAD')
+        sig = [_stat_sig(head), _stat_sig(os.path.join(self.common_dir, 'packed-refs'))]
+        
+        ref = _read_text(head) or ''
+        if ref.startswith('ref:'):
+            sig.append(_stat_sig(os.path.join(self.common_dir, ref[4:].strip())))
+        return tuple(sig)
+    
+    def read_branch(self) -> Optional[str]:
+        """Current branch from HEAD, "HEAD" when detached (like rev-parse --abbrev-ref)"""
+        head = _read_text(os.path.join(self.git_dir, 'HEAD'))
+        if not head:
+            return None
+        
+        if head.startswith('ref:'):
+            ref = head[4:].strip()
+            return ref[len('refs/heads/'):] if ref.startswith('refs/heads/') else ref
+        return 'HEAD'
+
+
+class GitMetadataCache:
+    """
+    Git metadata for tracked files without a subprocess per change.
+    
+    The branch is read straight from HEAD. Last commit messages for
+    recently touched files come from a single `git log --name-only` run
+    per HEAD change; files not in that window fall back to one
+    `git log -1` each, cached until HEAD moves. HEAD, the branch ref and
+    packed-refs are re-stat'ed at most every GIT_META_RECHECK_SECONDS, and
+    any change drops the repository's cached state.
+    """
+    
+    def __init__(
+        self,
+        log_depth: int = GIT_LOG_DEPTH,
+        recheck_seconds: float = GIT_META_RECHECK_SECONDS
+    ):
+        self.log_depth = log_depth
+        self.recheck_seconds = recheck_seconds
+        self._lock = threading.Lock()
+        # directory -> repo root (or None)
+        self._roots: Dict[str, Optional[str]] = {}
+        # repo root -> state
+        self._repos: Dict[str, RepoState] = {}
+    
+    def get_branch(self, filepath) -> Optional[str]:
+        """Get the current branch for a file's repository"""
+        repo = self._repo_for(str(filepath))
+        if repo is None:
+            return None
+        
+        with repo.lock:
+            self._refresh(repo)
+            return repo.branch
+    
+    def get_last_commit_message(self, filepath) -> Optional[str]:
+        """Get the message of the last commit that touched a file"""
+        filepath = str(filepath)
+        repo = self._repo_for(filepath)
+        if repo is None:
+            return None
+        
+        relpath = os.path.relpath(filepath, repo.root).replace(os.sep, '/')
+        with repo.lock:
+            self._refresh(repo)
+            generation = repo.generation
+            if repo.log_loaded and relpath in repo.messages:
+                return repo.messages[relpath]
+            
+            loading = owner = None
+            if not repo.log_loaded:
+                # One git log per generation; later callers wait for it
+                loading = repo.log_loading
+                owner = loading is None
+                if owner:
+                    loading = repo.log_loading = threading.Event()
+        
+        # git runs without the lock, so branch lookups and other files are
+        # not held up; the lock is only taken again to store the result
+        if owner:
+            try:
+                messages = self._load_log(repo)
+                with repo.lock:
+                    if repo.generation == generation and not repo.log_loaded:
+                        # Per-file results stored meanwhile are as fresh
+                        messages.update(repo.messages)
+                        repo.messages = messages
+                        repo.log_loaded = True
+            finally:
+                loading.set()
+        elif loading is not None:
+            loading.wait()
+        
+        if loading is not None:
+            with repo.lock:
+                if repo.generation == generation and relpath in repo.messages:
+                    return repo.messages[relpath]
+        
+        message = self._file_log(repo, relpath)
+        with repo.lock:
+            if repo.generation == generation:
+                repo.messages.setdefault(relpath, message)
+        return message
+    
+    def _repo_for(self, filepath: str) -> Optional[RepoState]:
+        """Find (and cache) the repository containing a file"""
+        directory = os.path.dirname(os.path.abspath(filepath))
+        
+        with self._lock:
+            if directory in self._roots:
+                root = self._roots[directory]
+                return self._repos.get(root) if root else None
+        
+        visited = []
+        path = directory
+        root = None
+        while True:
+            with self._lock:
+                if path in self._roots:
+                    root = self._roots[path]
+                    break
+            visited.append(path)
+            if os.path.exists(os.path.join(path, '.git')):
+                root = path
+                break
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+        
+        with self._lock:
+            for path in visited:
+                self._roots[path] = root
+            if root and root not in self._repos:
+                self._repos[root] = self._open_repo(root)
+            return self._repos.get(root) if root else None
+    
+    @staticmethod
+    def _open_repo(root: str) -> RepoState:
+        """Resolve the git and common directories, following worktree gitdir files"""
+        git_dir = os.path.join(root, '.git')
+        
+        if os.path.isfile(git_dir):
+            pointer = _read_text(git_dir) or ''
+            if pointer.startswith('gitdir:'):
+                git_dir = os.path.normpath(os.path.join(root, pointer[len('gitdir:'):].strip()))
+        
+        common_dir = git_dir
+        common = _read_text(os.path.join(git_dir, 'commondir'))
+        if common:
+            common_dir = os.path.normpath(os.path.join(git_dir, common))
+        
+        return RepoState(root, git_dir, common_dir)
+    
+    def _refresh(self, repo: RepoState):
+        """Drop cached state if HEAD or the branch ref moved (caller holds repo.lock)"""
+        now = time.monotonic()
+        if repo.signature is not None and now - repo.checked_at < self.recheck_seconds:
+            return
+        repo.checked_at = now
+        
+        signature = repo.head_signature()
+        if signature == repo.signature:
+            return
+        
+        repo.signature = signature
+        repo.branch = repo.read_branch()
+        repo.messages = {}
+        repo.log_loaded = False
+        repo.log_loading = None
+        repo.generation += 1
+    
+    def _load_log(self, repo: RepoState) -> Dict[str, Optional[str]]:
+        """Map files touched by the last GIT_LOG_DEPTH commits to their latest message"""
+        output = self._git(repo, [
+            'log', f'-{self.log_depth}', '-z', '--name-only',
+            '--pretty=format:%x1e%B%x1f'
+        ])
+        if not output:
+            return {}
+        
+        messages = {}
+        for record in output.split('\x1e'):
+            message, _, names = record.partition('\x1f')
+            message = message.strip()
+            for name in names.lstrip('\n').split('\0'):
+                # Newest commits come first
+                if name and name not in messages:
+                    messages[name] = message
+        return messages
+    
+    def _file_log(self, repo: RepoState, relpath: str) -> Optional[str]:
+        """Last commit message for a file outside the batched window"""
+        output = self._git(repo, ['log', '-1', '--pretty=%B', '--', relpath])
+        return output.strip() if output is not None else None
+    
+    @staticmethod
+    def _git(repo: RepoState, args) -> Optional[str]:
+        """Run a git command in a repository"""
+        try:
+            result = subprocess.run(
+                ['git', '-c', 'core.quotePath=false', *args],
+                cwd=repo.root,
+                capture_output=True,
+                text=True,
+                encoding='utf-8',
+                errors='replace',
+                timeout=30
+            )
+            if result.returncode == 0:
+                return result.stdout
+        except Exception:
+            pass
+        return None
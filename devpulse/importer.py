@@ -0,0 +1,268 @@
+"""
+Backfill file_changes from git history
+"""
+import os
+import re
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from . import symbols
+from .blobs import compress_diff
+from .config import DB_PATH, IMPORT_BATCH_SIZE, IMPORT_BATCH_BYTES, IMPORT_MAX_DIFF_BYTES, IMPORT_WORKERS
+from .database import Database
+from .filters import ExclusionMatcher
+from .gitmeta import GitMetadataCache
+
+
+# Commit headers are framed with control characters that never appear in
+# git's own output: \x1e starts a header, \x1f separates fields and \x1d
+# ends the free-form message
+LOG_FORMAT = '%x1e%H%x1f%at%x1f%B%x1d'
+
+NUMSTAT_RE = re.compile(r'^(\d+|-)\t(\d+|-)\t(.+)$')
+
+
+def git_log_lines(repo: str, since: Optional[str] = None) -> Iterator[str]:
+    """Stream `git log -p --numstat` output line by line"""
+    cmd = [
+        'git', '-c', 'core.quotePath=false', 'log',
+        '--no-merges', '--no-renames', '--no-color', '--no-ext-diff',
+        '--numstat', '-p', f'--format={LOG_FORMAT}'
+    ]
+    if since:
+        cmd.append(f'--since={since}')
+    
+    process = subprocess.Popen(
+        cmd, cwd=repo,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        text=True, encoding='utf-8', errors='replace'
+    )
+    try:
+        for line in process.stdout:
+            yield line.rstrip('\n')
+    finally:
+        process.stdout.close()
+        # Stop git early if the consumer stopped reading
+        if process.poll() is None:
+            process.kill()
+        stderr = process.stderr.read()
+        process.stderr.close()
+        if process.wait() not in (0, -9) and stderr.strip():
+            raise RuntimeError(f"git log failed in {repo}: {stderr.strip()}")
+
+
+def parse_git_log(
+    lines: Iterable[str],
+    max_diff_bytes: int = IMPORT_MAX_DIFF_BYTES
+) -> Iterator[Dict[str, Any]]:
+    """
+    Parse streamed git log output into one commit at a time.
+    
+    Yields dicts with hash, timestamp (unix seconds), message and files,
+    where each file has path, added, removed and patch (the unified diff
+    from its --- header on, truncated to max_diff_bytes).
+    """
+    lines = iter(lines)
+    commit = None
+    current = None
+    in_patches = False
+    
+    for line in lines:
+        if line.startswith('\x1e'):
+            if commit is not None:
+                yield commit
+            
+            # The message may span lines; read up to the terminator
+            header = line[1:]
+            while '\x1d' not in header:
+                header += '\n' + next(lines, '\x1d')
+            commit_hash, timestamp, message = header.partition('\x1d')[0].split('\x1f', 2)
+            
+            commit = {
+                'hash': commit_hash,
+                'timestamp': int(timestamp),
+                'message': message.strip(),
+                'files': {},
+            }
+            current = None
+            in_patches = False
+            continue
+        
+        if commit is None:
+            continue
+        
+        if line.startswith('diff --git a/'):
+            # Without renames both sides name the same path: "a/<p> b/<p>"
+            rest = line[len('diff --git a/'):]
+            path = rest[:(len(rest) - 3) // 2]
+            current = commit['files'].get(path) if rest == f'{path} b/{path}' else None
+            in_patches = True
+            continue
+        
+        if not in_patches:
+            match = NUMSTAT_RE.match(line)
+            if match:
+                added, removed, path = match.groups()
+                commit['files'][path] = {
+                    'path': path,
+                    'added': int(added) if added != '-' else 0,
+                    'removed': int(removed) if removed != '-' else 0,
+                    'patch': [],
+                    'size': 0,
+                }
+            continue
+        
+        # Patch body, from the ---/+++ headers on
+        if current is not None and (current['patch'] or line.startswith('--- ')):
+            if current['size'] < max_diff_bytes:
+                current['patch'].append(line)
+                current['size'] += len(line) + 1
+    
+    if commit is not None:
+        yield commit
+
+
+class RepoImporter:
+    """Imports one repository; runs inside an import worker process"""
+    
+    def __init__(
+        self,
+        db: Database,
+        repo: str,
+        privacy_mode: bool = False,
+        batch_size: int = IMPORT_BATCH_SIZE,
+        batch_bytes: int = IMPORT_BATCH_BYTES
+    ):
+        self.db = db
+        self.repo = repo
+        self.privacy_mode = privacy_mode
+        self.batch_size = max(1, batch_size)
+        self.batch_bytes = batch_bytes
+        self.matcher = ExclusionMatcher()
+    
+    def run(self, since: Optional[str] = None) -> Dict[str, Any]:
+        """Import all commits since a date; returns counts"""
+        started = time.monotonic()
+        result = {'repo': self.repo, 'commits': 0, 'changes': 0, 'skipped': 0}
+        
+        done = self.db.get_imported_commits(self.repo)
+        # Any path directly inside the work tree resolves to its repository
+        branch = GitMetadataCache().get_branch(os.path.join(self.repo, '.git'))
+        
+        batch: List[Dict[str, Any]] = []
+        rows = size = 0
+        
+        for commit in parse_git_log(git_log_lines(self.repo, since)):
+            if commit['hash'] in done:
+                result['skipped'] += 1
+                continue
+            
+            files = [self._build_change(entry) for entry in commit['files'].values()]
+            files = [change for change in files if change is not None]
+            
+            batch.append({
+                'hash': commit['hash'],
+                'timestamp': datetime.fromtimestamp(commit['timestamp'], timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+                'message': commit['message'],
+                'branch': branch,
+                'files': files,
+            })
+            rows += len(files)
+            size += sum(change['size'] for change in files)
+            
+            # Only flush between commits, so a commit is never half imported
+            if rows >= self.batch_size or size >= self.batch_bytes:
+                result['changes'] += self.db.add_imported_commits(self.repo, batch)
+                result['commits'] += len(batch)
+                batch, rows, size = [], 0, 0
+        
+        if batch:
+            result['changes'] += self.db.add_imported_commits(self.repo, batch)
+            result['commits'] += len(batch)
+        
+        result['seconds'] = round(time.monotonic() - started, 2)
+        return result
+    
+    def _build_change(self, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Turn a parsed file entry into a change row, or None if it is not tracked"""
+        filepath = os.path.join(self.repo, *entry['path'].split('/'))
+        if self.matcher.should_ignore(filepath):
+            return None
+        
+        added, removed = entry['added'], entry['removed']
+        change = {
+            'filename': os.path.basename(filepath),
+            'filepath': filepath,
+            'lines_added': added,
+            'lines_removed': removed,
+            'lines_modified': min(added, removed),
+            'diff_blob': None,
+            'metadata': None,
+            'size': 0,
+        }
+        
+        if self.privacy_mode:
+            change['metadata'] = symbols.compare_patch(filepath, entry['patch'])
+        elif entry['patch']:
+            change['diff_blob'] = compress_diff('\n'.join(entry['patch']))
+            change['size'] = entry['size']
+        return change
+
+
+def repo_root(path: str) -> str:
+    """Top-level directory of the work tree containing a path"""
+    result = subprocess.run(
+        ['git', 'rev-parse', '--show-toplevel'],
+        cwd=path, capture_output=True, text=True, timeout=30
+    )
+    if result.returncode != 0:
+        raise ValueError(f"Not a git repository: {path}")
+    return str(Path(result.stdout.strip()).resolve())
+
+
+def _import_worker(db_path: Path, repo: str, since: Optional[str], privacy_mode: bool) -> Dict[str, Any]:
+    """Process-pool entry point: import one repository with its own connection"""
+    db = Database(db_path)
+    try:
+        return RepoImporter(db, repo, privacy_mode).run(since)
+    finally:
+        db.close()
+
+
+def import_repos(
+    repos: List[str],
+    since: Optional[str] = None,
+    privacy_mode: bool = False,
+    db_path: Path = DB_PATH,
+    workers: int = IMPORT_WORKERS
+) -> Iterator[Dict[str, Any]]:
+    """
+    Import several repositories in parallel, one worker process each.
+    
+    Yields each repository's counts as it finishes; a failed repository
+    yields a result with an 'error' instead of stopping the others.
+    """
+    # Schema upgrades happen once here, not concurrently in every worker
+    Database(db_path).close()
+    
+    roots = []
+    for repo in repos:
+        try:
+            roots.append(repo_root(repo))
+        except (ValueError, OSError, subprocess.SubprocessError) as e:
+            yield {'repo': repo, 'error': str(e)}
+    
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(roots) or 1))) as executor:
+        futures = {
+            executor.submit(_import_worker, db_path, root, since, privacy_mode): root
+            for root in dict.fromkeys(roots)
+        }
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                yield {'repo': futures[future], 'error': str(e)}
@@ -0,0 +1,115 @@
+"""
+Startup baseline indexer for watched trees
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .config import INDEX_WORKERS, INDEX_BATCH_SIZE
+from .snapshots import SnapshotStore
+
+
+# (hash, content, size, mtime_ns)
+FileState = Tuple[str, str, int, int]
+
+
+class BaselineIndexer:
+    """
+    Parallel initial scan that seeds the snapshot store.
+    
+    Every tracked file gets a (path, size, mtime, hash, content) snapshot
+    so the first edit after startup diffs against the real previous
+    state. Files whose size and mtime match the stored snapshot are not
+    read again, and snapshots are committed in batches, so an interrupted
+    or repeated scan picks up where it left off.
+    """
+    
+    def __init__(
+        self,
+        store: SnapshotStore,
+        should_ignore: Callable[[str], bool],
+        should_prune: Callable[[str], bool],
+        read_file: Callable[[str], Optional[FileState]],
+        workers: int = INDEX_WORKERS,
+        batch_size: int = INDEX_BATCH_SIZE
+    ):
+        """
+        Args:
+            store: Snapshot store to fill
+            should_ignore: Returns True for file paths that are not tracked
+            should_prune: Returns True for directories not to descend into
+            read_file: Returns (hash, content, size, mtime_ns) for a text
+                file or None; must hash and decode like the watcher does
+            workers: Number of reader threads
+            batch_size: Snapshots per store transaction
+        """
+        self.store = store
+        self.should_ignore = should_ignore
+        self.should_prune = should_prune
+        self.read_file = read_file
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+    
+    def index(self, roots: List[Path]) -> Dict[str, int]:
+        """Scan all roots and return counts of scanned/unchanged/indexed/skipped files"""
+        started = time.monotonic()
+        result = {'scanned': 0, 'unchanged': 0, 'indexed': 0, 'skipped': 0}
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for root in roots:
+                known = self.store.get_stats(str(root))
+                pending = []
+                
+                for path, size, mtime_ns in self._walk(root):
+                    result['scanned'] += 1
+                    if known.get(path) == (size, mtime_ns):
+                        result['unchanged'] += 1
+                        continue
+                    
+                    pending.append(path)
+                    if len(pending) >= self.batch_size:
+                        self._index_batch(executor, pending, result)
+                        pending = []
+                
+                if pending:
+                    self._index_batch(executor, pending, result)
+        
+        result['seconds'] = round(time.monotonic() - started, 2)
+        return result
+    
+    def _walk(self, root: Path) -> Iterator[Tuple[str, int, int]]:
+        """Yield (path, size, mtime_ns) for tracked files, pruning excluded dirs"""
+        stack = [str(root)]
+        
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not self.should_prune(entry.path):
+                            stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        if not self.should_ignore(entry.path):
+                            stat = entry.stat(follow_symlinks=False)
+                            yield entry.path, stat.st_size, stat.st_mtime_ns
+                except OSError:
+                    continue
+    
+    def _index_batch(self, executor: ThreadPoolExecutor, paths: List[str], result: Dict[str, int]):
+        """Read and hash a batch of files in parallel and store their snapshots"""
+        rows = []
+        for path, state in zip(paths, executor.map(self.read_file, paths)):
+            if state is None:
+                result['skipped'] += 1
+            else:
+                rows.append((path, *state))
+        
+        self.store.put_many(rows)
+        result['indexed'] += len(rows)
@@ -0,0 +1,342 @@
+"""
+Offline summary engine: no API key, no network
+"""
+import os
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .aggregate import Aggregate, aggregate
+from .config import PRIVACY_MODE, LOCAL_MAX_AREAS, LOCAL_MAX_NAMES
+from .database import Database
+
+
+# Commit messages that say nothing about the work
+TRIVIAL_MESSAGES = {
+    "wip", "fix", "fixes", "update", "updates", "changes", "misc", "tmp", "test",
+    "cleanup", "minor", "stuff", "commit", "save", "initial commit",
+}
+
+# (file kind, filename suffixes, filename fragments, parent directory names)
+FILE_KINDS = (
+    ("tests", (), ("test_", "_test.", ".test.", ".spec."), {"tests", "test", "__tests__", "spec"}),
+    ("documentation", (".md", ".rst", ".txt"), (), {"docs", "doc"}),
+    ("configuration", (".json", ".yaml", ".yml", ".toml", ".ini", ".cfg"), (), set()),
+    ("styles", (".css", ".scss", ".sass"), (), set()),
+)
+
+
+def file_kind(filepath: str) -> Optional[str]:
+    """Rough kind of a file from its name and parent directory"""
+    head, name = os.path.split(filepath.lower())
+    parent = os.path.basename(head)
+    for kind, suffixes, fragments, directories in FILE_KINDS:
+        if name.endswith(suffixes) or parent in directories or any(part in name for part in fragments):
+            return kind
+    return None
+
+
+def _names(names, limit: int = LOCAL_MAX_NAMES) -> str:
+    """Comma-separated names, cut to a limit with a "+N more" tail"""
+    names = list(names)
+    shown = ", ".join(names[:limit])
+    if len(names) > limit:
+        shown += f" +{len(names) - limit} more"
+    return shown
+
+
+# Area attributes filled from privacy mode metadata of the same name
+SYMBOL_KINDS = (
+    "functions_added", "functions_modified", "functions_removed",
+    "classes_added", "classes_modified", "imports_changed",
+)
+
+
+class Area:
+    """Changes in one directory on one branch"""
+    
+    __slots__ = (
+        "directory", "branch", "added", "removed", "saves", "files", "kinds",
+        "functions_added", "functions_modified", "functions_removed",
+        "classes_added", "classes_modified", "imports_changed", "commits",
+    )
+    
+    def __init__(self, directory: str, branch: str):
+        self.directory = directory
+        self.branch = branch
+        self.added = 0
+        self.removed = 0
+        self.saves = 0
+        # filename -> [added, removed]
+        self.files: Dict[str, List[int]] = {}
+        self.kinds: Counter = Counter()
+        # Dicts keep first-seen order and drop duplicates
+        self.functions_added: Dict[str, None] = {}
+        self.functions_modified: Dict[str, None] = {}
+        self.functions_removed: Dict[str, None] = {}
+        self.classes_added: Dict[str, None] = {}
+        self.classes_modified: Dict[str, None] = {}
+        self.imports_changed: Dict[str, None] = {}
+        self.commits: Counter = Counter()
+    
+    def score(self) -> float:
+        """Activity used to order areas"""
+        symbols = (
+            len(self.functions_added) + len(self.functions_removed) + len(self.classes_added)
+            + len(self.functions_modified) + len(self.classes_modified)
+        )
+        return self.added + self.removed + 10 * symbols
+    
+    def label(self) -> str:
+        """Last two components of the directory"""
+        parts = [part for part in self.directory.replace("\\", "/").split("/") if part]
+        return "/".join(parts[-2:]) or self.directory or "."
+
+
+class LocalSummarizer:
+    """
+    Summary engine that runs entirely on local data.
+    
+    Groups the day's changes by branch and directory, and describes each
+    group from what was recorded: symbols from privacy mode metadata,
+    commit messages, file names and line counts. Areas are ordered by
+    activity and the least active are folded into one line. Has the same
+    interface as AISummarizer, so it can stand in for it; for a day in the
+    database, generate_day_summary() does the grouping in SQL instead.
+    """
+    
+    # No responses to reuse
+    cache = None
+    
+    def __init__(
+        self,
+        db: Optional[Database] = None,
+        max_areas: int = LOCAL_MAX_AREAS
+    ):
+        self.db = db  # used to load privacy mode metadata
+        self.max_areas = max_areas
+    
+    def generate_summary(
+        self,
+        changes: Iterable[Dict[str, Any]],
+        privacy_mode: bool = PRIVACY_MODE
+    ) -> str:
+        """Generate a structured summary from file changes"""
+        activity, symbols = self._file_activity(changes)
+        return self._render(self._group(activity, symbols))
+    
+    def generate_day_summary(
+        self,
+        date: str,
+        processed: Optional[bool] = False,
+        max_id: Optional[int] = None
+    ) -> str:
+        """generate_summary() for a day's changes, grouped in the database"""
+        activity = self.db.file_activity(date, processed, max_id)
+        symbols = self.db.file_symbols(date, processed, max_id)
+        return self._render(self._group(activity, symbols))
+    
+    def stream_summary(
+        self,
+        changes: Iterable[Dict[str, Any]],
+        privacy_mode: bool = PRIVACY_MODE
+    ) -> Iterator[str]:
+        """generate_summary() as a one-piece stream"""
+        yield self.generate_summary(changes, privacy_mode)
+    
+    def generate_quick_summary(self, changes: Iterable[Dict[str, Any]]) -> str:
+        """Generate a quick local summary"""
+        return quick_summary(changes)
+    
+    def _file_activity(
+        self,
+        changes: Iterable[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Dict[tuple, Dict[str, List[str]]]]:
+        """Database.file_activity() and file_symbols() for change rows already loaded"""
+        if self.db:
+            pairs = self.db.with_metadata(changes)
+        else:
+            pairs = ((change, None) for change in changes)
+        
+        # (branch, filepath, commit message) -> totals
+        activity: Dict[tuple, Dict[str, Any]] = {}
+        # (branch, filepath) -> kind -> names, each name once
+        found: Dict[tuple, Dict[str, Dict[str, None]]] = {}
+        
+        for change, meta in pairs:
+            branch = change.get("git_branch") or "N/A"
+            key = (branch, change["filepath"], change.get("commit_message"))
+            row = activity.get(key)
+            if row is None:
+                row = activity[key] = {
+                    "git_branch": key[0], "filepath": key[1], "commit_message": key[2],
+                    "changes": 0, "added": 0, "removed": 0,
+                }
+            row["changes"] += 1
+            row["added"] += change.get("lines_added") or 0
+            row["removed"] += change.get("lines_removed") or 0
+            
+            if meta:
+                names = found.setdefault(key[:2], {})
+                for kind, values in meta.items():
+                    for name in values or ():
+                        names.setdefault(kind, {})[name] = None
+        
+        symbols = {
+            key: {kind: list(names) for kind, names in kinds.items()}
+            for key, kinds in found.items()
+        }
+        return list(activity.values()), symbols
+    
+    def _render(self, areas: Dict[tuple, Area]) -> str:
+        """Summary text for grouped areas"""
+        if not areas:
+            return "No changes tracked for this period."
+        
+        ranked = sorted(areas.values(), key=lambda area: (-area.score(), area.directory))
+        shown, rest = ranked[:self.max_areas], ranked[self.max_areas:]
+        branches = sorted({area.branch for area in ranked})
+        
+        total_files = sum(len(area.files) for area in ranked)
+        total_added = sum(area.added for area in ranked)
+        total_removed = sum(area.removed for area in ranked)
+        
+        lines = [
+            f"📝 **Local Summary**: {total_files} file(s) in {len(ranked)} area(s), "
+            f"+{total_added}/-{total_removed} lines",
+            f"Branch{'es' if len(branches) > 1 else ''}: {', '.join(branches)}",
+        ]
+        for area in shown:
+            lines.append("")
+            lines.extend(self._describe(area, show_branch=len(branches) > 1))
+        
+        if rest:
+            lines.append("")
+            lines.append(
+                f"…and {len(rest)} more area(s): {_names(area.label() for area in rest)} "
+                f"(+{sum(a.added for a in rest)}/-{sum(a.removed for a in rest)})"
+            )
+        return "\n".join(lines)
+    
+    @staticmethod
+    def _group(
+        activity: Iterable[Dict[str, Any]],
+        symbols: Dict[tuple, Dict[str, List[str]]]
+    ) -> Dict[tuple, Area]:
+        """
+        Per-(branch, directory) areas from totals per branch, file and
+        commit message and symbol names per (branch, file)
+        """
+        areas: Dict[tuple, Area] = {}
+        # (branch, filepath) -> (area, file counts)
+        files: Dict[tuple, tuple] = {}
+        
+        for row in activity:
+            key = (row["git_branch"], row["filepath"])
+            seen = files.get(key)
+            if seen is None:
+                branch, filepath = key
+                directory = os.path.dirname(filepath)
+                area = areas.get((branch, directory))
+                if area is None:
+                    area = areas[(branch, directory)] = Area(directory, branch)
+                filename = os.path.basename(filepath)
+                counts = area.files.get(filename)
+                if counts is None:
+                    counts = area.files[filename] = [0, 0]
+                    kind = file_kind(filepath)
+                    if kind:
+                        area.kinds[kind] += 1
+                seen = files[key] = (area, counts)
+            area, counts = seen
+            
+            area.added += row["added"]
+            area.removed += row["removed"]
+            area.saves += row["changes"]
+            counts[0] += row["added"]
+            counts[1] += row["removed"]
+            
+            message = row["commit_message"]
+            if message:
+                subject = message.strip().split("\n", 1)[0].strip()
+                if len(subject) > 3 and subject.lower().rstrip(".!") not in TRIVIAL_MESSAGES:
+                    area.commits[subject] += row["changes"]
+        
+        for key, found in symbols.items():
+            seen = files.get(key)
+            if seen is None:
+                continue
+            area = seen[0]
+            for kind in SYMBOL_KINDS:
+                names = getattr(area, kind)
+                for name in found.get(kind) or ():
+                    names[name] = None
+        
+        return areas
+    
+    @staticmethod
+    def _describe(area: Area, show_branch: bool) -> List[str]:
+        """Bulleted description of one area"""
+        title = f"✓ **{area.label()}**"
+        if show_branch:
+            title += f" ({area.branch})"
+        lines = [title]
+        
+        # A name added and later modified on the same day is just new
+        modified_functions = [name for name in area.functions_modified if name not in area.functions_added]
+        modified_classes = [name for name in area.classes_modified if name not in area.classes_added]
+        
+        if area.classes_added:
+            lines.append(f"  • Added classes: {_names(area.classes_added)}")
+        if area.functions_added:
+            lines.append(f"  • Added functions: {_names(area.functions_added)}")
+        if modified_classes or modified_functions:
+            lines.append(f"  • Updated: {_names(modified_classes + modified_functions)}")
+        if area.functions_removed:
+            lines.append(f"  • Removed: {_names(area.functions_removed)}")
+        if area.imports_changed:
+            lines.append(f"  • Dependencies changed: {_names(area.imports_changed)}")
+        
+        # Most touched files first
+        files = sorted(area.files.items(), key=lambda item: -(item[1][0] + item[1][1]))
+        lines.append(
+            f"  • Worked on {_names(name for name, _ in files)} "
+            f"(+{area.added}/-{area.removed}, {area.saves} save{'s' if area.saves != 1 else ''})"
+        )
+        
+        if area.kinds:
+            kind, count = area.kinds.most_common(1)[0]
+            if count * 2 >= len(area.files):
+                lines.append(f"  • Mostly {kind}")
+        
+        if area.commits:
+            subjects = [f'"{subject}"' for subject, _ in area.commits.most_common(3)]
+            lines.append(f"  • Commits: {'; '.join(subjects)}")
+        
+        return lines
+
+
+def quick_summary(changes: Union[Iterable[Dict[str, Any]], Aggregate]) -> str:
+    """Line counts per file and branch, from change rows or their aggregate"""
+    totals = changes if isinstance(changes, Aggregate) else aggregate(changes)
+    if not totals.total.changes:
+        return "No changes recorded."
+    
+    summary = f"""
+📊 **Quick Summary**
+• Files Modified: {totals.files}
+• Lines Added: {totals.total.added}
+• Lines Removed: {totals.total.removed}
+"""
+
+    if len(totals.by_branch) > 1:
+        summary += "\n🌿 **Branches:**\n"
+        for branch, group in totals.top(totals.by_branch):
+            summary += f"\n  • {branch} (+{group.added}/-{group.removed})"
+        summary += "\n"
+    
+    summary += "\n📝 **Files:**\n"
+    for filepath in sorted(totals.by_file, key=totals.label):
+        group = totals.by_file[filepath]
+        summary += f"\n  • {totals.label(filepath)} (+{group.added}/-{group.removed})"
+    
+    return summary
@@ -0,0 +1,55 @@
+"""
+Background maintenance for long-running DevPulse daemons
+"""
+import threading
+from typing import Optional
+
+from .config import COMPACT_INTERVAL_HOURS, RETENTION_DAYS
+from .database import Database
+
+
+class CompactionScheduler:
+    """Periodically compact old history while the watcher runs"""
+    
+    def __init__(
+        self,
+        db: Database,
+        interval_hours: float = COMPACT_INTERVAL_HOURS,
+        older_than_days: int = RETENTION_DAYS
+    ):
+        self.db = db
+        self.interval = interval_hours * 3600
+        self.older_than_days = older_than_days
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """Start the scheduler thread (no-op if the interval is 0)"""
+        if self.interval <= 0 or self._thread:
+            return
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="devpulse-compaction", daemon=True
+        )
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the scheduler thread"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+    
+    def _run(self):
+        """Scheduler loop"""
+        while not self._stop_event.wait(self.interval):
+            try:
+                result = self.db.compact(self.older_than_days)
+                if result['changes_compacted']:
+                    print(
+                        f"🧹 Compacted {result['changes_compacted']} change(s), "
+                        f"freed {result['pages_freed']} page(s)"
+                    )
+            except Exception as e:
+                print(f"Compaction failed: {e}")
@@ -0,0 +1,354 @@
+"""
+Versioned schema migrations for DevPulse
+
+The schema version lives in PRAGMA user_version. Each migration has a
+quick DDL step and an optional chunked step for backfills or table
+rebuilds; chunks run in their own short transactions and record their
+position, so a large table is migrated without holding the write lock
+for long and an interrupted migration resumes where it stopped.
+"""
+import json
+import sqlite3
+import time
+from typing import Any, Callable, List, Optional
+
+from .blobs import compress_diff
+from .config import MIGRATION_CHUNK_SIZE, MIGRATION_CHUNK_PAUSE
+
+
+class Migration:
+    """A single schema version step"""
+    
+    def __init__(
+        self,
+        version: int,
+        description: str,
+        apply: Optional[Callable[[sqlite3.Connection], None]] = None,
+        chunk: Optional[Callable[[sqlite3.Connection, Any, int], Any]] = None
+    ):
+        """
+        Args:
+            version: Schema version after this migration
+            description: Short human-readable summary
+            apply: Runs once inside a single transaction
+            chunk: Called as chunk(conn, position, chunk_size) until it
+                returns None; position starts as None and is whatever the
+                previous call returned (must be JSON serializable)
+        """
+        self.version = version
+        self.description = description
+        self.apply = apply
+        self.chunk = chunk
+
+
+def _v1_baseline(conn: sqlite3.Connection):
+    """Original DevPulse schema"""
+    # File changes table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS file_changes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT NOT NULL,
+            filepath TEXT NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            lines_added INTEGER DEFAULT 0,
+            lines_removed INTEGER DEFAULT 0,
+            lines_modified INTEGER DEFAULT 0,
+            git_branch TEXT,
+            commit_message TEXT,
+            diff_content TEXT,
+            file_hash TEXT,
+            processed INTEGER DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Watch paths table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS watch_paths (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            path TEXT UNIQUE NOT NULL,
+            active INTEGER DEFAULT 1,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Metadata for privacy mode
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS file_metadata (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            change_id INTEGER NOT NULL,
+            functions_added TEXT,
+            functions_modified TEXT,
+            functions_removed TEXT,
+            classes_added TEXT,
+            classes_modified TEXT,
+            imports_changed TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (change_id) REFERENCES file_changes(id)
+        )
+    """)
+    
+    # Summary logs table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS summary_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date DATE NOT NULL,
+            summary_text TEXT NOT NULL,
+            total_files INTEGER DEFAULT 0,
+            total_lines_added INTEGER DEFAULT 0,
+            total_lines_removed INTEGER DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_date
+        ON summary_logs(date)
+    """)
+
+
+def _v2_date_range_indexes(conn: sqlite3.Connection):
+    """Composite indexes for sargable date-range queries"""
+    # (processed, timestamp) serves the unprocessed-changes-for-a-day lookup
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_processed_timestamp
+        ON file_changes(processed, timestamp)
+    """)
+    
+    # Covers get_statistics() over a timestamp range without touching the table
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_timestamp_filepath
+        ON file_changes(timestamp, filepath, lines_added, lines_removed, lines_modified)
+    """)
+    
+    # Superseded by the composite indexes above
+    conn.execute("DROP INDEX IF EXISTS idx_timestamp")
+    conn.execute("DROP INDEX IF EXISTS idx_processed")
+
+
+def _v3_diff_blobs(conn: sqlite3.Connection):
+    """Content-addressed, compressed diff storage"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS diff_blobs (
+            hash TEXT PRIMARY KEY,
+            codec TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            data BLOB NOT NULL
+        )
+    """)
+    conn.execute("ALTER TABLE file_changes ADD COLUMN diff_hash TEXT")
+
+
+def _v3_move_diffs(conn: sqlite3.Connection, position: Any, chunk_size: int) -> Any:
+    """Move inline diff_content into diff_blobs, a chunk of rows at a time"""
+    last_id = position or 0
+    rows = conn.execute("""
+        SELECT id, diff_content FROM file_changes
+        WHERE id > ? AND diff_content IS NOT NULL
+        ORDER BY id
+        LIMIT ?
+    """, (last_id, chunk_size)).fetchall()
+    
+    if not rows:
+        return None
+    
+    for change_id, diff_content in rows:
+        blob = compress_diff(diff_content)
+        conn.execute(
+            "INSERT OR IGNORE INTO diff_blobs (hash, codec, size, data) VALUES (?, ?, ?, ?)",
+            blob
+        )
+        conn.execute(
+            "UPDATE file_changes SET diff_hash = ?, diff_content = NULL WHERE id = ?",
+            (blob[0], change_id)
+        )
+    
+    return rows[-1][0]
+
+
+def _v4_rollups(conn: sqlite3.Connection):
+    """Per-day, per-file aggregates for compacted history"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS file_change_rollups (
+            day DATE NOT NULL,
+            filepath TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            total_changes INTEGER DEFAULT 0,
+            lines_added INTEGER DEFAULT 0,
+            lines_removed INTEGER DEFAULT 0,
+            lines_modified INTEGER DEFAULT 0,
+            PRIMARY KEY (day, filepath)
+        )
+    """)
+    
+    # Lookups done when compacting rows and their blobs
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_metadata_change
+        ON file_metadata(change_id)
+    """)
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_diff_hash
+        ON file_changes(diff_hash)
+    """)
+
+
+def _v5_imported_commits(conn: sqlite3.Connection):
+    """Commits already loaded by `devpulse import-git`"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS imported_commits (
+            repo TEXT NOT NULL,
+            commit_hash TEXT NOT NULL,
+            imported_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (repo, commit_hash)
+        ) WITHOUT ROWID
+    """)
+
+
+def _v6_branch_covering_index(conn: sqlite3.Connection):
+    """Let Database.aggregate() group by branch without touching the table"""
+    conn.execute("DROP INDEX IF EXISTS idx_timestamp_filepath")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_timestamp_filepath
+        ON file_changes(timestamp, filepath, git_branch, lines_added, lines_removed, lines_modified)
+    """)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline schema", apply=_v1_baseline),
+    Migration(2, "composite date-range indexes", apply=_v2_date_range_indexes),
+    Migration(3, "compressed diff blobs", apply=_v3_diff_blobs, chunk=_v3_move_diffs),
+    Migration(4, "history rollups", apply=_v4_rollups),
+    Migration(5, "imported git commits", apply=_v5_imported_commits),
+    Migration(6, "branch in the statistics covering index", apply=_v6_branch_covering_index),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Read the schema version stored in the database header"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(
+    conn: sqlite3.Connection,
+    migrations: List[Migration] = MIGRATIONS,
+    chunk_size: int = MIGRATION_CHUNK_SIZE,
+    chunk_pause: float = MIGRATION_CHUNK_PAUSE
+) -> int:
+    """
+    Bring the database up to the latest schema version.
+    
+    Costs a single PRAGMA read when the schema is already current.
+    Returns the resulting schema version.
+    """
+    latest = migrations[-1].version
+    version = get_schema_version(conn)
+    if version >= latest:
+        return version
+    
+    conn.commit()  # close any implicit transaction before managing our own
+    _ensure_progress_table(conn)
+    
+    for migration in migrations:
+        if migration.version <= version:
+            continue
+        
+        if migration.apply:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process may have finished this step meanwhile
+                if get_schema_version(conn) >= migration.version:
+                    conn.rollback()
+                    version = get_schema_version(conn)
+                    continue
+                if not _is_applied(conn, migration.version):
+                    migration.apply(conn)
+                    _save_progress(conn, migration.version, None)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        
+        if migration.chunk:
+            _run_chunks(conn, migration, chunk_size, chunk_pause)
+        
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+            conn.execute(
+                "DELETE FROM schema_migration_progress WHERE version = ?",
+                (migration.version,)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        
+        version = migration.version
+    
+    return version
+
+
+def _ensure_progress_table(conn: sqlite3.Connection):
+    """Create the table that tracks in-flight migrations"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migration_progress (
+            version INTEGER PRIMARY KEY,
+            position TEXT
+        )
+    """)
+    conn.commit()
+
+
+def _is_applied(conn: sqlite3.Connection, version: int) -> bool:
+    """Whether the DDL step of an in-flight migration already ran"""
+    row = conn.execute(
+        "SELECT 1 FROM schema_migration_progress WHERE version = ?", (version,)
+    ).fetchone()
+    return row is not None
+
+
+def _load_progress(conn: sqlite3.Connection, version: int) -> Any:
+    """Load the saved chunk position for a migration"""
+    row = conn.execute(
+        "SELECT position FROM schema_migration_progress WHERE version = ?", (version,)
+    ).fetchone()
+    if row is None or row[0] is None:
+        return None
+    return json.loads(row[0])
+
+
+def _save_progress(conn: sqlite3.Connection, version: int, position: Any):
+    """Record how far a migration has got"""
+    conn.execute(
+        "INSERT OR REPLACE INTO schema_migration_progress (version, position) VALUES (?, ?)",
+        (version, json.dumps(position) if position is not None else None)
+    )
+
+
+def _run_chunks(
+    conn: sqlite3.Connection,
+    migration: Migration,
+    chunk_size: int,
+    chunk_pause: float
+):
+    """Run a migration's chunked step to completion"""
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            position = _load_progress(conn, migration.version)
+            next_position = migration.chunk(conn, position, chunk_size)
+            if next_position is not None:
+                _save_progress(conn, migration.version, next_position)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        
+        if next_position is None:
+            return
+        
+        # Let the watcher's writer in between chunks
+        if chunk_pause:
+            time.sleep(chunk_pause)
@@ -0,0 +1,360 @@
+"""
+Async chat completion providers with retries and concurrency limits
+"""
+import asyncio
+import importlib
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type
+
+from .config import (
+    AI_API_BASE, AI_TIMEOUT, AI_MAX_RETRIES, AI_BACKOFF_BASE, AI_BACKOFF_MAX,
+    AI_MAX_RETRY_AFTER, get_concurrency
+)
+
+
+# Timeouts, conflicts, rate limits and server errors are worth retrying
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+Message = Dict[str, str]
+
+
+def status_of(error: BaseException) -> Optional[int]:
+    """HTTP status of an SDK error, if it carries one"""
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the server asked to wait, from retry-after-ms or Retry-After"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if headers is None:
+        # litellm keeps the upstream headers on the exception itself
+        headers = getattr(error, 'litellm_response_headers', None)
+    if not headers:
+        return None
+    
+    headers = {str(name).lower(): value for name, value in headers.items()}
+    try:
+        return max(0.0, float(headers['retry-after-ms']) / 1000)
+    except (KeyError, TypeError, ValueError):
+        pass
+    
+    value = headers.get('retry-after')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    
+    # Retry-After may also be an HTTP date
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = AI_BACKOFF_BASE, cap: float = AI_BACKOFF_MAX) -> float:
+    """Exponential backoff with full jitter for a retry attempt (0-based)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class AsyncProvider:
+    """
+    One chat completion API behind a concurrency limit, timeout and retries.
+    
+    Use as an async context manager: entering opens one SDK client whose
+    connection pool is shared by every request until exit. At most
+    `concurrency` requests are in flight at once. Rate-limited, timed out
+    and 5xx requests are retried up to max_retries times, waiting for the
+    server's Retry-After when given (and pausing the other requests for
+    it too) or an exponential backoff with jitter otherwise.
+    """
+    
+    module_name = ''
+    
+    def __init__(
+        self,
+        model: str,
+        api_key: Optional[str],
+        api_base: Optional[str] = None,
+        concurrency: int = 4,
+        timeout: float = AI_TIMEOUT,
+        max_retries: int = AI_MAX_RETRIES
+    ):
+        self.model = model
+        self.api_key = api_key
+        self.api_base = api_base or None
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.sdk = self._import_sdk()
+        self.stats = {'requests': 0, 'retries': 0, 'rate_limited': 0}
+        self._client = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._resume_at = 0.0
+    
+    def _import_sdk(self):
+        """Import the provider's SDK module"""
+        try:
+            return importlib.import_module(self.module_name)
+        except ImportError:
+            raise ImportError(f"{self.module_name} package not installed. Run: pip install {self.module_name}")
+    
+    async def __aenter__(self):
+        # Created here so they belong to the running event loop
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._resume_at = 0.0
+        self._client = self._open()
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        client, self._client = self._client, None
+        self._semaphore = None
+        if client is not None:
+            await self._close(client)
+    
+    def _open(self) -> Any:
+        """Create the SDK client for one session"""
+        return None
+    
+    async def _close(self, client: Any):
+        """Release a session's SDK client"""
+    
+    async def _create(self, messages: List[Message], temperature: float, max_tokens: int) -> str:
+        """Send one chat completion request and return its text"""
+        raise NotImplementedError
+    
+    def _create_stream(self, messages: List[Message], temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        """Send one streaming chat completion request and yield text as it arrives"""
+        raise NotImplementedError
+    
+    def _transient_errors(self) -> Tuple[Type[BaseException], ...]:
+        """SDK exception types for connection failures and timeouts"""
+        return ()
+    
+    def is_retryable(self, error: BaseException) -> bool:
+        """Whether a failed request may succeed if sent again"""
+        if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+            return True
+        if isinstance(error, self._transient_errors()):
+            return True
+        return status_of(error) in RETRYABLE_STATUS
+    
+    async def complete(
+        self,
+        messages: List[Message],
+        temperature: float = 0.3,
+        max_tokens: int = 1000
+    ) -> str:
+        """Get a chat completion, retrying transient failures"""
+        semaphore = self._require_session()
+        attempt = 0
+        while True:
+            async with semaphore:
+                await self._wait_for_cooldown()
+                self.stats['requests'] += 1
+                try:
+                    return await asyncio.wait_for(
+                        self._create(messages, temperature, max_tokens), self.timeout
+                    )
+                except Exception as e:
+                    error = e
+            
+            # Wait outside the semaphore so other requests keep their slots
+            await asyncio.sleep(self._retry_delay(error, attempt))
+            attempt += 1
+    
+    async def stream(
+        self,
+        messages: List[Message],
+        temperature: float = 0.3,
+        max_tokens: int = 1000
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion as text pieces.
+        
+        Failures before the first piece are retried like complete(); once
+        text has been yielded a failure is raised, since the caller has
+        already used part of the response. Each piece must arrive within
+        the timeout.
+        """
+        semaphore = self._require_session()
+        attempt = 0
+        while True:
+            async with semaphore:
+                await self._wait_for_cooldown()
+                self.stats['requests'] += 1
+                pieces = self._create_stream(messages, temperature, max_tokens)
+                try:
+                    first = await asyncio.wait_for(pieces.__anext__(), self.timeout)
+                except StopAsyncIteration:
+                    return
+                except Exception as e:
+                    error = e
+                    await pieces.aclose()
+                else:
+                    try:
+                        yield first
+                        while True:
+                            try:
+                                piece = await asyncio.wait_for(pieces.__anext__(), self.timeout)
+                            except StopAsyncIteration:
+                                return
+                            yield piece
+                    finally:
+                        await pieces.aclose()
+            
+            await asyncio.sleep(self._retry_delay(error, attempt))
+            attempt += 1
+    
+    def _require_session(self) -> asyncio.Semaphore:
+        """The session's semaphore; requests need an open session"""
+        if self._semaphore is None:
+            raise RuntimeError("Provider must be used inside 'async with'")
+        return self._semaphore
+    
+    async def _wait_for_cooldown(self):
+        """A rate limit seen by any request holds back all of them"""
+        pause = self._resume_at - asyncio.get_running_loop().time()
+        if pause > 0:
+            await asyncio.sleep(pause)
+    
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Seconds to wait before retrying a failed request; raises the error if it shouldn't be"""
+        if attempt >= self.max_retries or not self.is_retryable(error):
+            raise error
+        
+        delay = retry_after(error)
+        if delay is None:
+            delay = backoff_delay(attempt)
+        elif delay > AI_MAX_RETRY_AFTER:
+            raise error
+        
+        if status_of(error) == 429:
+            self.stats['rate_limited'] += 1
+            self._resume_at = max(self._resume_at, asyncio.get_running_loop().time() + delay)
+        
+        self.stats['retries'] += 1
+        return delay
+
+
+class OpenAIProvider(AsyncProvider):
+    """OpenAI chat completions"""
+    
+    module_name = 'openai'
+    client_class = 'AsyncOpenAI'
+    
+    def _open(self):
+        client_class = getattr(self.sdk, self.client_class)
+        # Retries are handled by complete()
+        return client_class(
+            api_key=self.api_key,
+            base_url=self.api_base,
+            timeout=self.timeout,
+            max_retries=0
+        )
+    
+    async def _close(self, client):
+        await client.close()
+    
+    async def _create(self, messages, temperature, max_tokens):
+        response = await self._client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        return (response.choices[0].message.content or '').strip()
+    
+    async def _create_stream(self, messages, temperature, max_tokens):
+        stream = await self._client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await stream.close()
+    
+    def _transient_errors(self):
+        return (self.sdk.APIConnectionError,)
+
+
+class GroqProvider(OpenAIProvider):
+    """Groq chat completions (OpenAI-compatible SDK)"""
+    
+    module_name = 'groq'
+    client_class = 'AsyncGroq'
+
+
+class LiteLLMProvider(AsyncProvider):
+    """Any model routed through litellm"""
+    
+    module_name = 'litellm'
+    
+    async def _create(self, messages, temperature, max_tokens):
+        response = await self.sdk.acompletion(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            api_key=self.api_key,
+            api_base=self.api_base,
+            timeout=self.timeout,
+            num_retries=0,
+        )
+        return (response['choices'][0]['message']['content'] or '').strip()
+    
+    async def _create_stream(self, messages, temperature, max_tokens):
+        response = await self.sdk.acompletion(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            api_key=self.api_key,
+            api_base=self.api_base,
+            timeout=self.timeout,
+            num_retries=0,
+            stream=True,
+        )
+        async for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    def _transient_errors(self):
+        return tuple(
+            error for error in (getattr(self.sdk, 'Timeout', None), getattr(self.sdk, 'APIConnectionError', None))
+            if isinstance(error, type)
+        )
+
+
+PROVIDERS: Dict[str, Type[AsyncProvider]] = {
+    'groq': GroqProvider,
+    'openai': OpenAIProvider,
+    'gemini': LiteLLMProvider,
+    'litellm': LiteLLMProvider,
+}
+
+
+def create_provider(
+    name: str,
+    model: str,
+    api_key: Optional[str],
+    api_base: Optional[str] = AI_API_BASE
+) -> AsyncProvider:
+    """Create the provider for a configured AI_PROVIDER name"""
+    try:
+        provider_class = PROVIDERS[name]
+    except KeyError:
+        raise ValueError(f"Unsupported AI provider: {name}")
+    return provider_class(model, api_key, api_base=api_base, concurrency=get_concurrency(name))
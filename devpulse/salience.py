@@ -0,0 +1,291 @@
+"""
+Salience stage: net per-file diffs, ranked and packed into a token budget
+"""
+import fnmatch
+import math
+import os
+import re
+from collections import defaultdict
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from . import chunking, symbols
+from .config import (
+    LOW_SIGNAL_PATTERNS, SALIENCE_MAX_DIFF_CHARS, SALIENCE_MIN_DIFF_CHARS, CHARS_PER_TOKEN,
+    SALIENCE_LOAD_TOTAL_CHARS, SALIENCE_MAX_FILE_LINES, READ_BATCH_SIZE
+)
+
+
+WHITESPACE_RE = re.compile(r'\s+')
+# Trailing commas a formatter adds or removes before a closing bracket
+TRAILING_COMMA_RE = re.compile(r',([)\]}])')
+
+SYMBOL_KEYS = (
+    'functions_added', 'functions_modified', 'functions_removed',
+    'classes_added', 'classes_modified', 'imports_changed',
+)
+
+# Score per changed symbol, by metadata key
+SYMBOL_WEIGHTS = {
+    'functions_added': 3.0,
+    'functions_removed': 3.0,
+    'classes_added': 4.0,
+    'functions_modified': 1.5,
+    'classes_modified': 2.0,
+    'imports_changed': 0.5,
+}
+LOW_SIGNAL_WEIGHT = 0.2
+
+# [tag, text] of one diff line; the tag becomes None once the line is cancelled
+DiffLine = List[Optional[str]]
+
+
+def parse_hunks(diff: str) -> List[Tuple[str, List[DiffLine]]]:
+    """Split unified diff text into (header, lines) hunks"""
+    hunks = []
+    for line in diff.split('\n'):
+        if line.startswith('@@'):
+            hunks.append((line, []))
+        elif hunks and line[:1] in ('+', '-', ' '):
+            # File headers (---/+++) only come before the first hunk
+            hunks[-1][1].append([line[0], line[1:]])
+    return hunks
+
+
+def _squash(text: str) -> str:
+    """A line as a formatter sees it: no whitespace, one quote style, no trailing commas"""
+    return TRAILING_COMMA_RE.sub(r'\1', WHITESPACE_RE.sub('', text).replace("'", '"'))
+
+
+def is_cosmetic(lines: Iterable[DiffLine]) -> bool:
+    """Whether a hunk only changes whitespace, quotes, trailing commas or line wrapping"""
+    removed, added = [], []
+    for tag, text in lines:
+        if tag == '-':
+            removed.append(text)
+        elif tag == '+':
+            added.append(text)
+    # Joined, so re-wrapped lines still compare equal
+    return _squash(''.join(removed)) == _squash(''.join(added))
+
+
+def is_low_signal(filepath: str) -> bool:
+    """Lockfiles, generated and minified files"""
+    name = os.path.basename(filepath)
+    return any(fnmatch.fnmatch(name, pattern) for pattern in LOW_SIGNAL_PATTERNS)
+
+
+class FileDigest:
+    """
+    Net change to one file over a series of saves.
+    
+    At most max_lines diff lines are kept; hunks past that are dropped
+    (the line counts still include them) and the digest is marked full.
+    """
+    
+    def __init__(self, filepath: str, filename: str, max_lines: int = SALIENCE_MAX_FILE_LINES):
+        self.filepath = filepath
+        self.filename = filename
+        self.saves = 0
+        self.git_branch: Optional[str] = None
+        self.commit_message: Optional[str] = None
+        self.lines_added = 0
+        self.lines_removed = 0
+        self.cosmetic_hunks = 0
+        self.hunks: List[Tuple[str, List[DiffLine]]] = []
+        self.symbols: Dict[str, List[str]] = {key: [] for key in SYMBOL_KEYS}
+        self.score = 0.0
+        self.low_signal = is_low_signal(filepath)
+        self.max_lines = max_lines
+        self.kept_lines = 0
+        # Added/removed lines not yet cancelled out by a later save
+        self._pending = {'+': defaultdict(list), '-': defaultdict(list)}
+        self._metadata: List[Dict[str, List[str]]] = []
+    
+    def add(self, change: Dict[str, Any], diff: str, metadata: Optional[Dict[str, List[str]]] = None):
+        """Fold in the next save of the file"""
+        self.saves += 1
+        self.lines_added += change.get('lines_added') or 0
+        self.lines_removed += change.get('lines_removed') or 0
+        self.git_branch = change.get('git_branch') or self.git_branch
+        self.commit_message = change.get('commit_message') or self.commit_message
+        if metadata:
+            self._metadata.append(metadata)
+        
+        # Lines of this save only cancel against earlier saves; within one
+        # save a removed and re-added line is a move and worth keeping
+        new_lines = []
+        for header, lines in parse_hunks(diff):
+            if self.full:
+                break
+            lines = lines[:self.max_lines - self.kept_lines]
+            self.kept_lines += len(lines)
+            for line in lines:
+                tag, text = line
+                if tag == ' ':
+                    continue
+                # A line added in one save and removed in a later one (or the
+                # other way round) is not part of the net change
+                opposite = self._pending['-' if tag == '+' else '+'].get(text)
+                if opposite:
+                    opposite.pop()[0] = None
+                    line[0] = None
+                    self.lines_added -= 1
+                    self.lines_removed -= 1
+                else:
+                    new_lines.append(line)
+            self.hunks.append((header, lines))
+        
+        for line in new_lines:
+            self._pending[line[0]][line[1]].append(line)
+    
+    def finish(self):
+        """Drop cancelled lines and cosmetic hunks, then collect symbols"""
+        self._pending = {'+': defaultdict(list), '-': defaultdict(list)}
+        
+        hunks = []
+        for header, lines in self.hunks:
+            lines = [line for line in lines if line[0] is not None]
+            if not any(tag != ' ' for tag, _ in lines):
+                continue
+            if is_cosmetic(lines):
+                self.cosmetic_hunks += 1
+                self.lines_added -= sum(1 for tag, _ in lines if tag == '+')
+                self.lines_removed -= sum(1 for tag, _ in lines if tag == '-')
+                continue
+            hunks.append((header, lines))
+        self.hunks = hunks
+        self.lines_added = max(0, self.lines_added)
+        self.lines_removed = max(0, self.lines_removed)
+        
+        found = {key: set() for key in SYMBOL_KEYS}
+        for metadata in self._metadata:
+            for key in SYMBOL_KEYS:
+                found[key].update(metadata.get(key) or [])
+        if self.hunks:
+            for key, names in symbols.compare_patch(self.filepath, self.diff_lines()).items():
+                found[key].update(names)
+        self.symbols = {key: sorted(names) for key, names in found.items()}
+        self._metadata = []
+    
+    def diff_lines(self) -> List[str]:
+        """Net diff as unified diff lines"""
+        lines = []
+        for header, hunk in self.hunks:
+            lines.append(header)
+            lines.extend(tag + text for tag, text in hunk)
+        return lines
+    
+    def diff_text(self, max_chars: Optional[int] = None) -> str:
+        """Net diff text, cut at a line boundary to at most max_chars"""
+        text = '\n'.join(self.diff_lines())
+        if max_chars is None or len(text) <= max_chars:
+            return text
+        cut = text.rfind('\n', 0, max_chars)
+        return text[:cut if cut > 0 else max_chars]
+    
+    @property
+    def full(self) -> bool:
+        """No more diff lines are kept for this file"""
+        return self.kept_lines >= self.max_lines
+    
+    @property
+    def cosmetic_only(self) -> bool:
+        """Every change was formatting (or was reverted)"""
+        return not self.hunks and not self.lines_added and not self.lines_removed
+    
+    def rank(self) -> float:
+        """Score by net size and symbol impact"""
+        score = math.log2(1 + self.lines_added + self.lines_removed)
+        for key, weight in SYMBOL_WEIGHTS.items():
+            score += weight * len(self.symbols.get(key, []))
+        if self.low_signal:
+            score *= LOW_SIGNAL_WEIGHT
+        self.score = score
+        return score
+
+
+def collapse(
+    changes: Iterable[Tuple[Dict[str, Any], Optional[Dict[str, List[str]]]]],
+    load_diffs: Callable[[List[Dict[str, Any]]], List[str]],
+    max_total_chars: int = SALIENCE_LOAD_TOTAL_CHARS,
+    batch_size: int = READ_BATCH_SIZE
+) -> List[FileDigest]:
+    """
+    Collapse (change, metadata) pairs, oldest first, into one ranked
+    digest per file, most important first. Changes are read once, so they
+    may come straight from a database cursor.
+    
+    Diffs are loaded a batch of changes at a time, and only for files
+    whose digest is not full, until max_total_chars have been read; the
+    remaining saves still count towards the line totals and symbols.
+    """
+    digests: Dict[str, FileDigest] = {}
+    loaded = 0
+    changes = iter(changes)
+    
+    while True:
+        batch = list(islice(changes, batch_size))
+        if not batch:
+            break
+        
+        wanted = []
+        if loaded < max_total_chars:
+            for change, _ in batch:
+                digest = digests.get(change['filepath'])
+                if digest is None or not digest.full:
+                    wanted.append(change)
+        diffs = dict(zip(map(id, wanted), load_diffs(wanted))) if wanted else {}
+        
+        for change, metadata in batch:
+            filepath = change['filepath']
+            digest = digests.get(filepath)
+            if digest is None:
+                digest = digests[filepath] = FileDigest(filepath, change['filename'])
+            diff = diffs.get(id(change), '')
+            loaded += len(diff)
+            digest.add(change, diff, metadata)
+    
+    for digest in digests.values():
+        digest.finish()
+        digest.rank()
+    return sorted(digests.values(), key=lambda digest: (-digest.score, digest.filepath))
+
+
+def select(
+    digests: List[FileDigest],
+    budget: int,
+    render: Callable[[FileDigest, str], str],
+    max_diff_chars: int = SALIENCE_MAX_DIFF_CHARS,
+    min_diff_chars: int = SALIENCE_MIN_DIFF_CHARS
+) -> List[chunking.Entry]:
+    """
+    Render digests into prompt entries that fit a token budget.
+    
+    Every file gets a header entry (render with an empty diff) so nothing
+    disappears from the summary. What is left of the budget goes to diff
+    excerpts in rank order, up to max_diff_chars per file; excerpts that
+    would be shorter than min_diff_chars are skipped. At least half the
+    budget always goes to diffs, so on days whose headers alone overflow
+    it the top files still show their code and chunking takes the rest.
+    """
+    headers = {id(digest): render(digest, '') for digest in digests}
+    header_cost = sum(
+        chunking.estimate_tokens(text) + chunking.SEPARATOR_TOKENS for text in headers.values()
+    )
+    remaining = max(budget - header_cost, budget // 2)
+    
+    entries = []
+    for digest in digests:
+        text = headers[id(digest)]
+        # Lockfiles and generated code are named but never quoted
+        if digest.hunks and not digest.low_signal and remaining * CHARS_PER_TOKEN >= min_diff_chars:
+            diff = digest.diff_text(min(max_diff_chars, remaining * CHARS_PER_TOKEN))
+            if len(diff) >= min_diff_chars or len(diff) == len(digest.diff_text()):
+                full = render(digest, diff)
+                cost = chunking.estimate_tokens(full) - chunking.estimate_tokens(text)
+                if cost <= remaining:
+                    text = full
+                    remaining -= cost
+        entries.append((chunking.group_key(digest.filepath), text))
+    return entries
@@ -0,0 +1,302 @@
+"""
+File-state cache used as the diff baseline for watched files
+"""
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .config import SNAPSHOT_DB_PATH, FILE_CACHE_MAX_BYTES, PERSIST_SNAPSHOTS
+from .database import ConnectionManager
+
+
+class SnapshotStore:
+    """
+    On-disk store of the last seen content of each file.
+    
+    Lives in its own SQLite file so baseline writes never contend with
+    the change log, and survives restarts so the first save after a
+    restart diffs against the real previous state. It holds source code,
+    so it is never used in privacy mode (see create_snapshot_store()).
+    """
+    
+    def __init__(self, db_path: Path = SNAPSHOT_DB_PATH):
+        self.db_path = db_path
+        self.connections = ConnectionManager(db_path)
+        self._init_db()
+    
+    def _init_db(self):
+        """Initialize snapshot schema"""
+        conn = self.connections.get()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS file_snapshots (
+                    path TEXT PRIMARY KEY,
+                    hash TEXT NOT NULL,
+                    size INTEGER,
+                    mtime_ns INTEGER,
+                    data BLOB NOT NULL
+                )
+            """)
+    
+    def get(self, path: str) -> Optional[Tuple[str, str]]:
+        """Get (hash, content) for a path"""
+        conn = self.connections.get()
+        row = conn.execute(
+            "SELECT hash, data FROM file_snapshots WHERE path = ?", (path,)
+        ).fetchone()
+        
+        if row is None:
+            return None
+        return row["hash"], zlib.decompress(row["data"]).decode("utf-8")
+    
+    def put(
+        self,
+        path: str,
+        file_hash: str,
+        content: str,
+        size: Optional[int] = None,
+        mtime_ns: Optional[int] = None
+    ):
+        """Store the current content of a path"""
+        conn = self.connections.get()
+        with conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO file_snapshots (path, hash, size, mtime_ns, data)
+                VALUES (?, ?, ?, ?, ?)
+            """, (path, file_hash, size, mtime_ns, zlib.compress(content.encode("utf-8"), 1)))
+    
+    def put_many(self, rows: List[Tuple[str, str, str, int, int]]):
+        """Store many (path, hash, content, size, mtime_ns) rows in one transaction"""
+        conn = self.connections.get()
+        with conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO file_snapshots (path, hash, size, mtime_ns, data)
+                VALUES (?, ?, ?, ?, ?)
+            """, (
+                (path, file_hash, size, mtime_ns, zlib.compress(content.encode("utf-8"), 1))
+                for path, file_hash, content, size, mtime_ns in rows
+            ))
+    
+    def get_stats(self, root: str) -> Dict[str, Tuple[int, int]]:
+        """Get {path: (size, mtime_ns)} for every snapshot under a directory"""
+        prefix = root.rstrip("/\\") + os.sep
+        conn = self.connections.get()
+        rows = conn.execute("""
+            SELECT path, size, mtime_ns FROM file_snapshots
+            WHERE path >= ? AND path < ?
+        """, (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)))
+        return {row["path"]: (row["size"], row["mtime_ns"]) for row in rows}
+    
+    def delete(self, path: str):
+        """Forget a path"""
+        conn = self.connections.get()
+        with conn:
+            conn.execute("DELETE FROM file_snapshots WHERE path = ?", (path,))
+    
+    def delete_tree(self, root: str):
+        """Forget every path under a directory"""
+        prefix = root.rstrip("/\\") + os.sep
+        conn = self.connections.get()
+        with conn:
+            conn.execute(
+                "DELETE FROM file_snapshots WHERE path >= ? AND path < ?",
+                (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1))
+            )
+    
+    def close(self):
+        """Close all connections"""
+        self.connections.close_all()
+
+
+class MemorySnapshotStore:
+    """
+    SnapshotStore that keeps its (compressed) snapshots in memory only.
+    
+    Used in privacy mode and when persistence is turned off, so no source
+    code is written to disk; the first save of each file after a restart
+    has no baseline unless --index rebuilds one.
+    """
+    
+    def __init__(self):
+        # path -> (hash, size, mtime_ns, compressed content)
+        self._rows: Dict[str, Tuple[str, Optional[int], Optional[int], bytes]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, path: str) -> Optional[Tuple[str, str]]:
+        """Get (hash, content) for a path"""
+        row = self._rows.get(path)
+        if row is None:
+            return None
+        return row[0], zlib.decompress(row[3]).decode("utf-8")
+    
+    def put(
+        self,
+        path: str,
+        file_hash: str,
+        content: str,
+        size: Optional[int] = None,
+        mtime_ns: Optional[int] = None
+    ):
+        """Store the current content of a path"""
+        with self._lock:
+            self._rows[path] = (file_hash, size, mtime_ns, zlib.compress(content.encode("utf-8"), 1))
+    
+    def put_many(self, rows: List[Tuple[str, str, str, int, int]]):
+        """Store many (path, hash, content, size, mtime_ns) rows"""
+        for path, file_hash, content, size, mtime_ns in rows:
+            self.put(path, file_hash, content, size, mtime_ns)
+    
+    def get_stats(self, root: str) -> Dict[str, Tuple[int, int]]:
+        """Get {path: (size, mtime_ns)} for every snapshot under a directory"""
+        prefix = root.rstrip("/\\") + os.sep
+        with self._lock:
+            return {
+                path: (row[1], row[2]) for path, row in self._rows.items() if path.startswith(prefix)
+            }
+    
+    def delete(self, path: str):
+        """Forget a path"""
+        with self._lock:
+            self._rows.pop(path, None)
+    
+    def delete_tree(self, root: str):
+        """Forget every path under a directory"""
+        prefix = root.rstrip("/\\") + os.sep
+        with self._lock:
+            for path in [path for path in self._rows if path.startswith(prefix)]:
+                del self._rows[path]
+    
+    def close(self):
+        """Drop all snapshots"""
+        with self._lock:
+            self._rows.clear()
+
+
+def create_snapshot_store(privacy_mode: bool, persist: bool = PERSIST_SNAPSHOTS):
+    """
+    Snapshot store for a watcher: on disk, or in memory in privacy mode
+    or with DEVPULSE_PERSIST_SNAPSHOTS=false.
+    
+    Snapshots left on disk by an earlier run are deleted when persistence
+    is off, so privacy mode never keeps source code around.
+    """
+    if persist and not privacy_mode:
+        return SnapshotStore()
+    
+    removed = False
+    for suffix in ("", "-wal", "-shm"):
+        path = Path(str(SNAPSHOT_DB_PATH) + suffix)
+        if path.exists():
+            path.unlink()
+            removed = True
+    if removed:
+        print("🔒 Removed stored file snapshots (not kept in privacy mode)")
+    return MemorySnapshotStore()
+
+
+class FileStateCache:
+    """
+    Bounded in-memory LRU of file contents, backed by a snapshot store.
+    
+    Entries evicted from memory (or never loaded since a restart) are
+    read back from the store on demand. The (size, mtime_ns, inode) of
+    each path is kept separately so unchanged files can be skipped
+    without reading them.
+    """
+    
+    def __init__(
+        self,
+        store: Optional[SnapshotStore] = None,
+        max_bytes: int = FILE_CACHE_MAX_BYTES
+    ):
+        self.store = store
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self._size = 0
+        self._stats: Dict[str, Tuple[int, int, int]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, path: str) -> Optional[Tuple[str, str]]:
+        """Get (hash, content) for a path"""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+                return entry
+        
+        if self.store is None:
+            return None
+        
+        entry = self.store.get(path)
+        if entry is not None:
+            self._remember(path, entry)
+        return entry
+    
+    def put(
+        self,
+        path: str,
+        file_hash: str,
+        content: str,
+        size: Optional[int] = None,
+        mtime_ns: Optional[int] = None,
+        inode: Optional[int] = None
+    ):
+        """Record the current state of a path"""
+        self._remember(path, (file_hash, content))
+        if inode is not None:
+            self.put_stat(path, (size, mtime_ns, inode))
+        
+        if self.store is not None:
+            self.store.put(path, file_hash, content, size, mtime_ns)
+    
+    def forget(self, path: str):
+        """Drop a removed file from memory and the store"""
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._size -= len(old[1])
+        self._stats.pop(path, None)
+        
+        if self.store is not None:
+            self.store.delete(path)
+    
+    def forget_tree(self, root: str):
+        """Drop every file under a removed directory"""
+        prefix = root.rstrip("/\\") + os.sep
+        with self._lock:
+            for path in [path for path in self._entries if path.startswith(prefix)]:
+                self._size -= len(self._entries.pop(path)[1])
+        for path in [path for path in self._stats if path.startswith(prefix)]:
+            self._stats.pop(path, None)
+        
+        if self.store is not None:
+            self.store.delete_tree(root)
+    
+    def get_stat(self, path: str) -> Optional[Tuple[int, int, int]]:
+        """Get the (size, mtime_ns, inode) last recorded for a path"""
+        return self._stats.get(path)
+    
+    def put_stat(self, path: str, stat_key: Tuple[int, int, int]):
+        """Record (size, mtime_ns, inode) for a path"""
+        self._stats[path] = stat_key
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _remember(self, path: str, entry: Tuple[str, str]):
+        """Insert into the LRU and evict down to the memory budget"""
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._size -= len(old[1])
+            
+            self._entries[path] = entry
+            self._size += len(entry[1])
+            
+            # Always keep the newest entry, even if it alone is over budget
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted[1])
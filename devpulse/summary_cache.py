@@ -0,0 +1,183 @@
+"""
+Content-addressed cache of AI summaries
+"""
+import hashlib
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .config import SUMMARY_CACHE_DB_PATH, SUMMARY_CACHE_TTL_DAYS, SUMMARY_CACHE_MAX_BYTES
+from .database import ConnectionManager
+
+
+# Bump when prompts, the system message or request parameters change,
+# so entries produced by the old ones are no longer used
+PROMPT_VERSION = 1
+
+
+def normalize(text: str) -> str:
+    """Line endings and trailing whitespace don't change a prompt's meaning"""
+    return "\n".join(line.rstrip() for line in text.replace("\r\n", "\n").split("\n")).strip()
+
+
+def cache_key(provider: str, model: str, kind: str, prompt: str) -> str:
+    """Hash of everything that determines a response"""
+    digest = hashlib.sha256()
+    for part in (str(PROMPT_VERSION), provider, model, kind, normalize(prompt)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    """
+    On-disk cache of AI responses keyed by cache_key().
+    
+    Whole-day summaries, per-chunk partial summaries and merges are
+    stored as separate entries (by kind), so a re-run whose changes only
+    touched a few directories reuses the partial summaries of the rest.
+    Entries unused for ttl_days expire, and the least recently used are
+    evicted once the cache grows past max_bytes. Hit and miss counters
+    persist across runs.
+    """
+    
+    def __init__(
+        self,
+        db_path: Path = SUMMARY_CACHE_DB_PATH,
+        ttl_days: float = SUMMARY_CACHE_TTL_DAYS,
+        max_bytes: int = SUMMARY_CACHE_MAX_BYTES
+    ):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_days * 86400
+        self.max_bytes = max_bytes
+        self.connections = ConnectionManager(db_path)
+        # Counters for this instance; totals are kept in the database
+        self.hits = 0
+        self.misses = 0
+        self._init_db()
+    
+    def _init_db(self):
+        """Initialize cache schema"""
+        conn = self.connections.get()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS summary_cache (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_summary_cache_accessed ON summary_cache(accessed_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS summary_cache_counters (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+    
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached response, counting the hit or miss"""
+        now = time.time()
+        conn = self.connections.get()
+        with conn:
+            row = conn.execute(
+                "SELECT summary, accessed_at FROM summary_cache WHERE key = ?", (key,)
+            ).fetchone()
+            
+            if row is not None and now - row["accessed_at"] > self.ttl_seconds:
+                conn.execute("DELETE FROM summary_cache WHERE key = ?", (key,))
+                row = None
+            
+            if row is None:
+                self.misses += 1
+                self._count(conn, "misses")
+                return None
+            
+            conn.execute(
+                "UPDATE summary_cache SET accessed_at = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+            self._count(conn, "hits")
+        return row["summary"]
+    
+    def put(self, key: str, kind: str, summary: str):
+        """Store a response"""
+        now = time.time()
+        conn = self.connections.get()
+        with conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO summary_cache (key, kind, summary, size, created_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (key, kind, summary, len(summary.encode("utf-8")), now, now))
+    
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used ones over max_bytes; returns count"""
+        conn = self.connections.get()
+        with conn:
+            removed = conn.execute(
+                "DELETE FROM summary_cache WHERE accessed_at < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+            
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM summary_cache").fetchone()[0]
+            if total <= self.max_bytes:
+                return removed
+            
+            # Oldest first, until what is left fits
+            excess = total - self.max_bytes
+            doomed = []
+            for row in conn.execute("SELECT key, size FROM summary_cache ORDER BY accessed_at"):
+                if excess <= 0:
+                    break
+                doomed.append((row["key"],))
+                excess -= row["size"]
+            conn.executemany("DELETE FROM summary_cache WHERE key = ?", doomed)
+        return removed + len(doomed)
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """Entry counts, size and lifetime hit/miss counters"""
+        conn = self.connections.get()
+        row = conn.execute(
+            "SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS size FROM summary_cache"
+        ).fetchone()
+        kinds = {
+            r["kind"]: r["n"]
+            for r in conn.execute("SELECT kind, COUNT(*) AS n FROM summary_cache GROUP BY kind")
+        }
+        counters = {
+            r["name"]: r["value"]
+            for r in conn.execute("SELECT name, value FROM summary_cache_counters")
+        }
+        
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        return {
+            "entries": row["entries"],
+            "size": row["size"],
+            "kinds": kinds,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        }
+    
+    def clear(self):
+        """Remove every entry and reset the counters"""
+        conn = self.connections.get()
+        with conn:
+            conn.execute("DELETE FROM summary_cache")
+            conn.execute("DELETE FROM summary_cache_counters")
+    
+    def close(self):
+        """Close all connections"""
+        self.connections.close_all()
+    
+    @staticmethod
+    def _count(conn, name: str):
+        """Bump a persistent counter (inside the caller's transaction)"""
+        conn.execute("""
+            INSERT INTO summary_cache_counters (name, value) VALUES (?, 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1
+        """, (name,))
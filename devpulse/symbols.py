@@ -0,0 +1,446 @@
+"""
+Incremental symbol extraction for privacy mode
+"""
+import os
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from .config import SYMBOL_INDEX_FILES, SYMBOL_INDEX_LINES, SYMBOL_SCAN_LIMIT
+from .diffing import Block
+
+
+# (indent, kind, name) for a non-blank line; kind/name are None unless it
+# defines a symbol or imports something. Blank and comment lines are None.
+LineInfo = Optional[Tuple[int, Optional[str], Optional[str]]]
+
+# kind -> key in extract()/compare() results
+PLURALS = {'function': 'functions', 'class': 'classes', 'import': 'imports'}
+
+# Words that look like calls or definitions to the C-style patterns
+KEYWORDS = frozenset({
+    'if', 'for', 'while', 'switch', 'catch', 'return', 'else', 'do', 'new',
+    'sizeof', 'try', 'with', 'delete', 'throw', 'case', 'await', 'typeof',
+    'function', 'elif', 'foreach', 'using', 'lock', 'synchronized',
+})
+
+
+class LanguageSpec:
+    """Line-level patterns for the symbols of one language"""
+    
+    def __init__(
+        self,
+        functions: Sequence[str] = (),
+        classes: Sequence[str] = (),
+        imports: Sequence[str] = (),
+        comments: Tuple[str, ...] = ('#',),
+        flags: int = 0
+    ):
+        self.patterns = [
+            (kind, re.compile(pattern, flags))
+            for kind, patterns in (('class', classes), ('function', functions), ('import', imports))
+            for pattern in patterns
+        ]
+        self.comments = comments
+    
+    def parse_line(self, line: str) -> LineInfo:
+        """Classify one line"""
+        stripped = line.strip()
+        if not stripped or stripped.startswith(self.comments):
+            return None
+        
+        indent = len(line.expandtabs(4)) - len(line.expandtabs(4).lstrip())
+        for kind, pattern in self.patterns:
+            match = pattern.match(stripped)
+            if match:
+                name = next((group for group in match.groups() if group), None)
+                if name and name not in KEYWORDS:
+                    return indent, kind, name
+        return indent, None, None
+
+
+C_COMMENTS = ('//', '/*', '*')
+
+_PYTHON = LanguageSpec(
+    functions=[r'(?:async\s+)?def\s+(\w+)'],
+    classes=[r'class\s+(\w+)'],
+    imports=[r'(?:from|import)\s+([^\s,]+)'],
+)
+
+_JAVASCRIPT = LanguageSpec(
+    functions=[
+        r'(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*(\w+)',
+        r'(?:export\s+)?(?:const|let|var)\s+(\w+)\s*=\s*(?:async\s+)?(?:function\b|\([^)]*\)\s*=>|\w+\s*=>)',
+        r'(?:(?:public|private|protected|static|async|get|set|readonly|override)\s+)*\*?(\w+)\s*\([^)]*\)\s*(?::\s*[^{=]+)?\{',
+    ],
+    classes=[r'(?:export\s+)?(?:default\s+)?(?:abstract\s+)?(?:class|interface|enum)\s+(\w+)'],
+    imports=[
+        r'import\s+(?:.*?\s+from\s+)?[\'"]([^\'"]+)[\'"]',
+        r'(?:const|let|var)\s+.*?=\s*require\(\s*[\'"]([^\'"]+)',
+    ],
+    comments=C_COMMENTS,
+)
+
+_GO = LanguageSpec(
+    functions=[r'func\s+(?:\([^)]*\)\s*)?(\w+)'],
+    classes=[r'type\s+(\w+)\s+(?:struct|interface)\b'],
+    imports=[r'import\s+(?:\w+\s+)?"([^"]+)"', r'(?:\w+\s+)?"([\w./-]+)"$'],
+    comments=C_COMMENTS,
+)
+
+_RUST = LanguageSpec(
+    functions=[r'(?:pub(?:\([^)]*\))?\s+)?(?:const\s+)?(?:async\s+)?(?:unsafe\s+)?(?:extern\s+"[^"]*"\s+)?fn\s+(\w+)'],
+    classes=[
+        r'(?:pub(?:\([^)]*\))?\s+)?(?:struct|enum|trait|union)\s+(\w+)',
+        r'impl(?:<[^>]*>)?\s+(?:[\w:<>]+\s+for\s+)?(\w+)',
+    ],
+    imports=[r'(?:pub\s+)?use\s+([^;{\s]+)', r'(?:pub\s+)?mod\s+(\w+)\s*;'],
+    comments=C_COMMENTS,
+)
+
+_C = LanguageSpec(
+    functions=[r'(?:[\w:*&<>,]+\s+)+[*&]*([A-Za-z_]\w*(?:::~?\w+)*)\s*\([^;]*$'],
+    classes=[r'(?:typedef\s+)?(?:class|struct|union|enum(?:\s+class)?)\s+(\w+)\s*(?::[^;{]*)?\{?\s*$'],
+    imports=[r'#\s*include\s*[<"]([^>"]+)'],
+    comments=C_COMMENTS,
+)
+
+_JAVA = LanguageSpec(
+    functions=[
+        r'(?:(?:public|private|protected|static|final|abstract|synchronized|native|default)\s+)*'
+        r'(?:<[^>]+>\s+)?[\w<>\[\],.?]+\s+(\w+)\s*\([^;]*$',
+    ],
+    classes=[r'(?:(?:public|private|protected|static|final|abstract|sealed)\s+)*(?:class|interface|enum|record|@interface)\s+(\w+)'],
+    imports=[r'import\s+(?:static\s+)?([\w.*]+)'],
+    comments=C_COMMENTS,
+)
+
+_KOTLIN = LanguageSpec(
+    functions=[
+        r'(?:(?:public|private|protected|internal|override|open|abstract|suspend|inline|operator|infix|tailrec|final)\s+)*'
+        r'fun\s+(?:<[^>]+>\s+)?(?:[\w.]+\.)?(\w+)',
+    ],
+    classes=[
+        r'(?:(?:public|private|protected|internal|open|abstract|sealed|data|enum|inner|final|annotation)\s+)*'
+        r'(?:class|interface|object)\s+(\w+)',
+    ],
+    imports=[r'import\s+([\w.*]+)'],
+    comments=C_COMMENTS,
+)
+
+_SWIFT = LanguageSpec(
+    functions=[r'(?:(?:public|private|fileprivate|internal|open|static|class|override|final|mutating|@\w+)\s+)*func\s+(\w+)'],
+    classes=[r'(?:(?:public|private|fileprivate|internal|open|final)\s+)*(?:class|struct|enum|protocol|extension|actor)\s+(\w+)'],
+    imports=[r'import\s+(\w+)'],
+    comments=C_COMMENTS,
+)
+
+_RUBY = LanguageSpec(
+    functions=[r'def\s+(?:self\.)?(\w+[?!=]?)'],
+    classes=[r'(?:class|module)\s+([\w:]+)'],
+    imports=[r'(?:require|require_relative|load)\s*\(?\s*[\'"]([^\'"]+)'],
+)
+
+_PHP = LanguageSpec(
+    functions=[r'(?:(?:public|private|protected|static|abstract|final)\s+)*function\s+&?(\w+)'],
+    classes=[r'(?:(?:abstract|final|readonly)\s+)*(?:class|interface|trait|enum)\s+(\w+)'],
+    imports=[r'use\s+([\w\\]+)', r'(?:require|include)(?:_once)?\s*\(?\s*[\'"]([^\'"]+)'],
+    comments=('#',) + C_COMMENTS,
+)
+
+_SQL = LanguageSpec(
+    functions=[r'create\s+(?:or\s+replace\s+)?(?:function|procedure|trigger)\s+([\w."]+)'],
+    classes=[
+        r'create\s+(?:or\s+replace\s+)?(?:temp(?:orary)?\s+)?(?:table|view|materialized\s+view|(?:unique\s+)?index)\s+'
+        r'(?:if\s+not\s+exists\s+)?([\w."]+)',
+    ],
+    comments=('--', '/*', '*'),
+    flags=re.IGNORECASE,
+)
+
+_SHELL = LanguageSpec(
+    functions=[r'function\s+([\w-]+)', r'([\w-]+)\s*\(\s*\)\s*\{?\s*$'],
+    imports=[r'(?:source|\.)\s+([^\s;]+)'],
+)
+
+_STYLESHEET = LanguageSpec(
+    functions=[r'@(?:mixin|function)\s+([\w-]+)'],
+    imports=[r'@(?:import|use|forward)\s+[\'"]?([^\'";\s]+)'],
+    comments=C_COMMENTS,
+)
+
+# Markup and data files (.html, .json, .yaml, .toml, .md, .txt) have no symbols
+LANGUAGES: Dict[str, LanguageSpec] = {
+    '.py': _PYTHON,
+    '.js': _JAVASCRIPT, '.jsx': _JAVASCRIPT, '.ts': _JAVASCRIPT, '.tsx': _JAVASCRIPT,
+    '.go': _GO,
+    '.rs': _RUST,
+    '.c': _C, '.h': _C, '.cpp': _C, '.hpp': _C,
+    '.java': _JAVA,
+    '.kt': _KOTLIN,
+    '.swift': _SWIFT,
+    '.rb': _RUBY,
+    '.php': _PHP,
+    '.sql': _SQL,
+    '.sh': _SHELL, '.bash': _SHELL,
+    '.css': _STYLESHEET, '.scss': _STYLESHEET, '.sass': _STYLESHEET,
+}
+
+
+class SymbolIndex:
+    """
+    Parsed lines of one file.
+    
+    Lines are parsed on demand and memoized by their text, so a save only
+    parses the changed lines plus the lines walked to find the symbols
+    around them; everything else is a dict lookup or not touched at all.
+    """
+    
+    def __init__(self, spec: LanguageSpec, max_lines: int = SYMBOL_INDEX_LINES):
+        self.spec = spec
+        self.max_lines = max_lines
+        self._lines: Dict[str, LineInfo] = {}
+    
+    def parse(self, line: str) -> LineInfo:
+        """Parse a line, memoized"""
+        try:
+            return self._lines[line]
+        except KeyError:
+            pass
+        
+        if len(self._lines) >= self.max_lines:
+            self._lines.clear()
+        info = self._lines[line] = self.spec.parse_line(line)
+        return info
+    
+    def definitions(self, lines: Sequence[str], start: int, end: int) -> List[Tuple[str, str]]:
+        """(kind, name) of everything defined or imported in lines[start:end]"""
+        found = []
+        for i in range(start, end):
+            info = self.parse(lines[i])
+            if info is not None and info[1] is not None:
+                found.append((info[1], info[2]))
+        return found
+    
+    def enclosing(self, lines: Sequence[str], start: int, end: int) -> List[Tuple[str, str]]:
+        """
+        Symbols whose bodies contain lines[start:end].
+        
+        Each run of indented changed lines is resolved on its own, so a
+        top-level line elsewhere in the block does not hide the symbols
+        around the rest of it.
+        """
+        # [first line, smallest indent] of each run of indented lines
+        runs = []
+        current = None
+        seen_content = False
+        for i in range(start, end):
+            info = self.parse(lines[i])
+            if info is None:
+                # Blank and comment lines neither start nor end a run
+                continue
+            seen_content = True
+            if info[0] == 0:
+                current = None
+            elif current is None:
+                current = [i, info[0]]
+                runs.append(current)
+            else:
+                current[1] = min(current[1], info[0])
+        
+        if not seen_content:
+            # Only blank lines changed; use the next line with content
+            for i in range(end, min(len(lines), end + SYMBOL_SCAN_LIMIT)):
+                info = self.parse(lines[i])
+                if info is not None:
+                    runs.append([start, info[0]])
+                    break
+        
+        found: Dict[Tuple[str, str], None] = {}
+        for run_start, limit in runs:
+            if limit:
+                for symbol in self._walk_up(lines, run_start, limit):
+                    found[symbol] = None
+        return list(found)
+    
+    def _walk_up(self, lines: Sequence[str], start: int, limit: int) -> List[Tuple[str, str]]:
+        """
+        Definitions enclosing lines[start], indented less than limit.
+        
+        Walks up from the line, narrowing the indentation each time a less
+        indented line is seen, and collects the definitions on that path.
+        The walk stops at top level or after SYMBOL_SCAN_LIMIT lines.
+        """
+        found = []
+        for i in range(start - 1, max(-1, start - 1 - SYMBOL_SCAN_LIMIT), -1):
+            info = self.parse(lines[i])
+            if info is None or info[0] >= limit:
+                continue
+            
+            limit = info[0]
+            if info[1] in ('function', 'class'):
+                found.append((info[1], info[2]))
+            if limit == 0:
+                break
+        return found
+
+
+class SymbolCache:
+    """LRU of SymbolIndex objects keyed by path"""
+    
+    def __init__(self, max_files: int = SYMBOL_INDEX_FILES):
+        self.max_files = max_files
+        self._indexes: "OrderedDict[str, SymbolIndex]" = OrderedDict()
+    
+    def get(self, filepath: str) -> Optional[SymbolIndex]:
+        """Get the index for a file, or None if its language has no symbols"""
+        index = self._indexes.get(filepath)
+        if index is not None:
+            self._indexes.move_to_end(filepath)
+            return index
+        
+        spec = LANGUAGES.get(os.path.splitext(filepath)[1].lower())
+        if spec is None:
+            return None
+        
+        index = self._indexes[filepath] = SymbolIndex(spec)
+        if len(self._indexes) > self.max_files:
+            self._indexes.popitem(last=False)
+        return index
+
+
+# One per process, so process-pool workers keep their own
+_cache = SymbolCache()
+
+
+def extract(filepath: str, code: str) -> dict:
+    """Extract all functions, classes and imports from a file's content"""
+    symbols = {'functions': [], 'classes': [], 'imports': []}
+    index = _cache.get(filepath)
+    if index is None:
+        return symbols
+    
+    lines = code.splitlines()
+    for kind, name in index.definitions(lines, 0, len(lines)):
+        symbols[PLURALS[kind]].append(name)
+    return symbols
+
+
+def _summarize(
+    added: Dict[str, Set[str]],
+    removed: Dict[str, Set[str]],
+    modified: Dict[str, Set[str]]
+) -> dict:
+    """Resolve names seen on both sides into modifications and build the metadata dict"""
+    for kind in ('function', 'class'):
+        both = added[kind] & removed[kind]
+        modified[kind] |= both
+        added[kind] -= both
+        removed[kind] -= both
+        modified[kind] -= added[kind] | removed[kind]
+    
+    return {
+        'functions_added': sorted(added['function']),
+        'functions_modified': sorted(modified['function']),
+        'functions_removed': sorted(removed['function']),
+        'classes_added': sorted(added['class']),
+        'classes_modified': sorted(modified['class']),
+        'imports_changed': sorted(added['import'] ^ removed['import']),
+    }
+
+
+def _empty_sets() -> Tuple[Dict[str, Set[str]], Dict[str, Set[str]], Dict[str, Set[str]]]:
+    """Fresh added/removed/modified name sets"""
+    return (
+        {'function': set(), 'class': set(), 'import': set()},
+        {'function': set(), 'class': set(), 'import': set()},
+        {'function': set(), 'class': set()},
+    )
+
+
+def compare(
+    filepath: str,
+    old_lines: Sequence[str],
+    new_lines: Sequence[str],
+    blocks: List[Block]
+) -> dict:
+    """
+    Summarize symbol changes from diff blocks.
+    
+    Definitions only in new blocks are added and only in old blocks are
+    removed; a definition that appears on both sides (edited signature,
+    moved body) or that encloses a changed line is modified.
+    """
+    index = _cache.get(filepath)
+    added, removed, modified = _empty_sets()
+    
+    if index is not None:
+        for a1, a2, b1, b2 in blocks:
+            for kind, name in index.definitions(old_lines, a1, a2):
+                removed[kind].add(name)
+            for kind, name in index.definitions(new_lines, b1, b2):
+                added[kind].add(name)
+            
+            # Pure deletions are located in the old file, everything else in the new
+            if b1 == b2:
+                around = index.enclosing(old_lines, a1, a2)
+            else:
+                around = index.enclosing(new_lines, b1, b2)
+            for kind, name in around:
+                modified[kind].add(name)
+    
+    return _summarize(added, removed, modified)
+
+
+def compare_patch(filepath: str, patch: Sequence[str]) -> dict:
+    """
+    Summarize symbol changes from unified diff lines alone.
+    
+    Used when the file contents are not available (imported history).
+    The enclosing symbol of each hunk comes from the function context git
+    prints after the hunk range.
+    """
+    index = _cache.get(filepath)
+    added, removed, modified = _empty_sets()
+    if index is None:
+        return _summarize(added, removed, modified)
+    
+    minus, plus = [], []
+    in_hunk = False
+    # Innermost definition among the hunk's context lines
+    enclosing = None
+    for line in patch:
+        if line.startswith('@@'):
+            in_hunk = True
+            enclosing = None
+            context = line.split('@@', 2)[-1]
+            info = index.parse(context) if context.strip() else None
+            if info is not None and info[1] in ('function', 'class'):
+                modified[info[1]].add(info[2])
+            continue
+        if not in_hunk:
+            # File headers (---/+++) come before the first hunk
+            continue
+        
+        info = index.parse(line[1:])
+        if line.startswith(' '):
+            if info is not None and info[1] in ('function', 'class'):
+                enclosing = info
+            continue
+        
+        if line.startswith('+'):
+            plus.append(line[1:])
+        elif line.startswith('-'):
+            minus.append(line[1:])
+        else:
+            continue
+        
+        if enclosing is not None and info is not None and info[0] > enclosing[0]:
+            modified[enclosing[1]].add(enclosing[2])
+    
+    for kind, name in index.definitions(minus, 0, len(minus)):
+        removed[kind].add(name)
+    for kind, name in index.definitions(plus, 0, len(plus)):
+        added[kind].add(name)
+    
+    return _summarize(added, removed, modified)
@@ -2,18 +2,37 @@
 File watcher implementation using watchdog
 """
 import hashlib
-import difflib
+import mmap
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, List, Set
-import fnmatch
-import subprocess
-import re
+from typing import Optional, List, Dict, Set, Callable, Tuple
+import os
+import queue
+import threading
+import time
 
 from watchdog.events import FileSystemEventHandler, FileModifiedEvent
 from watchdog.observers import Observer
+from watchdog.observers.api import ObservedWatch
 
-from .config import EXCLUSION_PATTERNS, TRACKED_EXTENSIONS
+from .config import (
+    DEBOUNCE_SECONDS, DEBOUNCE_MAX_WAIT_SECONDS, EVENT_QUEUE_SIZE, WORKER_COUNT, WORKER_POOL, INDEX_ON_START,
+    WATCH_PRUNE_EXCLUDED, RESPECT_GITIGNORE, MMAP_THRESHOLD
+)
+from .blobs import compress_diff
+from . import diffing, symbols
 from .database import Database
+from .filters import ExclusionMatcher
+from .gitignore import GitIgnoreMatcher
+from .gitmeta import GitMetadataCache
+from .indexer import BaselineIndexer
+from .snapshots import FileStateCache, SnapshotStore, create_snapshot_store
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
 
 
 class CodeAnalyzer:
@@ -22,56 +41,81 @@ class CodeAnalyzer:
     @staticmethod
     def extract_python_symbols(code: str) -> dict:
         """Extract function and class names from Python code"""
-        functions = re.findall(r'^\s*def\s+(\w+)\s*\(', code, re.MULTILINE)
-        classes = re.findall(r'^\s*class\s+(\w+)\s*[:\(]', code, re.MULTILINE)
-        imports = re.findall(r'^\s*(?:from|import)\s+([^\s]+)', code, re.MULTILINE)
-        
-        return {
-            'functions': functions,
-            'classes': classes,
-            'imports': imports
-        }
+        return symbols.extract('.py', code)
     
     @staticmethod
     def extract_js_symbols(code: str) -> dict:
         """Extract function and class names from JavaScript/TypeScript code"""
-        functions = re.findall(r'(?:function\s+(\w+)|(?:const|let|var)\s+(\w+)\s*=\s*(?:async\s+)?(?:function|\([^)]*\)\s*=>))', code, re.MULTILINE)
-        classes = re.findall(r'class\s+(\w+)\s*[{]', code, re.MULTILINE)
-        imports = re.findall(r'import\s+.*?\s+from\s+[\'"]([^\'"]+)[\'"]', code, re.MULTILINE)
-        
-        # Flatten tuple results
-        functions = [f[0] or f[1] for f in functions]
-        
-        return {
-            'functions': functions,
-            'classes': classes,
-            'imports': imports
-        }
+        return symbols.extract('.js', code)
     
     @staticmethod
     def extract_symbols(filepath: str, code: str) -> dict:
         """Extract symbols based on file extension"""
-        ext = Path(filepath).suffix
-        
-        if ext == '.py':
-            return CodeAnalyzer.extract_python_symbols(code)
-        elif ext in ['.js', '.ts', '.jsx', '.tsx']:
-            return CodeAnalyzer.extract_js_symbols(code)
-        else:
-            return {'functions': [], 'classes': [], 'imports': []}
+        return symbols.extract(filepath, code)
+    
+    @staticmethod
+    def compare_symbols(filepath: str, old_content: str, new_content: str) -> dict:
+        """Compare symbols between two versions of a file"""
+        old_lines = old_content.splitlines()
+        new_lines = new_content.splitlines()
+        blocks = diffing.diff_lines(old_lines, new_lines)
+        if blocks is None:
+            blocks = [(0, len(old_lines), 0, len(new_lines))]
+        return symbols.compare(filepath, old_lines, new_lines, blocks)
+
+
+# Shared so every handler reuses the same per-repository state
+_git_metadata = GitMetadataCache()
 
 
 class DiffAnalyzer:
     """Analyze file diffs"""
     
+    @staticmethod
+    def hash_bytes(data) -> str:
+        """Content hash used for change detection (xxh3 if available, else BLAKE2b)"""
+        if xxhash is not None:
+            return xxhash.xxh3_128_hexdigest(data)
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+    
     @staticmethod
     def compute_file_hash(filepath: Path) -> str:
-        """Compute SHA256 hash of file"""
+        """Compute the content hash of a file"""
+        state = DiffAnalyzer.read_file(filepath)
+        return state[0] if state else ""
+    
+    @staticmethod
+    def stat_key(stat: os.stat_result) -> Tuple[int, int, int]:
+        """(size, mtime_ns, inode) used to skip files that have not changed"""
+        return stat.st_size, stat.st_mtime_ns, stat.st_ino
+    
+    @staticmethod
+    def read_file(filepath) -> Optional[Tuple[str, str, int, int]]:
+        """
+        Read a text file once.
+        
+        Returns (hash, content, size, mtime_ns), or None for binary and
+        unreadable files. The hash and the text come from the same buffer;
+        large files are mapped instead of copied. Content is decoded like
+        text-mode open() (UTF-8, universal newlines).
+        """
         try:
             with open(filepath, 'rb') as f:
-                return hashlib.sha256(f.read()).hexdigest()
-        except Exception:
-            return ""
+                stat = os.fstat(f.fileno())
+                if stat.st_size >= MMAP_THRESHOLD:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        file_hash = DiffAnalyzer.hash_bytes(data)
+                        content = str(data, 'utf-8')
+                else:
+                    data = f.read()
+                    file_hash = DiffAnalyzer.hash_bytes(data)
+                    content = data.decode('utf-8')
+        except (OSError, ValueError):
+            # UnicodeDecodeError is a ValueError; so is mapping a file that shrank to zero
+            return None
+        
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+        return file_hash, content, stat.st_size, stat.st_mtime_ns
     
     @staticmethod
     def get_diff(old_content: str, new_content: str) -> tuple[str, int, int, int]:
@@ -79,202 +123,616 @@ class DiffAnalyzer:
         Compute diff between old and new content
         Returns: (diff_text, lines_added, lines_removed, lines_modified)
         """
-        old_lines = old_content.splitlines(keepends=True)
-        new_lines = new_content.splitlines(keepends=True)
-        
-        diff = list(difflib.unified_diff(old_lines, new_lines, lineterm=''))
-        diff_text = '\n'.join(diff)
-        
-        lines_added = sum(1 for line in diff if line.startswith('+') and not line.startswith('+++'))
-        lines_removed = sum(1 for line in diff if line.startswith('-') and not line.startswith('---'))
-        lines_modified = min(lines_added, lines_removed)
-        
-        return diff_text, lines_added, lines_removed, lines_modified
+        return diffing.get_diff(old_content, new_content)
     
     @staticmethod
     def get_git_branch(filepath: Path) -> Optional[str]:
         """Get current git branch"""
-        try:
-            result = subprocess.run(
-                ['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
-                cwd=filepath.parent,
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                return result.stdout.strip()
-        except Exception:
-            pass
-        return None
+        return _git_metadata.get_branch(filepath)
     
     @staticmethod
     def get_last_commit_message(filepath: Path) -> Optional[str]:
         """Get last commit message for file"""
-        try:
-            result = subprocess.run(
-                ['git', 'log', '-1', '--pretty=%B', '--', str(filepath)],
-                cwd=filepath.parent,
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                return result.stdout.strip()
-        except Exception:
-            pass
+        return _git_metadata.get_last_commit_message(filepath)
+
+
+def analyze_change(
+    filepath: str,
+    old_hash: str,
+    old_content: str,
+    new_hash: str,
+    new_content: str,
+    privacy_mode: bool = False
+) -> Optional[dict]:
+    """
+    CPU-bound part of processing a change: diffing and symbol extraction.
+    Kept at module level so it can run in a process pool.
+    
+    Returns None if the file is unchanged.
+    """
+    # Equal text under a different hash means only line endings changed
+    # (or the baseline was hashed with an older algorithm)
+    if old_hash == new_hash or old_content == new_content:
         return None
+    
+    old_lines = old_content.splitlines()
+    new_lines = new_content.splitlines()
+    
+    if old_content:
+        blocks = diffing.diff_lines(old_lines, new_lines)
+        diff_text, lines_added, lines_removed, lines_modified = diffing.render(
+            old_lines, new_lines, blocks
+        )
+    else:
+        # New file
+        blocks = None
+        diff_text = new_content
+        lines_added = len(new_lines)
+        lines_removed = 0
+        lines_modified = 0
+    
+    metadata = None
+    if privacy_mode:
+        # Symbols are only looked up around the changed blocks
+        if blocks is None:
+            blocks = [(0, len(old_lines), 0, len(new_lines))]
+        metadata = symbols.compare(filepath, old_lines, new_lines, blocks)
+    
+    return {
+        'file_hash': new_hash,
+        'diff_text': diff_text,
+        # Compressed here so the work is spread over the pool, not the writer
+        'diff_blob': compress_diff(diff_text) if diff_text and not privacy_mode else None,
+        'lines_added': lines_added,
+        'lines_removed': lines_removed,
+        'lines_modified': lines_modified,
+        'metadata': metadata,
+    }
+
+
+class ChangeWorkerPool:
+    """
+    Worker lanes for change processing.
+    
+    Each path is pinned to one lane, so changes to the same file are
+    processed in order while unrelated paths run in parallel. CPU-bound
+    work can optionally be handed to a process pool.
+    """
+    
+    def __init__(
+        self,
+        callback: Callable[[str], None],
+        workers: int = WORKER_COUNT,
+        pool_type: str = WORKER_POOL
+    ):
+        if pool_type not in ("thread", "process"):
+            raise ValueError(f"Unsupported pool type: {pool_type}")
+        
+        self.callback = callback
+        self.workers = max(1, workers)
+        self.pool_type = pool_type
+        self._lanes: List[queue.Queue] = [queue.Queue() for _ in range(self.workers)]
+        self._threads: List[threading.Thread] = []
+        self._executor: Optional[ProcessPoolExecutor] = None
+    
+    def start(self):
+        """Start worker lanes"""
+        if self._threads:
+            return
+        
+        if self.pool_type == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        
+        for i, lane in enumerate(self._lanes):
+            thread = threading.Thread(
+                target=self._run, args=(lane,), name=f"devpulse-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+    
+    def stop(self):
+        """Finish queued work and stop worker lanes"""
+        for lane in self._lanes:
+            lane.put(None)
+        
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+    
+    def submit(self, filepath: str):
+        """Queue a path on its lane"""
+        self.submit_task(filepath, self.callback, filepath)
+    
+    def submit_task(self, filepath: str, fn: Callable, *args):
+        """Queue other work for a path on its lane, in order with its changes"""
+        if not self._threads:
+            # Not started: run inline
+            fn(*args)
+            return
+        
+        self._lanes[hash(filepath) % self.workers].put((fn, args))
+    
+    def run_cpu(self, fn: Callable, *args):
+        """Run a CPU-bound function on the process pool if configured"""
+        if self._executor:
+            return self._executor.submit(fn, *args).result()
+        return fn(*args)
+    
+    def _run(self, lane: queue.Queue):
+        """Worker loop"""
+        while True:
+            task = lane.get()
+            if task is None:
+                return
+            
+            fn, args = task
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Error processing {args[0] if args else fn}: {e}")
+
+
+class DebouncedEventQueue:
+    """
+    Bounded, per-path debounce queue between watchdog and the handler.
+    
+    Repeated events for the same path inside the debounce window collapse
+    into a single callback, so a burst is processed once against the
+    state cached before the burst started. A path that keeps changing is
+    not pushed back past max_wait_seconds after its first pending event.
+    """
+    
+    def __init__(
+        self,
+        callback: Callable[[str], None],
+        debounce_seconds: float = DEBOUNCE_SECONDS,
+        maxsize: int = EVENT_QUEUE_SIZE,
+        max_wait_seconds: float = DEBOUNCE_MAX_WAIT_SECONDS
+    ):
+        self.callback = callback
+        self.debounce_seconds = debounce_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.maxsize = maxsize
+        self.dropped = 0
+        # filepath -> (due time, time of first pending event); re-queued
+        # paths move to the end, so the dict stays ordered by due time
+        self._pending: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+    
+    def put(self, filepath: str) -> bool:
+        """Queue a path for processing (never blocks on I/O)"""
+        with self._cond:
+            now = time.monotonic()
+            due = now + self.debounce_seconds
+            
+            pending = self._pending.get(filepath)
+            if pending is not None:
+                first = pending[1]
+                # Past the max wait the path keeps its due time (which is
+                # earlier), so continuous writes are still handed over
+                if due - first <= self.max_wait_seconds:
+                    self._pending[filepath] = (due, first)
+                    self._pending.move_to_end(filepath)
+                return True
+            
+            if len(self._pending) >= self.maxsize:
+                self.dropped += 1
+                return False
+            
+            self._pending[filepath] = (due, now)
+            self._cond.notify()
+            return True
+    
+    def start(self):
+        """Start the dispatcher thread"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        
+        self._thread = threading.Thread(
+            target=self._run, name="devpulse-debounce", daemon=True
+        )
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the dispatcher after draining pending paths"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+    
+    def _next_due(self) -> Optional[str]:
+        """Wait for the next path whose debounce window has elapsed"""
+        with self._cond:
+            while True:
+                if not self._pending:
+                    if not self._running:
+                        return None
+                    self._cond.wait()
+                    continue
+                
+                filepath, (due, _) = next(iter(self._pending.items()))
+                delay = due - time.monotonic()
+                
+                # Pending paths are flushed immediately on shutdown
+                if delay > 0 and self._running:
+                    self._cond.wait(delay)
+                    continue
+                
+                del self._pending[filepath]
+                return filepath
+    
+    def _run(self):
+        """Dispatcher loop"""
+        while True:
+            filepath = self._next_due()
+            if filepath is None:
+                return
+            
+            try:
+                self.callback(filepath)
+            except Exception as e:
+                print(f"Error processing {filepath}: {e}")
 
 
 class DevPulseEventHandler(FileSystemEventHandler):
     """Handle file system events"""
     
-    def __init__(self, db: Database, privacy_mode: bool = False):
+    def __init__(
+        self,
+        db: Database,
+        privacy_mode: bool = False,
+        workers: int = WORKER_COUNT,
+        pool_type: str = WORKER_POOL,
+        snapshots: Optional[SnapshotStore] = None,
+        roots: Optional[List[str]] = None
+    ):
         self.db = db
         self.privacy_mode = privacy_mode
-        self.file_cache: dict = {}  # filepath -> (hash, content)
+        # filepath -> (hash, content), bounded in memory and backed by the snapshot store
+        self.file_cache = FileStateCache(snapshots)
+        # Watch roots bound ignore-file lookups outside git repositories
+        gitignore = GitIgnoreMatcher(roots=roots or ()) if RESPECT_GITIGNORE else None
+        self.matcher = ExclusionMatcher(gitignore=gitignore)
+        # Notified of directory creation/removal (set by FileWatcher)
+        self.directory_listener = None
+        self.pool = ChangeWorkerPool(self.process_path, workers, pool_type)
+        self.queue = DebouncedEventQueue(self.pool.submit)
+    
+    def start(self):
+        """Start processing queued events"""
+        self.pool.start()
+        self.queue.start()
+    
+    def stop(self):
+        """Process remaining queued events and stop"""
+        self.queue.stop()
+        self.pool.stop()
     
     def should_ignore(self, filepath: str) -> bool:
         """Check if file should be ignored based on exclusion patterns"""
-        path = Path(filepath)
+        return self.matcher.should_ignore(filepath)
+    
+    def should_prune(self, dirpath: str) -> bool:
+        """Check if a directory is excluded or ignored (nothing below it is tracked)"""
+        return self.matcher.should_prune(dirpath)
+    
+    def on_modified(self, event):
+        """Handle file modification event"""
+        if event.is_directory:
+            return
         
-        # Check if extension is tracked
-        if TRACKED_EXTENSIONS and path.suffix not in TRACKED_EXTENSIONS:
-            return True
+        self._enqueue(event.src_path)
+    
+    def on_created(self, event):
+        """Handle file creation event"""
+        if event.is_directory:
+            if self.directory_listener:
+                self.directory_listener.directory_created(event.src_path)
+            return
         
-        # Check exclusion patterns
-        for pattern in EXCLUSION_PATTERNS:
-            # Check filename
-            if fnmatch.fnmatch(path.name, pattern):
-                return True
-            
-            # Check full path parts
-            for part in path.parts:
-                if fnmatch.fnmatch(part, pattern):
-                    return True
+        self._enqueue(event.src_path)
+    
+    def on_deleted(self, event):
+        """Handle deletion event"""
+        if event.is_directory:
+            self._forget(event.src_path, tree=True)
+            if self.directory_listener:
+                self.directory_listener.directory_removed(event.src_path)
+            return
         
-        return False
+        if not self._reload_ignore_file(event.src_path):
+            self._forget(event.src_path)
     
-    def on_modified(self, event):
-        """Handle file modification event"""
+    def on_moved(self, event):
+        """Handle rename event (atomic saves write a temp file and rename it)"""
         if event.is_directory:
+            self._forget(event.src_path, tree=True)
+            if self.directory_listener:
+                self.directory_listener.directory_removed(event.src_path)
+                self.directory_listener.directory_created(event.dest_path)
             return
         
-        filepath = Path(event.src_path)
+        if not self._reload_ignore_file(event.src_path):
+            self._forget(event.src_path)
+        self._enqueue(event.dest_path)
+    
+    def _forget(self, src_path, tree: bool = False):
+        """Drop the stored snapshot of a removed file or directory on its worker lane"""
+        path = str(Path(src_path))
+        self.pool.submit_task(path, self.file_cache.forget_tree if tree else self.file_cache.forget, path)
+    
+    def _reload_ignore_file(self, src_path) -> bool:
+        """Pick up edits to .gitignore/.devpulseignore; True if the path was one"""
+        gitignore = self.matcher.gitignore
+        if gitignore is None or not gitignore.is_ignore_file(str(src_path)):
+            return False
+        
+        gitignore.invalidate(str(Path(src_path)))
+        return True
+    
+    def _enqueue(self, src_path):
+        """Queue a path for debounced processing"""
+        filepath = str(Path(src_path))
+        
+        if self._reload_ignore_file(filepath):
+            return
         
-        if self.should_ignore(str(filepath)):
+        # Runs on the observer thread, so only the patterns are checked
+        # here; ignore files are read by the worker in process_path()
+        if self.matcher.is_excluded(filepath):
             return
         
+        if not self.queue.put(filepath):
+            print(f"Event queue full, dropped: {filepath}")
+    
+    def process_path(self, filepath: str):
+        """Process a debounced path"""
         try:
-            self._process_file_change(filepath)
+            if self.should_ignore(filepath):
+                return
+            self._process_file_change(Path(filepath))
         except Exception as e:
             print(f"Error processing {filepath}: {e}")
     
     def _process_file_change(self, filepath: Path):
         """Process a file change"""
-        # Read new content
+        path = str(filepath)
+        
+        # Fast path: nothing to do if size, mtime and inode are unchanged
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                new_content = f.read()
-        except UnicodeDecodeError:
-            # Skip binary files
+            stat_key = DiffAnalyzer.stat_key(os.stat(filepath))
+        except FileNotFoundError:
+            # Removed before the debounce window elapsed
             return
-        except Exception as e:
+        except OSError as e:
             print(f"Could not read {filepath}: {e}")
             return
         
-        # Compute new hash
-        new_hash = DiffAnalyzer.compute_file_hash(filepath)
+        if self.file_cache.get_stat(path) == stat_key:
+            return
+        
+        # Read, hash and decode in one pass; None for binary files
+        state = DiffAnalyzer.read_file(filepath)
+        if state is None:
+            return
+        new_hash, new_content, _, _ = state
         
         # Get old content from cache
-        old_hash, old_content = self.file_cache.get(str(filepath), ("", ""))
+        old_hash, old_content = self.file_cache.get(path) or ("", "")
         
-        # Skip if file hasn't changed
-        if old_hash == new_hash:
+        if new_hash == old_hash:
+            self.file_cache.put_stat(path, stat_key)
             return
         
-        # Compute diff
-        if old_content:
-            diff_text, lines_added, lines_removed, lines_modified = DiffAnalyzer.get_diff(
-                old_content, new_content
-            )
-        else:
-            # New file
-            diff_text = new_content
-            lines_added = len(new_content.splitlines())
-            lines_removed = 0
-            lines_modified = 0
+        # Diff and symbols run on the CPU pool
+        result = self.pool.run_cpu(
+            analyze_change, path, old_hash, old_content, new_hash, new_content, self.privacy_mode
+        )
+        
+        # Skip if file hasn't changed, but remember the new hash and stat
+        if result is None:
+            self.file_cache.put(path, new_hash, new_content, *stat_key)
+            return
         
         # Get git information
         git_branch = DiffAnalyzer.get_git_branch(filepath)
         commit_message = DiffAnalyzer.get_last_commit_message(filepath)
         
-        # Store in database
-        change_id = self.db.add_file_change(
+        # Store in database (metadata only in privacy mode)
+        self.db.queue_file_change(
             filename=filepath.name,
-            filepath=str(filepath),
-            lines_added=lines_added,
-            lines_removed=lines_removed,
-            lines_modified=lines_modified,
+            filepath=path,
+            lines_added=result['lines_added'],
+            lines_removed=result['lines_removed'],
+            lines_modified=result['lines_modified'],
             git_branch=git_branch,
             commit_message=commit_message,
-            diff_content=diff_text if not self.privacy_mode else None,
-            file_hash=new_hash
+            diff_blob=result['diff_blob'],
+            file_hash=result['file_hash'],
+            metadata=result['metadata']
         )
         
-        # Extract metadata for privacy mode
-        if self.privacy_mode:
-            old_symbols = CodeAnalyzer.extract_symbols(str(filepath), old_content) if old_content else {}
-            new_symbols = CodeAnalyzer.extract_symbols(str(filepath), new_content)
-            
-            # Determine what changed
-            old_funcs = set(old_symbols.get('functions', []))
-            new_funcs = set(new_symbols.get('functions', []))
-            old_classes = set(old_symbols.get('classes', []))
-            new_classes = set(new_symbols.get('classes', []))
-            old_imports = set(old_symbols.get('imports', []))
-            new_imports = set(new_symbols.get('imports', []))
-            
-            self.db.add_file_metadata(
-                change_id=change_id,
-                functions_added=list(new_funcs - old_funcs),
-                functions_modified=list(new_funcs & old_funcs),
-                functions_removed=list(old_funcs - new_funcs),
-                classes_added=list(new_classes - old_classes),
-                classes_modified=list(new_classes & old_classes),
-                imports_changed=list(new_imports ^ old_imports)
-            )
-        
         # Update cache
-        self.file_cache[str(filepath)] = (new_hash, new_content)
+        self.file_cache.put(path, new_hash, new_content, *stat_key)
         
-        print(f"✓ Tracked: {filepath.name} (+{lines_added}/-{lines_removed})")
+        print(f"✓ Tracked: {filepath.name} (+{result['lines_added']}/-{result['lines_removed']})")
 
 
 class FileWatcher:
     """Main file watcher class"""
     
-    def __init__(self, paths: List[str], db: Database, privacy_mode: bool = False):
+    def __init__(
+        self,
+        paths: List[str],
+        db: Database,
+        privacy_mode: bool = False,
+        workers: int = WORKER_COUNT,
+        pool_type: str = WORKER_POOL,
+        snapshots: Optional[SnapshotStore] = None,
+        index_on_start: bool = INDEX_ON_START,
+        prune_watches: bool = WATCH_PRUNE_EXCLUDED
+    ):
         self.paths = [Path(p).resolve() for p in paths]
+        self.index_on_start = index_on_start
+        self.prune_watches = prune_watches
         self.db = db
         self.privacy_mode = privacy_mode
+        # Source code only goes to disk outside privacy mode
+        self.snapshots = snapshots or create_snapshot_store(privacy_mode)
         self.observer = Observer()
-        self.event_handler = DevPulseEventHandler(db, privacy_mode)
+        self.event_handler = DevPulseEventHandler(
+            db, privacy_mode, workers, pool_type, self.snapshots, [str(p) for p in self.paths]
+        )
+        self.matcher = self.event_handler.matcher
+        
+        # path -> (watch, recursive)
+        self._watches: Dict[str, Tuple[ObservedWatch, bool]] = {}
+        self._watch_lock = threading.Lock()
+        # Directory bookkeeping touches the disk, so keep it off the observer thread
+        self._dir_executor: Optional[ThreadPoolExecutor] = None
+    
+    def _plan_watches(self, root: str) -> List[Tuple[str, bool]]:
+        """
+        Plan (path, recursive) watches that skip excluded directories.
+        
+        A subtree without excluded directories gets one recursive watch.
+        A directory with excluded children is watched on its own and its
+        other children are planned separately, so excluded trees such as
+        node_modules never get OS-level watches.
+        """
+        plan = []
+        
+        def visit(directory: str) -> bool:
+            """Plan a directory; returns True if its whole subtree is clean"""
+            try:
+                children = [
+                    entry for entry in os.scandir(directory)
+                    if entry.is_dir(follow_symlinks=False)
+                ]
+            except OSError:
+                return True
+            
+            clean = True
+            clean_children = []
+            for entry in children:
+                if self.matcher.is_excluded_name(entry.name):
+                    clean = False
+                elif visit(entry.path):
+                    clean_children.append(entry.path)
+                else:
+                    clean = False
+            
+            if clean:
+                return True
+            
+            plan.append((directory, False))
+            plan.extend((child, True) for child in clean_children)
+            return False
+        
+        if visit(root):
+            plan.append((root, True))
+        return plan
+    
+    def _schedule(self, path: str, recursive: bool):
+        """Schedule a single watch"""
+        with self._watch_lock:
+            if path in self._watches:
+                return
+            watch = self.observer.schedule(self.event_handler, path, recursive=recursive)
+            self._watches[path] = (watch, recursive)
+    
+    def _unschedule_tree(self, path: str):
+        """Remove watches on a directory and everything below it"""
+        prefix = path.rstrip(os.sep) + os.sep
+        with self._watch_lock:
+            for watched in [p for p in self._watches if p == path or p.startswith(prefix)]:
+                watch, _ = self._watches.pop(watched)
+                try:
+                    self.observer.unschedule(watch)
+                except (KeyError, OSError):
+                    pass
+    
+    def _watch_new_directory(self, path: str):
+        """Watch a directory created under a non-recursive watch"""
+        with self._watch_lock:
+            parent = self._watches.get(os.path.dirname(path))
+        
+        # Covered by a recursive watch already, or outside our watches
+        if parent is None or parent[1]:
+            return
+        
+        if self.matcher.is_excluded_dir(path):
+            return
+        
+        for watch_path, recursive in self._plan_watches(path):
+            self._schedule(watch_path, recursive)
+        
+        # Files may have been written before the watch existed
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = [d for d in dirnames if not self.matcher.is_excluded_name(d)]
+            for filename in filenames:
+                self.event_handler._enqueue(os.path.join(dirpath, filename))
+    
+    def directory_created(self, path: str):
+        """Called by the event handler when a directory appears"""
+        if self._dir_executor:
+            self._dir_executor.submit(self._watch_new_directory, path)
+    
+    def directory_removed(self, path: str):
+        """Called by the event handler when a directory disappears"""
+        if self._dir_executor:
+            self._dir_executor.submit(self._unschedule_tree, path)
+    
+    def build_baseline(self):
+        """Snapshot every tracked file so first edits diff correctly"""
+        indexer = BaselineIndexer(
+            self.snapshots,
+            should_ignore=self.event_handler.should_ignore,
+            should_prune=self.event_handler.should_prune,
+            read_file=DiffAnalyzer.read_file
+        )
+        result = indexer.index([p for p in self.paths if p.exists()])
+        print(
+            f"📚 Baseline: {result['indexed']} indexed, {result['unchanged']} unchanged "
+            f"({result['scanned']} files in {result['seconds']}s)"
+        )
     
     def start(self):
         """Start watching files"""
+        if self.index_on_start:
+            self.build_baseline()
+        
         for path in self.paths:
             if not path.exists():
                 print(f"Warning: Path does not exist: {path}")
                 continue
             
-            self.observer.schedule(
-                self.event_handler,
-                str(path),
-                recursive=True
-            )
+            if self.prune_watches:
+                plan = self._plan_watches(str(path))
+            else:
+                plan = [(str(path), True)]
+            
+            for watch_path, recursive in plan:
+                self._schedule(watch_path, recursive)
             print(f"👁️  Watching: {path}")
         
+        if self.prune_watches:
+            self._dir_executor = ThreadPoolExecutor(max_workers=1)
+            self.event_handler.directory_listener = self
+        
+        self.db.start_writer()
+        self.event_handler.start()
         self.observer.start()
         print("DevPulse is now tracking your changes...")
     
@@ -282,3 +740,9 @@ class FileWatcher:
         """Stop watching files"""
         self.observer.stop()
         self.observer.join()
+        if self._dir_executor:
+            self._dir_executor.shutdown(wait=True)
+            self._dir_executor = None
+        self.event_handler.stop()
+        self.db.stop_writer()
+        self.snapshots.close()
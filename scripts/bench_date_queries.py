@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark date-filtered queries on file_changes.
+
+Compares the old DATE(timestamp) = ? filters against the half-open
+timestamp ranges used by Database, printing query plans and timings.
+
+Usage: python scripts/bench_date_queries.py [--rows 1000000] [--days 365]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from devpulse.database import Database, day_range  # noqa: E402
+
+
+OLD_CHANGES = """
+    SELECT * FROM file_changes
+    WHERE DATE(timestamp) = ? AND processed = 0
+    ORDER BY timestamp ASC
+"""
+
+NEW_CHANGES = """
+    SELECT * FROM file_changes
+    WHERE timestamp >= ? AND timestamp < ? AND processed = 0
+    ORDER BY timestamp ASC
+"""
+
+OLD_STATS = """
+    SELECT COUNT(*), COUNT(DISTINCT filepath), SUM(lines_added),
+           SUM(lines_removed), SUM(lines_modified)
+    FROM file_changes
+    WHERE DATE(timestamp) = ?
+"""
+
+NEW_STATS = """
+    SELECT COUNT(*), COUNT(DISTINCT filepath), SUM(lines_added),
+           SUM(lines_removed), SUM(lines_modified)
+    FROM file_changes
+    WHERE timestamp >= ? AND timestamp < ?
+"""
+
+
+def populate(conn: sqlite3.Connection, rows: int, days: int) -> str:
+    """Insert synthetic changes spread over the last N days"""
+    start = datetime(2025, 1, 1)
+    seconds = days * 86400
+    files = [f"/repo/src/module_{i}.py" for i in range(2000)]
+    
+    def generate():
+        for _ in range(rows):
+            ts = start + timedelta(seconds=random.randrange(seconds))
+            path = random.choice(files)
+            yield (
+                os.path.basename(path), path, ts.strftime("%Y-%m-%d %H:%M:%S"),
+                random.randint(0, 50), random.randint(0, 20), random.randint(0, 10),
+                "main", random.randint(0, 1)
+            )
+    
+    with conn:
+        conn.executemany("""
+            INSERT INTO file_changes
+            (filename, filepath, timestamp, lines_added, lines_removed,
+             lines_modified, git_branch, processed)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, generate())
+    conn.execute("ANALYZE")
+    
+    return (start + timedelta(days=days // 2)).strftime("%Y-%m-%d")
+
+
+def plan(conn: sqlite3.Connection, query: str, params: tuple) -> str:
+    """Return the query plan as a single line"""
+    rows = conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+    return "; ".join(row[-1] for row in rows)
+
+
+def timed(conn: sqlite3.Connection, query: str, params: tuple, repeat: int) -> float:
+    """Best-of-N wall time in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        conn.execute(query, params).fetchall()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "bench.db")
+        conn = db._get_connection()
+        
+        t0 = time.perf_counter()
+        date = populate(conn, args.rows, args.days)
+        print(f"Inserted {args.rows:,} rows in {time.perf_counter() - t0:.1f}s; querying {date}\n")
+        
+        cases = [
+            ("changes  DATE()", OLD_CHANGES, (date,)),
+            ("changes  range ", NEW_CHANGES, day_range(date)),
+            ("stats    DATE()", OLD_STATS, (date,)),
+            ("stats    range ", NEW_STATS, day_range(date)),
+        ]
+        
+        for name, query, params in cases:
+            ms = timed(conn, query, params, args.repeat)
+            print(f"{name}  {ms:9.2f} ms  | {plan(conn, query, params)}")
+        
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark diff backends used by DiffAnalyzer.get_diff.
+
+Compares the previous difflib.unified_diff implementation with the
+difflib and patience backends in devpulse.diffing on a few synthetic
+edits, printing timings and the added/removed counts each one reports.
+
+Usage: python scripts/bench_diff.py [--lines 50000] [--repeat 3]
+"""
+import argparse
+import difflib
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from devpulse.diffing import BACKENDS, get_diff  # noqa: E402
+
+
+def legacy_diff(old_content: str, new_content: str):
+    """DiffAnalyzer.get_diff before the diff backends were added"""
+    old_lines = old_content.splitlines(keepends=True)
+    new_lines = new_content.splitlines(keepends=True)
+    
+    diff = list(difflib.unified_diff(old_lines, new_lines, lineterm=''))
+    diff_text = '\n'.join(diff)
+    
+    lines_added = sum(1 for line in diff if line.startswith('+') and not line.startswith('+++'))
+    lines_removed = sum(1 for line in diff if line.startswith('-') and not line.startswith('---'))
+    lines_modified = min(lines_added, lines_removed)
+    
+    return diff_text, lines_added, lines_removed, lines_modified
+
+
+def generated_file(lines: int) -> str:
+    """Code-like text with many repeated lines, as in generated sources"""
+    out = []
+    for i in range(lines):
+        if i % 10 == 0:
+            out.append(f"def handler_{i}(request):")
+        elif i % 10 == 9:
+            out.append("")
+        else:
+            out.append(f"    value = request.get('field_{i % 7}')")
+    return "\n".join(out) + "\n"
+
+
+def scattered_edits(text: str, edits: int) -> str:
+    """Change, insert and delete random lines"""
+    lines = text.splitlines()
+    for _ in range(edits):
+        pos = random.randrange(len(lines))
+        op = random.random()
+        if op < 0.4:
+            lines[pos] = lines[pos] + "  # edited"
+        elif op < 0.7:
+            lines.insert(pos, f"    log('inserted {pos}')")
+        else:
+            del lines[pos]
+    return "\n".join(lines) + "\n"
+
+
+def cases(lines: int):
+    """(name, old, new) benchmark inputs"""
+    base = generated_file(lines)
+    yield "small edit", base, scattered_edits(base, 3)
+    yield "scattered edits", base, scattered_edits(base, 300)
+    yield "regenerated", base, generated_file(lines).replace("field_", "attr_")
+    
+    records = [{"id": i, "name": f"item{i}", "tags": ["a", "b"]} for i in range(lines // 10)]
+    old_json = json.dumps(records, indent=1)
+    records[len(records) // 2]["name"] = "changed"
+    yield "pretty JSON", old_json, json.dumps(records, indent=1)
+    yield "minified JSON", json.dumps(records[:-1]), json.dumps(records)
+
+
+def timed(diff, old: str, new: str, repeat: int):
+    """Best-of-N wall time in milliseconds, with the last result"""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = diff(old, new)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    
+    random.seed(0)
+    backends = [("legacy", legacy_diff)] + [
+        (name, lambda old, new, name=name: get_diff(old, new, name)) for name in sorted(BACKENDS)
+    ]
+    
+    for name, old, new in cases(args.lines):
+        print(f"{name} ({len(old.splitlines()):,} -> {len(new.splitlines()):,} lines)")
+        for backend, diff in backends:
+            ms, (_, added, removed, _) = timed(diff, old, new, args.repeat)
+            print(f"  {backend:<9} {ms:10.1f} ms  +{added} -{removed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Load-test AI summarization offline against a local stub server.
+
+Starts an OpenAI-compatible /v1/chat/completions stub on localhost that
+answers after a fixed latency (streamed requests get their first token
+after it and the rest over the same time again) and rate-limits a share
+of requests with a 429 and Retry-After, then summarizes synthetic changes
+through it with the openai provider and prints time to first output,
+wall time and request counts. The run
+is repeated with a few extra changes to show what the summary cache
+saves on a re-run.
+
+With --serve, only runs the stub so it can be used with
+DEVPULSE_API_BASE=http://127.0.0.1:<port>/v1 and a real `devpulse log`.
+
+Usage: python scripts/bench_summary.py [--changes 2000] [--latency 0.5] [--rate-limit 0.1]
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from devpulse.ai_summarizer import AISummarizer  # noqa: E402
+from devpulse.summary_cache import SummaryCache  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Minimal chat completions endpoint"""
+    
+    latency = 0.5
+    rate_limit = 0.0
+    retry_after = 1.0
+    counts = {"requests": 0, "rate_limited": 0}
+    lock = threading.Lock()
+    
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with self.lock:
+            self.counts["requests"] += 1
+            limited = random.random() < self.rate_limit
+            if limited:
+                self.counts["rate_limited"] += 1
+        
+        if limited:
+            self._reply(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                        {"Retry-After": f"{self.retry_after:g}"})
+            return
+        
+        time.sleep(self.latency)
+        prompt = body.get("messages", [{}])[-1].get("content", "")
+        content = f"✓ **Stub**\n  • Summarized {len(prompt)} prompt characters"
+        if body.get("stream"):
+            self._stream(body, content)
+            return
+        self._reply(200, {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 10, "total_tokens": len(prompt) // 4 + 10},
+        })
+    
+    def _stream(self, body, content):
+        """Send content as server-sent chat.completion.chunk events"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        
+        words = content.split(" ")
+        for index, word in enumerate(words):
+            if index:
+                time.sleep(self.latency / len(words))
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": word if not index else " " + word},
+                    "finish_reason": None,
+                }],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+    
+    def _reply(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def synthetic_changes(count: int, start: int = 0):
+    """Change rows spread over a few dozen directories"""
+    for i in range(start, start + count):
+        directory = f"/work/app/module_{i % 37}"
+        diff = "\n".join(f"+    value_{i}_{j} = compute({j})" for j in range(40))
+        yield {
+            "id": i,
+            "filename": f"file_{i}.py",
+            "filepath": f"{directory}/file_{i}.py",
+            "lines_added": 40,
+            "lines_removed": 3,
+            "git_branch": "main",
+            "commit_message": f"Work on module {i % 37}",
+            "diff_content": diff,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--changes", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per stub response")
+    parser.add_argument("--rate-limit", type=float, default=0.1, help="share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on a 429")
+    parser.add_argument("--budget", type=int, default=5000, help="token budget per request")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--serve", action="store_true", help="only run the stub server")
+    args = parser.parse_args()
+    
+    StubHandler.latency = args.latency
+    StubHandler.rate_limit = args.rate_limit
+    StubHandler.retry_after = args.retry_after
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), StubHandler)
+    api_base = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    
+    if args.serve:
+        print(f"Stub server on {api_base} (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+    
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    
+    changes = list(synthetic_changes(args.changes))
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SummaryCache(Path(tmp) / "summary_cache.db")
+        runs = [("first run", changes), ("re-run, 5 new changes", changes + list(synthetic_changes(5, args.changes)))]
+        for label, run_changes in runs:
+            StubHandler.counts.update(requests=0, rate_limited=0)
+            summarizer = AISummarizer(
+                provider="openai", api_key="stub", token_budget=args.budget, api_base=api_base, cache=cache
+            )
+            
+            t0 = time.perf_counter()
+            first = None
+            pieces = []
+            for piece in summarizer.stream_summary(run_changes, privacy_mode=False):
+                if first is None:
+                    first = time.perf_counter() - t0
+                pieces.append(piece)
+            summary = "".join(pieces).strip()
+            elapsed = time.perf_counter() - t0
+            
+            stats = summarizer.client.stats
+            print(f"{label}: {len(run_changes):,} changes in {elapsed:.2f} s, first output after {first:.2f} s "
+                  f"(concurrency {summarizer.client.concurrency}, budget {args.budget} tokens)")
+            print(f"  client: {stats['requests']} requests, {stats['retries']} retries, {stats['rate_limited']} rate limited")
+            print(f"  server: {StubHandler.counts['requests']} requests, {StubHandler.counts['rate_limited']} answered 429")
+            print(f"  cache: {cache.hits} hits, {cache.misses} misses")
+            print(f"  summary: {summary.splitlines()[-1].strip()}")
+            cache.hits = cache.misses = 0
+        cache.close()
+    
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
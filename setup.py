@@ -12,6 +12,9 @@ setup(
         "openai>=1.12.0",
         "litellm>=1.30.0",
     ],
+    extras_require={
+        "fast": ["xxhash>=3.0.0"],
+    },
     entry_points={
         "console_scripts": [
             "devpulse=devpulse.cli:main",